@@ -0,0 +1,121 @@
+# benchmarks/concurrencia.py
+# Rendimiento con peticiones concurrentes: compara el servidor WSGI (vistas
+# síncronas de DRF) con el servidor ASGI (vistas asíncronas de /api/async/).
+# Mide, para cada endpoint, peticiones por segundo y latencia p50/p95 con N
+# clientes simultáneos. Usa solo la biblioteca estándar.
+#
+# Los dos servidores tienen que estar corriendo sobre la misma base, por ejemplo:
+#   GUNICORN_PERFIL=wsgi GUNICORN_BIND=127.0.0.1:8000 gunicorn -c core/gunicorn.conf.py
+#   GUNICORN_PERFIL=asgi GUNICORN_BIND=127.0.0.1:8001 gunicorn -c core/gunicorn.conf.py
+#   python benchmarks/concurrencia.py --repuesto 1 --concurrencia 64
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+DIRECTORIO = Path(__file__).resolve().parent
+
+# Nombre -> (ruta síncrona, ruta asíncrona). {repuesto} se reemplaza por --repuesto.
+ENDPOINTS = {
+    'repuestos-globales': ('/api/repuestos-globales/', '/api/async/repuestos-globales/'),
+    'repuestos-globales?search': (
+        '/api/repuestos-globales/?search=pastilla%20freno',
+        '/api/async/repuestos-globales/?search=pastilla%20freno',
+    ),
+    'cercanos': (
+        '/api/repuestos-globales/{repuesto}/cercanos/?lat=-25.28&lng=-57.63',
+        '/api/async/repuestos-globales/{repuesto}/cercanos/?lat=-25.28&lng=-57.63',
+    ),
+}
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por interpolación lineal."""
+    ordenados = sorted(valores)
+    if len(ordenados) == 1:
+        return ordenados[0]
+    posicion = (len(ordenados) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+def pedir(url, timeout):
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as respuesta:
+            respuesta.read()
+            correcta = respuesta.status == 200
+    except (urllib.error.URLError, TimeoutError):
+        correcta = False
+    return correcta, (time.perf_counter() - inicio) * 1000
+
+
+def medir(url, peticiones, concurrencia, timeout):
+    """Envía `peticiones` GET a `url` con `concurrencia` clientes a la vez."""
+    for _ in range(min(concurrencia, 10)):
+        pedir(url, timeout)  # calentamiento
+
+    tiempos, errores = [], 0
+    bloqueo = threading.Lock()
+
+    def tarea(_):
+        nonlocal errores
+        correcta, ms = pedir(url, timeout)
+        with bloqueo:
+            tiempos.append(ms)
+            errores += not correcta
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+        list(ejecutor.map(tarea, range(peticiones)))
+    duracion = time.perf_counter() - inicio
+    return {
+        'url': url,
+        'peticiones_por_segundo': round(peticiones / duracion, 1),
+        'p50_ms': round(statistics.median(tiempos), 2),
+        'p95_ms': round(percentil(tiempos, 95), 2),
+        'errores': errores,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara WSGI y ASGI con peticiones concurrentes.")
+    parser.add_argument('--wsgi', default='http://127.0.0.1:8000', help="URL base del servidor WSGI.")
+    parser.add_argument('--asgi', default='http://127.0.0.1:8001', help="URL base del servidor ASGI.")
+    parser.add_argument('--repuesto', type=int, default=1, help="Id de un repuesto con ofertas (para 'cercanos').")
+    parser.add_argument('--peticiones', type=int, default=1000)
+    parser.add_argument('--concurrencia', type=int, default=32)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--endpoints', nargs='*', choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument('--salida', default=str(DIRECTORIO / 'concurrencia.json'))
+    opciones = parser.parse_args()
+
+    resultados = {'peticiones': opciones.peticiones, 'concurrencia': opciones.concurrencia, 'endpoints': {}}
+    print(f"{'endpoint':28} {'WSGI req/s':>11} {'ASGI req/s':>11} {'WSGI p95':>9} {'ASGI p95':>9}")
+    for nombre in opciones.endpoints:
+        sincrona, asincrona = (ruta.format(repuesto=opciones.repuesto) for ruta in ENDPOINTS[nombre])
+        wsgi = medir(opciones.wsgi + sincrona, opciones.peticiones, opciones.concurrencia, opciones.timeout)
+        asgi = medir(opciones.asgi + asincrona, opciones.peticiones, opciones.concurrencia, opciones.timeout)
+        resultados['endpoints'][nombre] = {'wsgi': wsgi, 'asgi': asgi}
+        print(
+            f"{nombre:28} {wsgi['peticiones_por_segundo']:11.1f} {asgi['peticiones_por_segundo']:11.1f} "
+            f"{wsgi['p95_ms']:9.2f} {asgi['p95_ms']:9.2f}"
+        )
+
+    Path(opciones.salida).write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f"Resultados guardados en {opciones.salida}.")
+    if any(r['wsgi']['errores'] or r['asgi']['errores'] for r in resultados['endpoints'].values()):
+        print("Hubo respuestas con error o sin respuesta.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
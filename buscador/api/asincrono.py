@@ -0,0 +1,87 @@
+# buscador/api/asincrono.py
+# Vistas asíncronas (async def) para las lecturas más frecuentes: el listado
+# de repuestos y las ofertas cercanas a un punto. Usan la configuración de
+# las vistas de DRF equivalentes (filtros, paginación, serializadores) y
+# responden los mismos bytes, pero las consultas se hacen con el ORM
+# asíncrono: servidas por ASGI (core/asgi.py, ver core/gunicorn.conf.py),
+# mientras una consulta espera a la base el proceso sigue atendiendo otras
+# peticiones. No pasan por la caché de respuestas de los listados.
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.views.decorators.http import require_GET
+from rest_framework.views import exception_handler
+
+from ..geo import arepuestos_cercanos
+from ..models import RepuestoGlobal
+from ..replicas import lectura_en_replica
+from .renderers import JSONRapidoRenderer
+from .views import RepuestoGlobalList, RepuestoSucursalCercanosList
+
+
+def _respuesta(datos, status=200):
+    return HttpResponse(JSONRapidoRenderer().render(datos), content_type='application/json', status=status)
+
+
+def _preparar_vista(clase, request, **kwargs):
+    """
+    Instancia la vista de DRF para la petición como lo hace dispatch(), incluido
+    initial(): autenticación, permisos y límites de peticiones.
+    """
+    vista = clase()
+    vista.setup(request, **kwargs)
+    vista.request = vista.initialize_request(request, **kwargs)
+    vista.headers = vista.default_response_headers
+    vista.format_kwarg = vista.get_format_suffix(**kwargs)
+    vista.initial(vista.request, **kwargs)
+    return vista
+
+
+def vista_api_async(funcion):
+    """Solo GET, y los errores de la API con el mismo formato que las vistas de DRF."""
+    @require_GET
+    @functools.wraps(funcion)
+    async def envoltura(request, **kwargs):
+        try:
+            return await funcion(request, **kwargs)
+        except Exception as exc:
+            respuesta = exception_handler(exc, {'request': request})
+            if respuesta is None:
+                raise
+            error = _respuesta(respuesta.data, respuesta.status_code)
+            for encabezado, valor in respuesta.items():
+                error.setdefault(encabezado, valor)
+            return error
+    return envoltura
+
+
+@lectura_en_replica
+@vista_api_async
+async def repuestos_globales(request):
+    """Listado de repuestos (/api/async/repuestos-globales/), como RepuestoGlobalList."""
+    vista = await sync_to_async(_preparar_vista)(RepuestoGlobalList, request)
+    if not vista.usar_listado_rapido(vista.request):
+        # ?fields= / ?expand= pasan por el serializador.
+        respuesta = await sync_to_async(vista.list)(vista.request)
+        return _respuesta(respuesta.data, respuesta.status_code)
+
+    # Armar el queryset puede consultar la base (vehiculo_id, umbral de la búsqueda difusa).
+    queryset = await sync_to_async(vista.get_queryset_rapido)()
+    paginacion = vista.paginator
+    pagina = paginacion.get_queryset_pagina(queryset, vista.request, vista)
+    filas = paginacion.recibir_filas([fila async for fila in pagina])
+    datos = await vista.filas_rapidas.aconstruir(filas)
+    return _respuesta(paginacion.get_paginated_response(datos).data)
+
+
+@lectura_en_replica
+@vista_api_async
+async def repuestos_cercanos(request, pk):
+    """Ofertas cercanas (/api/async/repuestos-globales/<pk>/cercanos/), como RepuestoSucursalCercanosList."""
+    vista = await sync_to_async(_preparar_vista)(RepuestoSucursalCercanosList, request, pk=pk)
+    repuesto = await aget_object_or_404(RepuestoGlobal, pk=pk)
+    ofertas = await arepuestos_cercanos(repuesto.pk, **vista.get_parametros(), queryset=vista.get_queryset_ofertas())
+    # Las relaciones ya vienen cargadas (select_related y prefetch): serializar no consulta la base.
+    return _respuesta(vista.get_serializer(ofertas, many=True).data)
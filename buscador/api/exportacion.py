@@ -0,0 +1,138 @@
+# buscador/api/exportacion.py
+# Exportación completa del catálogo (repuestos) y del inventario (ofertas
+# por sucursal) en NDJSON o CSV, para los sistemas de los socios.
+# La respuesta se genera en streaming: las filas se leen con un cursor del
+# servidor (.iterator(chunk_size=...)) y se procesan por lotes, con una
+# consulta por lote para las compatibilidades, así que la memoria usada no
+# depende del tamaño del catálogo.
+import csv
+import re
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+from ..models import RepuestoGlobal, RepuestoSucursal
+from ..replicas import iterar_en_la_peticion
+from .rapido import FilasRepuestoGlobal, formatear_decimal
+from .renderers import JSONRapidoRenderer
+
+TAMANIO_LOTE = 2000
+FORMATOS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+# Como GZipMiddleware.
+ACEPTA_GZIP = re.compile(r'\bgzip\b')
+
+
+class ExportacionRepuestos:
+    """Repuestos globales, con la misma forma que /api/repuestos-globales/."""
+    nombre = 'repuestos'
+    columnas_csv = (
+        'id', 'codigo', 'nombre', 'descripcion', 'cantidad', 'imagen_url', 'categoria_id', 'categoria',
+        'stock_total', 'precio_minimo', 'precio_maximo', 'cantidad_sucursales', 'compatibilidad',
+    )
+    filas = FilasRepuestoGlobal()
+
+    def queryset(self):
+        return RepuestoGlobal.objects.order_by('id').values(*self.filas.columnas)
+
+    def construir(self, lote):
+        return self.filas.construir(lote)
+
+    def fila_csv(self, fila):
+        categoria = fila['categoria'] or {}
+        # 'Toyota Corolla 2005-2010 | ...'.
+        compatibilidad = ' | '.join(
+            f"{r['marca']} {r['modelo']} {r['anio_desde']}-{r['anio_hasta']}"
+            for r in fila['compatibilidad_rangos']
+        )
+        return [
+            fila['id'], fila['codigo'], fila['nombre'], fila['descripcion'], fila['cantidad'],
+            fila['imagen_url'], categoria.get('id'), categoria.get('nombre'), fila['stock_total'],
+            fila['precio_minimo'], fila['precio_maximo'], fila['cantidad_sucursales'], compatibilidad,
+        ]
+
+
+class ExportacionInventario:
+    """Ofertas por sucursal, planas: una fila por repuesto y sucursal."""
+    nombre = 'inventario'
+    columnas = (
+        'id', 'repuesto_global_id', 'repuesto_global__codigo', 'sucursal_id', 'sucursal__nombre',
+        'sucursal__tienda__nombre', 'stock', 'precio', 'fecha_actualizacion',
+    )
+    columnas_csv = (
+        'id', 'repuesto_global_id', 'codigo', 'sucursal_id', 'sucursal', 'tienda',
+        'stock', 'precio', 'fecha_actualizacion',
+    )
+
+    def queryset(self):
+        return RepuestoSucursal.objects.order_by('id').values(*self.columnas)
+
+    def construir(self, lote):
+        return [
+            {
+                **dict(zip(self.columnas_csv, (fila[columna] for columna in self.columnas))),
+                'precio': formatear_decimal(fila['precio']),
+                'fecha_actualizacion': fila['fecha_actualizacion'].isoformat(),
+            }
+            for fila in lote
+        ]
+
+    def fila_csv(self, fila):
+        return [fila[columna] for columna in self.columnas_csv]
+
+
+RECURSOS = {recurso.nombre: recurso for recurso in (ExportacionRepuestos(), ExportacionInventario())}
+
+
+def lotes(recurso):
+    """Filas del recurso en lotes de TAMANIO_LOTE, leídas con un cursor del servidor."""
+    filas = recurso.queryset().iterator(chunk_size=TAMANIO_LOTE)
+    while lote := list(islice(filas, TAMANIO_LOTE)):
+        yield recurso.construir(lote)
+
+
+def generar_ndjson(recurso):
+    renderer = JSONRapidoRenderer()
+    for lote in lotes(recurso):
+        yield b''.join(renderer.render(fila) + b'\n' for fila in lote)
+
+
+class _Eco:
+    """Archivo que devuelve lo que se le escribe: csv.writer arma la línea y se envía."""
+
+    def write(self, valor):
+        return valor
+
+
+def generar_csv(recurso):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(recurso.columnas_csv).encode()
+    for lote in lotes(recurso):
+        yield ''.join(escritor.writerow(recurso.fila_csv(fila)) for fila in lote).encode()
+
+
+GENERADORES = {'ndjson': generar_ndjson, 'csv': generar_csv}
+
+
+def respuesta_exportacion(request, recurso, formato):
+    """
+    StreamingHttpResponse con la exportación. Si el cliente acepta gzip, el
+    contenido se comprime a medida que se genera.
+    """
+    # El contenido se genera después de que el middleware de réplicas terminó.
+    contenido = iterar_en_la_peticion(GENERADORES[formato](recurso))
+    comprimir = ACEPTA_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    respuesta = StreamingHttpResponse(
+        compress_sequence(contenido) if comprimir else contenido,
+        content_type=FORMATOS[formato],
+    )
+    if comprimir:
+        respuesta['Content-Encoding'] = 'gzip'
+    patch_vary_headers(respuesta, ('Accept-Encoding',))
+    respuesta['Content-Disposition'] = f'attachment; filename="{recurso.nombre}.{formato}"'
+    return respuesta
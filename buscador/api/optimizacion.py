@@ -0,0 +1,205 @@
+# buscador/api/optimizacion.py
+# Planificador de consultas para los serializadores anidados.
+# Recorre los campos de un serializador y aplica al queryset el
+# select_related / prefetch_related(Prefetch(...)) que necesita, para que
+# la cantidad de consultas de una vista no dependa de la cantidad de filas.
+# Si el cliente pidió solo algunos campos (?fields=), también limita las
+# columnas que se leen con .only().
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _resolver_relacion(modelo, nombre):
+    """
+    Devuelve el campo de relación del modelo para un nombre de atributo
+    (incluidos los accesores inversos como 'repuestosucursal_set'), o None
+    si el atributo no es una relación.
+    """
+    try:
+        campo = modelo._meta.get_field(nombre)
+    except FieldDoesNotExist:
+        campo = next(
+            (rel for rel in modelo._meta.related_objects if rel.get_accessor_name() == nombre),
+            None
+        )
+    if campo is None or not campo.is_relation:
+        return None
+    return campo
+
+
+def _es_multiple(campo):
+    return campo.many_to_many or campo.one_to_many
+
+
+def planificar_consultas(serializer, modelo=None):
+    """
+    Calcula las relaciones que hay que traer para serializar `serializer`.
+    Devuelve una tupla (select_related, prefetch_related):
+    - select_related: rutas 'a__b' de relaciones simples (FK / OneToOne).
+    - prefetch_related: objetos Prefetch para relaciones múltiples, cuyo
+      queryset ya viene optimizado para el serializador hijo.
+    Varios campos pueden leer de la misma relación múltiple (compatibilidad y
+    compatibilidad_rangos): se trae con un solo Prefetch, con todas las
+    columnas si algún campo las necesita, y los campos con un método
+    preparar_queryset() lo aplican a ese queryset (por ejemplo, anotaciones).
+    """
+    modelo = modelo or serializer.Meta.model
+    select, prefetch, preparar = [], {}, {}
+
+    for campo in serializer.fields.values():
+        if campo.write_only or campo.source == '*':
+            continue
+
+        # Recorre la ruta del 'source' mientras sean relaciones del modelo.
+        partes = campo.source.split('.')
+        actual, ruta = modelo, []
+        for parte in partes:
+            relacion = _resolver_relacion(actual, parte)
+            if relacion is None:
+                break
+            if _es_multiple(relacion):
+                lookup = '__'.join(ruta + [parte])
+                queryset = _queryset_hijo(campo, relacion, parte == partes[-1])
+                if lookup not in prefetch or _columnas_limitadas(prefetch[lookup]):
+                    prefetch[lookup] = queryset
+                if parte == partes[-1] and hasattr(campo, 'preparar_queryset'):
+                    preparar.setdefault(lookup, []).append(campo.preparar_queryset)
+                ruta = None
+                break
+            ruta.append(parte)
+            actual = relacion.related_model
+        if not ruta:
+            continue
+
+        # La ruta completa es una relación simple anidada con su propio serializador.
+        if ruta == partes and isinstance(campo, serializers.BaseSerializer):
+            hijo_select, hijo_prefetch = planificar_consultas(campo, actual)
+            prefijo = '__'.join(ruta)
+            select.append(prefijo)
+            select.extend(f'{prefijo}__{s}' for s in hijo_select)
+            prefetch.update(
+                (f'{prefijo}__{p.prefetch_through}', p.queryset) for p in hijo_prefetch
+            )
+        # Un PrimaryKeyRelatedField sobre una FK solo usa la columna *_id.
+        elif ruta == partes and isinstance(campo, serializers.PrimaryKeyRelatedField):
+            continue
+        # Campo simple que lee a través de relaciones ('categoria.nombre').
+        else:
+            select.append('__'.join(ruta))
+
+    for lookup, funciones in preparar.items():
+        for funcion in funciones:
+            prefetch[lookup] = funcion(prefetch[lookup])
+    return select, [Prefetch(lookup, queryset=queryset) for lookup, queryset in prefetch.items()]
+
+
+def _columnas_limitadas(queryset):
+    """Si el queryset lee solo algunas columnas (.only() o .defer())."""
+    return queryset.query.deferred_loading != (frozenset(), True)
+
+
+def _queryset_hijo(campo, relacion, es_destino):
+    """Queryset para el Prefetch de una relación múltiple."""
+    queryset = relacion.related_model._default_manager.all()
+    hijo = getattr(campo, 'child', None) or getattr(campo, 'child_relation', None)
+    if es_destino and isinstance(hijo, serializers.BaseSerializer):
+        return optimizar_queryset(queryset, hijo)
+    # Solo se muestran los ids. En una FK inversa también hace falta la
+    # columna de la FK para asignar cada fila a su objeto.
+    if es_destino and isinstance(hijo, serializers.PrimaryKeyRelatedField):
+        return queryset.only('pk', *([relacion.field.attname] if relacion.one_to_many else []))
+    return queryset
+
+
+def _es_fk(campo):
+    """FK u OneToOne con la columna en este modelo (no una relación inversa)."""
+    return campo.concrete and (campo.many_to_one or campo.one_to_one)
+
+
+def columnas_necesarias(serializer, modelo=None):
+    """
+    Rutas de las columnas que lee el serializador, para .only(), sin las de
+    las relaciones múltiples (las trae su Prefetch). Devuelve None si algún
+    campo lee algo que no es una columna (una propiedad, un método, '*'),
+    porque entonces no se puede saber qué columnas hacen falta.
+    """
+    modelo = modelo or serializer.Meta.model
+    columnas = []
+
+    for campo in serializer.fields.values():
+        if campo.write_only:
+            continue
+        if campo.source == '*':
+            return None
+
+        partes = campo.source.split('.')
+        actual, ruta = modelo, []
+        for parte in partes:
+            try:
+                campo_modelo = actual._meta.get_field(parte)
+            except FieldDoesNotExist:
+                campo_modelo = _resolver_relacion(actual, parte)
+            if campo_modelo is None:
+                return None
+            if campo_modelo.is_relation and _es_multiple(campo_modelo):
+                ruta = None
+                break
+            ruta.append(parte)
+            # select_related no puede atravesar una FK diferida.
+            if campo_modelo.is_relation and _es_fk(campo_modelo):
+                columnas.append('__'.join(ruta))
+            if not campo_modelo.is_relation:
+                break
+            actual = campo_modelo.related_model
+        if not ruta:
+            continue
+
+        if not campo_modelo.is_relation:
+            columnas.append('__'.join(ruta))
+        elif isinstance(campo, serializers.BaseSerializer):
+            hijas = columnas_necesarias(campo, actual)
+            if hijas is None:
+                return None
+            prefijo = '__'.join(ruta)
+            columnas.extend(f'{prefijo}__{c}' for c in hijas)
+
+    return columnas
+
+
+def optimizar_queryset(queryset, serializer, solo_columnas=False, orden=()):
+    """
+    Aplica al queryset las relaciones que necesita el serializador. Con
+    `solo_columnas`, además lee solo las columnas que usa (y las del orden,
+    que necesita la paginación).
+    """
+    select, prefetch = planificar_consultas(serializer, queryset.model)
+    if select:
+        # Varios campos pueden leer de la misma relación ('resumen_inventario.*').
+        queryset = queryset.select_related(*dict.fromkeys(select))
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if solo_columnas:
+        columnas = columnas_necesarias(serializer, queryset.model)
+        if columnas is not None:
+            orden = queryset.query.order_by or orden or queryset.model._meta.ordering
+            nombres = {f.name for f in queryset.model._meta.concrete_fields}
+            nombres |= {f.attname for f in queryset.model._meta.concrete_fields}
+            columnas += [c.lstrip('-') for c in orden if isinstance(c, str) and c.lstrip('-') in nombres]
+            queryset = queryset.only(*dict.fromkeys(columnas))
+    return queryset
+
+
+class ConsultaOptimizadaMixin:
+    """
+    Mixin para vistas genéricas de DRF: optimiza el queryset de la vista
+    según el serializador que va a usar.
+    """
+
+    def get_queryset(self):
+        serializer = self.get_serializer()
+        return optimizar_queryset(
+            super().get_queryset(), serializer,
+            solo_columnas=getattr(serializer, 'campos_restringidos', False),
+            orden=getattr(self, 'orden_cursor', None) or ()
+        )
@@ -0,0 +1,220 @@
+# buscador/api/pagination.py
+# Paginación por cursor (keyset) para todos los listados de la API.
+# En lugar de OFFSET, cada página continúa a partir de los valores de orden
+# de la última fila, por ejemplo WHERE (nombre, id) > ('Bujia', 42), así que
+# una página profunda cuesta lo mismo que la primera si hay un índice con
+# las columnas del orden.
+import base64
+import datetime
+import decimal
+import json
+import uuid
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _a_json(valor):
+    """Convierte un valor de orden a un tipo que JSON pueda representar sin perder precisión."""
+    if isinstance(valor, (datetime.date, datetime.time)):
+        return valor.isoformat()
+    if isinstance(valor, (decimal.Decimal, uuid.UUID)):
+        return str(valor)
+    return valor
+
+
+class PaginacionKeyset(BasePagination):
+    """
+    Paginación keyset con cursores opacos.
+
+    El orden se toma, por prioridad, del order_by explícito del queryset (por
+    ejemplo el orden por relevancia de la búsqueda), del atributo `orden_cursor`
+    de la vista o del Meta.ordering del modelo. Siempre se agrega 'id' al final
+    para que el orden sea total. Los campos del orden deben ser columnas del
+    propio modelo o anotaciones, y no pueden ser nulos. Los valores del cursor
+    se convierten con el campo de cada columna (o el output_field de la
+    anotación) antes de llegar a la consulta.
+    """
+    page_size = api_settings.PAGE_SIZE or 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.recibir_filas(list(self.get_queryset_pagina(queryset, request, view)))
+
+    def get_queryset_pagina(self, queryset, request, view=None):
+        """
+        Queryset de la página pedida, sin evaluar (con una fila de más para
+        saber si hay otra página). Las vistas asíncronas lo recorren con
+        `async for` y pasan las filas a recibir_filas().
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.orden = self.get_orden(queryset, view)
+        self.campos_orden = [self.get_campo(queryset, campo) for campo, _ in self.orden]
+
+        self.cursor = self.decode_cursor(request)
+        self.reversa = bool(self.cursor and self.cursor['r'])
+        if self.cursor:
+            queryset = queryset.filter(self.get_condicion(self.cursor['v'], self.reversa))
+
+        queryset = queryset.order_by(*(
+            f'{campo}' if descendente == self.reversa else f'-{campo}'
+            for campo, descendente in self.orden
+        ))
+        return queryset[:self.page_size + 1]
+
+    def recibir_filas(self, filas):
+        """Recibe las filas de get_queryset_pagina() y devuelve las de la página."""
+        hay_mas = len(filas) > self.page_size
+        filas = filas[:self.page_size]
+        if self.reversa:
+            filas.reverse()
+
+        # Al retroceder, siempre existe la página siguiente (de ahí venimos).
+        if self.reversa:
+            self.hay_siguiente, self.hay_anterior = True, hay_mas
+        else:
+            self.hay_siguiente, self.hay_anterior = hay_mas, self.cursor is not None
+        self.primera = self.get_valores(filas[0]) if filas else None
+        self.ultima = self.get_valores(filas[-1]) if filas else None
+        return filas
+
+    def get_page_size(self, request):
+        try:
+            tamanio = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(tamanio, 1), self.max_page_size)
+
+    def get_orden(self, queryset, view):
+        """Devuelve una lista de (campo, descendente) con 'id' como desempate."""
+        orden = (
+            list(queryset.query.order_by)
+            or list(getattr(view, 'orden_cursor', None) or [])
+            or list(queryset.model._meta.ordering)
+        )
+        resultado = []
+        for campo in orden:
+            if not isinstance(campo, str) or '__' in campo:
+                raise ImproperlyConfigured(
+                    f'PaginacionKeyset no admite el orden {campo!r} en {queryset.model.__name__}.'
+                )
+            descendente = campo.startswith('-')
+            nombre = campo.lstrip('-')
+            if nombre == 'pk':
+                nombre = 'id'
+            try:
+                campo_modelo = queryset.model._meta.get_field(nombre)
+                # Una FK se ordena por su columna (tienda -> tienda_id), no por el modelo relacionado.
+                nombre = campo_modelo.attname
+            except FieldDoesNotExist:
+                # Anotación del queryset (por ejemplo 'rank' o 'similitud').
+                pass
+            resultado.append((nombre, descendente))
+        if 'id' not in (nombre for nombre, _ in resultado):
+            resultado.append(('id', False))
+        return resultado
+
+    def get_campo(self, queryset, nombre):
+        """Campo del modelo o output_field de la anotación con el que se convierten los valores del cursor."""
+        if nombre in queryset.query.annotations:
+            return queryset.query.annotations[nombre].output_field
+        for campo in queryset.model._meta.concrete_fields:
+            if campo.attname == nombre:
+                return campo
+        raise ImproperlyConfigured(f'PaginacionKeyset no encuentra el campo {nombre!r} en {queryset.model.__name__}.')
+
+    def convertir_valor(self, campo, valor):
+        """Valor del cursor con el tipo del campo; un cursor alterado da 404, no un error de la base."""
+        if valor is None or isinstance(valor, (list, dict)):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            valor = campo.to_python(valor)
+            # Por ejemplo, los límites del entero de la columna.
+            campo.run_validators(valor)
+            return valor
+        except (ValidationError, TypeError, ValueError, OverflowError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_valores(self, fila):
+        # Las filas pueden ser objetos del modelo o diccionarios de .values().
+        if isinstance(fila, dict):
+            return [_a_json(fila[campo]) for campo, _ in self.orden]
+        return [_a_json(getattr(fila, campo)) for campo, _ in self.orden]
+
+    def get_condicion(self, valores, reversa):
+        """
+        Construye (a > x) OR (a = x AND b > y) OR ... respetando la dirección
+        de cada campo. PostgreSQL recorre el índice compuesto a partir de x.
+        """
+        if len(valores) != len(self.orden):
+            raise NotFound(self.invalid_cursor_message)
+        condicion = Q()
+        iguales = Q()
+        for (campo, descendente), tipo, valor in zip(self.orden, self.campos_orden, valores):
+            valor = self.convertir_valor(tipo, valor)
+            operador = 'lt' if descendente != reversa else 'gt'
+            condicion |= iguales & Q(**{f'{campo}__{operador}': valor})
+            iguales &= Q(**{campo: valor})
+        return condicion
+
+    # -------------------------------------------------------------
+    # Cursores
+    # -------------------------------------------------------------
+    def decode_cursor(self, request):
+        codificado = request.query_params.get(self.cursor_query_param)
+        if not codificado:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(codificado.encode('ascii')))
+            valores, reversa = cursor['v'], cursor['r']
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(valores, list):
+            raise NotFound(self.invalid_cursor_message)
+        return {'v': valores, 'r': bool(reversa)}
+
+    def encode_cursor(self, valores, reversa):
+        cursor = json.dumps({'v': valores, 'r': reversa}, separators=(',', ':'))
+        codificado = base64.urlsafe_b64encode(cursor.encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, codificado)
+
+    def get_next_link(self):
+        if not self.hay_siguiente or self.ultima is None:
+            return None
+        return self.encode_cursor(self.ultima, False)
+
+    def get_previous_link(self):
+        if not self.hay_anterior:
+            return None
+        if self.primera is None:
+            # Página vacía tras un cursor: volvemos al inicio.
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.primera, True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,197 @@
+# buscador/api/rapido.py
+# Listados de solo lectura sin ModelSerializer.
+# Serializar con DRF cuesta una llamada por campo y por fila, y más con
+# serializadores anidados. Para los listados más usados, las filas se leen
+# con .values() (una consulta con todos los JOIN), las relaciones múltiples
+# con una consulta agrupada por id, y los diccionarios se arman a mano con
+# exactamente la misma forma, orden de claves y formato de valores que los
+# serializadores de serializers.py (los tests comparan los bytes).
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework.response import Response
+
+from ..compatibilidad import con_vehiculos, vehiculos_compatibles
+from ..instrumentacion import medir_serializacion
+from ..models import CompatibilidadRango
+
+CENTAVOS = Decimal('0.01')
+
+CAMPOS_REPUESTO_GLOBAL = (
+    'id', 'nombre', 'descripcion', 'codigo', 'cantidad', 'imagen_url',
+    'categoria', 'categoria__nombre', 'categoria__descripcion',
+    'resumen_inventario__stock_total', 'resumen_inventario__precio_minimo',
+    'resumen_inventario__precio_maximo', 'resumen_inventario__cantidad_sucursales',
+)
+
+CAMPOS_SUCURSAL = (
+    'id', 'nombre', 'direccion', 'telefono', 'ubicacion',
+    'tienda', 'tienda__nombre', 'tienda__logo_url', 'tienda__email', 'tienda__telefono',
+    'tienda__dias_atencion', 'tienda__tiene_delivery',
+)
+
+
+def formatear_decimal(valor):
+    """Como serializers.DecimalField(decimal_places=2): texto con dos decimales."""
+    return None if valor is None else format(valor.quantize(CENTAVOS), 'f')
+
+
+def _consulta_rangos(repuesto_ids):
+    return (
+        con_vehiculos(CompatibilidadRango.objects.filter(repuesto_global_id__in=repuesto_ids))
+        .order_by('marca', 'modelo', 'anios')
+        .values_list('repuesto_global_id', 'marca', 'modelo', 'anios', 'vehiculos')
+    )
+
+
+def _agrupar_compatibilidad(filas):
+    """Vehículos y rangos de compatibilidad de cada repuesto, en el orden del modelo."""
+    vehiculos, rangos = defaultdict(list), defaultdict(list)
+    for repuesto_id, marca, modelo, anios, vehiculos_rango in filas:
+        vehiculos[repuesto_id].extend(vehiculos_compatibles([(marca, modelo, vehiculos_rango)]))
+        rangos[repuesto_id].append({
+            'marca': marca, 'modelo': modelo, 'anio_desde': anios.lower,
+            'anio_hasta': anios.upper - 1 if anios.upper is not None else None,
+        })
+    return vehiculos, rangos
+
+
+def compatibilidades(repuesto_ids):
+    """
+    ({repuesto_id: [vehículo, ...]}, {repuesto_id: [rango, ...]}) con la forma
+    de los campos compatibilidad y compatibilidad_rangos, en una consulta.
+    """
+    return _agrupar_compatibilidad(_consulta_rangos(repuesto_ids))
+
+
+async def acompatibilidades(repuesto_ids):
+    return _agrupar_compatibilidad([fila async for fila in _consulta_rangos(repuesto_ids)])
+
+
+def _repuesto_global(fila, prefijo, vehiculos, rangos):
+    """Igual que RepuestoGlobalSerializer."""
+    repuesto_id = fila[f'{prefijo}id']
+    categoria_id = fila[f'{prefijo}categoria']
+    return {
+        'id': repuesto_id,
+        'nombre': fila[f'{prefijo}nombre'],
+        'descripcion': fila[f'{prefijo}descripcion'],
+        'codigo': fila[f'{prefijo}codigo'],
+        'cantidad': fila[f'{prefijo}cantidad'],
+        'imagen_url': fila[f'{prefijo}imagen_url'],
+        'categoria': None if categoria_id is None else {
+            'id': categoria_id,
+            'nombre': fila[f'{prefijo}categoria__nombre'],
+            'descripcion': fila[f'{prefijo}categoria__descripcion'],
+        },
+        'compatibilidad': vehiculos.get(repuesto_id, []),
+        'compatibilidad_rangos': rangos.get(repuesto_id, []),
+        # Sin fila de resumen: 0, como ResumenEnteroField.
+        'stock_total': fila[f'{prefijo}resumen_inventario__stock_total'] or 0,
+        'precio_minimo': formatear_decimal(fila[f'{prefijo}resumen_inventario__precio_minimo']),
+        'precio_maximo': formatear_decimal(fila[f'{prefijo}resumen_inventario__precio_maximo']),
+        'cantidad_sucursales': fila[f'{prefijo}resumen_inventario__cantidad_sucursales'] or 0,
+    }
+
+
+def _sucursal(fila, prefijo):
+    """Igual que SucursalSerializer (la ubicación en EWKT, como la muestra ModelField)."""
+    ubicacion = fila[f'{prefijo}ubicacion']
+    return {
+        'id': fila[f'{prefijo}id'],
+        'tienda': {
+            'id': fila[f'{prefijo}tienda'],
+            'nombre': fila[f'{prefijo}tienda__nombre'],
+            'logo_url': fila[f'{prefijo}tienda__logo_url'],
+            'email': fila[f'{prefijo}tienda__email'],
+            'telefono': fila[f'{prefijo}tienda__telefono'],
+            'dias_atencion': fila[f'{prefijo}tienda__dias_atencion'],
+            'tiene_delivery': fila[f'{prefijo}tienda__tiene_delivery'],
+        },
+        'nombre': fila[f'{prefijo}nombre'],
+        'direccion': fila[f'{prefijo}direccion'],
+        'telefono': fila[f'{prefijo}telefono'],
+        'ubicacion': None if ubicacion is None else str(ubicacion),
+    }
+
+
+class FilasRepuestoGlobal:
+    """Filas de RepuestoGlobalSerializer."""
+    columnas = CAMPOS_REPUESTO_GLOBAL
+
+    def ids(self, filas):
+        return [fila['id'] for fila in filas]
+
+    def armar(self, filas, vehiculos, rangos):
+        return [_repuesto_global(fila, '', vehiculos, rangos) for fila in filas]
+
+    def construir(self, filas):
+        return self.armar(filas, *compatibilidades(self.ids(filas)))
+
+    async def aconstruir(self, filas):
+        """Igual que construir(), con las consultas del ORM asíncrono."""
+        return self.armar(filas, *await acompatibilidades(self.ids(filas)))
+
+
+class FilasRepuestoSucursal(FilasRepuestoGlobal):
+    """Filas de RepuestoSucursalSerializer."""
+    columnas = (
+        'id', 'stock', 'precio',
+        *(f'repuesto_global__{campo}' for campo in CAMPOS_REPUESTO_GLOBAL),
+        *(f'sucursal__{campo}' for campo in CAMPOS_SUCURSAL),
+    )
+
+    def ids(self, filas):
+        return {fila['repuesto_global__id'] for fila in filas}
+
+    def armar(self, filas, vehiculos, rangos):
+        return [
+            {
+                'id': fila['id'],
+                'repuesto_global': _repuesto_global(fila, 'repuesto_global__', vehiculos, rangos),
+                'sucursal': _sucursal(fila, 'sucursal__'),
+                'stock': fila['stock'],
+                'precio': formatear_decimal(fila['precio']),
+            }
+            for fila in filas
+        ]
+
+
+class ListadoRapidoMixin:
+    """
+    Mixin para vistas de listado: si la petición no elige campos (?fields=,
+    ?expand=), arma la respuesta con `filas_rapidas` en lugar del
+    serializador. Se desactiva con API_LISTADO_RAPIDO = False.
+    """
+    filas_rapidas = None
+
+    def usar_listado_rapido(self, request):
+        return (
+            self.filas_rapidas is not None
+            and getattr(settings, 'API_LISTADO_RAPIDO', True)
+            and 'fields' not in request.query_params
+            and 'expand' not in request.query_params
+        )
+
+    def get_queryset_rapido(self):
+        """Queryset filtrado de la vista, con las columnas de `filas_rapidas` (.values())."""
+        # values() descarta los select_related y .only() del planificador; los
+        # prefetch se quitan porque las relaciones múltiples se leen aparte.
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        # Las anotaciones (por ejemplo 'rank') pueden ser parte del orden del cursor.
+        return queryset.values(*self.filas_rapidas.columnas, *queryset.query.annotation_select)
+
+    def list(self, request, *args, **kwargs):
+        if not self.usar_listado_rapido(request):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.get_queryset_rapido()
+        filas = self.paginate_queryset(queryset)
+        if filas is None:
+            filas = list(queryset)
+        with medir_serializacion():
+            datos = self.filas_rapidas.construir(filas)
+        if self.paginator is None:
+            return Response(datos)
+        return self.get_paginated_response(datos)
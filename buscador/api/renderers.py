@@ -0,0 +1,33 @@
+# buscador/api/renderers.py
+# Renderer JSON de la API. Produce los mismos bytes que el JSONRenderer de DRF
+# (JSON compacto, UTF-8 sin escapar y U+2028/U+2029 escapados) y, si orjson
+# está instalado, lo usa en lugar de json. orjson no es una dependencia del
+# proyecto: sin él, la salida es la de DRF. Lo que orjson no sabe codificar
+# (Decimal, textos traducibles, ...) lo resuelve el codificador de DRF; si
+# aun así falla, o si se pide JSON indentado, se usa el JSONRenderer de DRF.
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+class JSONRapidoRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            # Las fechas pasan por el codificador de DRF, que usa otro formato que orjson.
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
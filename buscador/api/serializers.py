@@ -1,14 +1,83 @@
 from rest_framework import serializers
-from .models import Tienda, Sucursal, Categoria, Vehiculo, RepuestoGlobal, RepuestoSucursal
+from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
+from ..models import (
+    Tienda, Sucursal, Categoria, Vehiculo, CompatibilidadRango, RepuestoGlobal, RepuestoSucursal, ReservaStock
+)
+from ..compatibilidad import con_vehiculos, vehiculos_compatibles
+from ..instrumentacion import SerializacionMedidaMixin
+from ..reservas import TTL_MAXIMO
+
+
+def _lista_parametro(request, nombre):
+    return [valor.strip() for valor in request.query_params.get(nombre, '').split(',') if valor.strip()]
+
+
+# Mixin para elegir los campos de la respuesta desde la URL (solo en GET y en
+# el serializador principal, no en los anidados):
+# - ?fields=id,nombre,categoria devuelve solo esos campos.
+# - ?expand=categoria,compatibilidad devuelve esas relaciones anidadas completas.
+# Si se usa alguno de los dos parámetros, las relaciones anidadas que no se
+# expanden se devuelven como ids. Sin parámetros, la salida no cambia.
+# También mide el tiempo de serialización (ver buscador/instrumentacion.py).
+class CamposDinamicosMixin(SerializacionMedidaMixin):
+    campos_restringidos = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self._context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        pedidos = _lista_parametro(request, 'fields')
+        expandidos = set(_lista_parametro(request, 'expand'))
+        if not pedidos and not expandidos:
+            return
+
+        self.campos_restringidos = True
+        if pedidos:
+            for nombre in set(self.fields) - set(pedidos):
+                self.fields.pop(nombre)
+        for nombre, campo in list(self.fields.items()):
+            if isinstance(campo, serializers.BaseSerializer) and nombre not in expandidos:
+                self.fields[nombre] = serializers.PrimaryKeyRelatedField(
+                    source=campo.source, many=isinstance(campo, serializers.ListSerializer), read_only=True
+                )
+            elif isinstance(campo, CompatibilidadPorVehiculoField) and nombre not in expandidos:
+                campo.solo_ids = True
+
+# Mixin para que las validaciones de unicidad (UniqueValidator y
+# UniqueTogetherValidator) vean también las filas inactivas: DRF consulta el
+# manager por defecto, que las oculta, pero la restricción de la base de
+# datos las incluye.
+class UnicidadCompletaMixin:
+
+    def get_fields(self):
+        campos = super().get_fields()
+        for campo in campos.values():
+            for validador in campo.validators:
+                _incluir_inactivos(validador)
+        return campos
+
+    def get_validators(self):
+        validadores = super().get_validators()
+        for validador in validadores:
+            _incluir_inactivos(validador)
+        return validadores
+
+
+def _incluir_inactivos(validador):
+    if isinstance(validador, (UniqueValidator, UniqueTogetherValidator)):
+        manager = getattr(validador.queryset.model, 'all_objects', None)
+        if manager is not None:
+            validador.queryset = manager.all()
 
 # Serializador para el modelo Tienda.
-class TiendaSerializer(serializers.ModelSerializer):
+class TiendaSerializer(UnicidadCompletaMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Tienda
         fields = ['id', 'nombre', 'logo_url', 'email', 'telefono', 'dias_atencion', 'tiene_delivery']
 
 # Serializador para el modelo Sucursal, que incluye la tienda a la que pertenece.
-class SucursalSerializer(serializers.ModelSerializer):
+class SucursalSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     tienda = TiendaSerializer(read_only=True)
 
     class Meta:
@@ -16,29 +85,86 @@ class SucursalSerializer(serializers.ModelSerializer):
         fields = ['id', 'tienda', 'nombre', 'direccion', 'telefono', 'ubicacion']
 
 # Serializador para el modelo Categoria.
-class CategoriaSerializer(serializers.ModelSerializer):
+class CategoriaSerializer(UnicidadCompletaMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Categoria
         fields = ['id', 'nombre', 'descripcion']
 
 # Serializador para el modelo Vehiculo.
-class VehiculoSerializer(serializers.ModelSerializer):
+class VehiculoSerializer(UnicidadCompletaMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Vehiculo
         fields = ['id', 'marca', 'modelo', 'anio']
 
-# Serializador para el modelo RepuestoGlobal, que incluye la categoría y los vehículos compatibles.
-class RepuestoGlobalSerializer(serializers.ModelSerializer):
+# Serializador para los rangos de compatibilidad (marca, modelo y años consecutivos).
+class CompatibilidadRangoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    anio_desde = serializers.IntegerField(read_only=True)
+    anio_hasta = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = CompatibilidadRango
+        fields = ['marca', 'modelo', 'anio_desde', 'anio_hasta']
+
+# Compatibilidad por vehículo, un elemento por año ({id, marca, modelo, anio}),
+# como el campo 'compatibilidad' de antes de los rangos. Se arma desde los
+# rangos con sus vehículos (compatibilidad.con_vehiculos): el planificador
+# aplica preparar_queryset() al mismo Prefetch de compatibilidad_rangos.
+# Sin expandir (?fields= o ?expand=), solo los ids, como una relación.
+class CompatibilidadPorVehiculoField(serializers.Field):
+    solo_ids = False
+
+    def __init__(self, con_id=True, **kwargs):
+        self.con_id = con_id
+        super().__init__(source='rangos_compatibilidad', read_only=True, **kwargs)
+
+    def preparar_queryset(self, queryset):
+        return con_vehiculos(queryset)
+
+    def to_representation(self, relacion):
+        rangos = list(relacion.all())
+        if rangos and not hasattr(rangos[0], 'vehiculos'):
+            # Sin el Prefetch del planificador (por ejemplo, una instancia recién guardada).
+            rangos = list(con_vehiculos(relacion.all()))
+        vehiculos = vehiculos_compatibles(
+            ((r.marca, r.modelo, r.vehiculos) for r in rangos), con_id=self.con_id or self.solo_ids
+        )
+        return [v['id'] for v in vehiculos] if self.solo_ids else vehiculos
+
+# Entero del resumen de inventario: 0 si el repuesto todavía no tiene fila
+# de resumen (creado con bulk_create, sin señales), igual que en api/rapido.py.
+class ResumenEnteroField(serializers.IntegerField):
+    def get_attribute(self, instance):
+        valor = super().get_attribute(instance)
+        return 0 if valor is None else valor
+
+# Serializador para el modelo RepuestoGlobal, que incluye la categoría y la compatibilidad.
+class RepuestoGlobalSerializer(UnicidadCompletaMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     categoria = CategoriaSerializer(read_only=True)
-    compatibilidad = VehiculoSerializer(many=True, read_only=True)
+    # Vehículos compatibles, uno por año.
+    compatibilidad = CompatibilidadPorVehiculoField()
+    # La misma compatibilidad por años consecutivos.
+    compatibilidad_rangos = CompatibilidadRangoSerializer(source='rangos_compatibilidad', many=True, read_only=True)
+
+    # Resumen del inventario en todas las sucursales (tabla ResumenInventario).
+    stock_total = ResumenEnteroField(source='resumen_inventario.stock_total', read_only=True)
+    precio_minimo = serializers.DecimalField(
+        source='resumen_inventario.precio_minimo', max_digits=10, decimal_places=2, read_only=True
+    )
+    precio_maximo = serializers.DecimalField(
+        source='resumen_inventario.precio_maximo', max_digits=10, decimal_places=2, read_only=True
+    )
+    cantidad_sucursales = ResumenEnteroField(source='resumen_inventario.cantidad_sucursales', read_only=True)
 
     class Meta:
         model = RepuestoGlobal
-        fields = ['id', 'nombre', 'descripcion', 'codigo', 'cantidad', 'imagen_url', 'categoria', 'compatibilidad']
+        fields = [
+            'id', 'nombre', 'descripcion', 'codigo', 'cantidad', 'imagen_url', 'categoria', 'compatibilidad',
+            'compatibilidad_rangos', 'stock_total', 'precio_minimo', 'precio_maximo', 'cantidad_sucursales'
+        ]
 
 # Serializador para el modelo RepuestoSucursal.
 # Este serializador es clave para mostrar el precio y el stock de un repuesto en una sucursal específica.
-class RepuestoSucursalSerializer(serializers.ModelSerializer):
+class RepuestoSucursalSerializer(UnicidadCompletaMixin, CamposDinamicosMixin, serializers.ModelSerializer):
     repuesto_global = RepuestoGlobalSerializer(read_only=True)
     sucursal = SucursalSerializer(read_only=True)
 
@@ -46,110 +172,51 @@ class RepuestoSucursalSerializer(serializers.ModelSerializer):
         model = RepuestoSucursal
         fields = ['id', 'repuesto_global', 'sucursal', 'stock', 'precio']
 
-```python
-# project_name/api/views.py
-# Este archivo define las "vistas" de la API que manejan las peticiones HTTP.
-from rest_framework import generics
-from .models import Tienda, Sucursal, Categoria, Vehiculo, RepuestoGlobal, RepuestoSucursal
-from .serializers import (
-    TiendaSerializer, SucursalSerializer, CategoriaSerializer,
-    VehiculoSerializer, RepuestoGlobalSerializer, RepuestoSucursalSerializer
-)
+# Serializador para las ofertas cercanas: agrega la distancia en metros al punto consultado.
+class RepuestoSucursalCercanoSerializer(RepuestoSucursalSerializer):
+    distancia = serializers.FloatField(read_only=True)
 
-# Vistas para el modelo Tienda.
-class TiendaList(generics.ListAPIView):
-    queryset = Tienda.objects.all()
-    serializer_class = TiendaSerializer
-
-class TiendaDetail(generics.RetrieveAPIView):
-    queryset = Tienda.objects.all()
-    serializer_class = TiendaSerializer
-
-# Vistas para el modelo Sucursal.
-class SucursalList(generics.ListAPIView):
-    queryset = Sucursal.objects.all()
-    serializer_class = SucursalSerializer
-
-class SucursalDetail(generics.RetrieveAPIView):
-    queryset = Sucursal.objects.all()
-    serializer_class = SucursalSerializer
-
-# Vistas para el modelo Categoria.
-class CategoriaList(generics.ListAPIView):
-    queryset = Categoria.objects.all()
-    serializer_class = CategoriaSerializer
-
-class CategoriaDetail(generics.RetrieveAPIView):
-    queryset = Categoria.objects.all()
-    serializer_class = CategoriaSerializer
-
-# Vistas para el modelo Vehiculo.
-class VehiculoList(generics.ListAPIView):
-    queryset = Vehiculo.objects.all()
-    serializer_class = VehiculoSerializer
-
-class VehiculoDetail(generics.RetrieveAPIView):
-    queryset = Vehiculo.objects.all()
-    serializer_class = VehiculoSerializer
-
-# Vistas para el modelo RepuestoGlobal.
-class RepuestoGlobalList(generics.ListAPIView):
-    queryset = RepuestoGlobal.objects.all()
-    serializer_class = RepuestoGlobalSerializer
-
-class RepuestoGlobalDetail(generics.RetrieveAPIView):
-    queryset = RepuestoGlobal.objects.all()
-    serializer_class = RepuestoGlobalSerializer
-
-# Vistas para el modelo RepuestoSucursal.
-# Esta vista es útil para encontrar dónde se vende un repuesto específico.
-class RepuestoSucursalList(generics.ListAPIView):
-    serializer_class = RepuestoSucursalSerializer
-
-    def get_queryset(self):
-        # Permite filtrar por el ID del repuesto global
-        repuesto_id = self.request.query_params.get('repuesto_id')
-        if repuesto_id:
-            return RepuestoSucursal.objects.filter(repuesto_global__id=repuesto_id)
-        return RepuestoSucursal.objects.all()
-
-class RepuestoSucursalDetail(generics.RetrieveAPIView):
-    queryset = RepuestoSucursal.objects.all()
-    serializer_class = RepuestoSucursalSerializer
-
-```python
-# project_name/api/urls.py
-# Este archivo mapea las URLs de la API a las vistas correspondientes.
-from django.urls import path
-from .views import (
-    TiendaList, TiendaDetail, SucursalList, SucursalDetail,
-    CategoriaList, CategoriaDetail, VehiculoList, VehiculoDetail,
-    RepuestoGlobalList, RepuestoGlobalDetail, RepuestoSucursalList,
-    RepuestoSucursalDetail
-)
+    class Meta(RepuestoSucursalSerializer.Meta):
+        fields = RepuestoSucursalSerializer.Meta.fields + ['distancia']
 
-urlpatterns = [
-    # URLs para Tiendas
-    path('tiendas/', TiendaList.as_view(), name='tienda-list'),
-    path('tiendas/<int:pk>/', TiendaDetail.as_view(), name='tienda-detail'),
+# Serializador del inventario de un repuesto en una sucursal, sin repetir el repuesto.
+class InventarioSucursalSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    sucursal = SucursalSerializer(read_only=True)
 
-    # URLs para Sucursales
-    path('sucursales/', SucursalList.as_view(), name='sucursal-list'),
-    path('sucursales/<int:pk>/', SucursalDetail.as_view(), name='sucursal-detail'),
+    class Meta:
+        model = RepuestoSucursal
+        fields = ['id', 'sucursal', 'stock', 'precio']
 
-    # URLs para Categorías
-    path('categorias/', CategoriaList.as_view(), name='categoria-list'),
-    path('categorias/<int:pk>/', CategoriaDetail.as_view(), name='categoria-detail'),
+# Serializador para el detalle de un repuesto, con su inventario en todas las sucursales.
+class RepuestoGlobalConInventarioSerializer(RepuestoGlobalSerializer):
+    inventario = InventarioSucursalSerializer(source='repuestosucursal_set', many=True, read_only=True)
 
-    # URLs para Vehículos
-    path('vehiculos/', VehiculoList.as_view(), name='vehiculo-list'),
-    path('vehiculos/<int:pk>/', VehiculoDetail.as_view(), name='vehiculo-detail'),
+    class Meta(RepuestoGlobalSerializer.Meta):
+        fields = RepuestoGlobalSerializer.Meta.fields + ['inventario']
 
-    # URLs para RepuestosGlobales
-    path('repuestos-globales/', RepuestoGlobalList.as_view(), name='repuesto-global-list'),
-    path('repuestos-globales/<int:pk>/', RepuestoGlobalDetail.as_view(), name='repuesto-global-detail'),
+# Serializador para la comparación de precios: el repuesto con sus ofertas con stock más baratas.
+class RepuestoGlobalOfertasSerializer(RepuestoGlobalSerializer):
+    ofertas = InventarioSucursalSerializer(source='ofertas_mas_baratas', many=True, read_only=True)
 
-    # URLs para RepuestosSucursales
-    path('repuestos-sucursales/', RepuestoSucursalList.as_view(), name='repuesto-sucursal-list'),
-    path('repuestos-sucursales/<int:pk>/', RepuestoSucursalDetail.as_view(), name='repuesto-sucursal-detail'),
-]
+    class Meta(RepuestoGlobalSerializer.Meta):
+        fields = RepuestoGlobalSerializer.Meta.fields + ['ofertas']
+
+# Serializadores de las reservas de stock (ver buscador/reservas.py).
+class ReservaStockSerializer(SerializacionMedidaMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ReservaStock
+        fields = ['id', 'oferta', 'cantidad', 'estado', 'vence']
+
+# Datos de entrada para reservar una oferta: /api/repuestos-sucursales/<pk>/reservar/.
+class ReservarSerializer(serializers.Serializer):
+    cantidad = serializers.IntegerField(min_value=1)
+    ttl = serializers.IntegerField(min_value=1, max_value=TTL_MAXIMO, required=False)
+
+class LineaReservaSerializer(serializers.Serializer):
+    oferta = serializers.IntegerField(min_value=1)
+    cantidad = serializers.IntegerField(min_value=1)
+
+# Datos de entrada para reservar un pedido de varias líneas: /api/reservas/.
+class PedidoReservaSerializer(serializers.Serializer):
+    lineas = LineaReservaSerializer(many=True, allow_empty=False)
+    ttl = serializers.IntegerField(min_value=1, max_value=TTL_MAXIMO, required=False)
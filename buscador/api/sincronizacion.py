@@ -0,0 +1,179 @@
+# buscador/api/sincronizacion.py
+# Sincronización incremental para la app móvil y los socios: en lugar de
+# volver a descargar los listados completos, el cliente pide los cambios
+# desde su marca de agua (/api/sync/<recurso>/?desde=...) y recibe:
+# - cambios: las filas creadas o modificadas, planas (las relaciones como ids,
+#   igual que los listados con ?fields=).
+# - eliminados: los ids borrados (tabla Eliminacion) o desactivados (activo=False).
+# - marca_agua: opaca, para la próxima petición; hay_mas indica que hay que
+#   pedir otra vez enseguida.
+#
+# Las filas se leen en orden de (fecha_actualizacion, id), con el índice de
+# esas columnas de cada modelo, a partir de la última fila enviada. Una
+# transacción que todavía no se confirmó (una importación masiva, el
+# generador) puede haber escrito filas y registros de Eliminacion con fechas
+# más viejas que las de filas ya confirmadas; al confirmarse quedarían atrás
+# de la marca de agua. Por eso solo se envían las filas anteriores al
+# horizonte: el inicio de la transacción abierta más vieja que ya escribió
+# (pg_stat_activity), o ahora si no hay ninguna, menos MARGEN. Las fechas
+# se toman del reloj de la aplicación y el horizonte del de la base: MARGEN
+# cubre la diferencia entre los dos relojes y el instante entre que save()
+# calcula la fecha y la transacción escribe.
+import base64
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.gis.geos import GEOSGeometry
+from django.db import connection
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import Categoria, Eliminacion, RepuestoGlobal, RepuestoSucursal, Sucursal, Tienda, Vehiculo
+from .rapido import compatibilidades, formatear_decimal
+
+LIMITE_POR_DEFECTO = 500
+LIMITE_MAXIMO = 2000
+
+
+class MarcaInvalida(ValueError):
+    pass
+
+
+class Recurso:
+    """Un modelo sincronizable y las columnas que se envían de cada fila."""
+
+    def __init__(self, modelo, columnas):
+        self.modelo = modelo
+        self.columnas = columnas
+
+    def construir(self, filas):
+        return [{columna: _valor(fila[columna]) for columna in self.columnas} for fila in filas]
+
+
+class RecursoRepuestos(Recurso):
+    """Los repuestos llevan además los ids de los vehículos compatibles y los rangos de compatibilidad."""
+
+    def construir(self, filas):
+        vehiculos, rangos = compatibilidades([fila['id'] for fila in filas])
+        return [
+            {
+                **fila,
+                'compatibilidad': sorted(vehiculo['id'] for vehiculo in vehiculos.get(fila['id'], [])),
+                'compatibilidad_rangos': rangos.get(fila['id'], []),
+            }
+            for fila in super().construir(filas)
+        ]
+
+
+RECURSOS = {
+    'tiendas': Recurso(Tienda, ('id', 'nombre', 'logo_url', 'email', 'telefono', 'dias_atencion', 'tiene_delivery')),
+    'sucursales': Recurso(Sucursal, ('id', 'tienda', 'nombre', 'direccion', 'telefono', 'ubicacion')),
+    'categorias': Recurso(Categoria, ('id', 'nombre', 'descripcion')),
+    'vehiculos': Recurso(Vehiculo, ('id', 'marca', 'modelo', 'anio')),
+    'repuestos-globales': RecursoRepuestos(
+        RepuestoGlobal, ('id', 'nombre', 'descripcion', 'codigo', 'cantidad', 'imagen_url', 'categoria')
+    ),
+    'repuestos-sucursales': Recurso(RepuestoSucursal, ('id', 'repuesto_global', 'sucursal', 'stock', 'precio')),
+}
+
+
+def _valor(valor):
+    """Mismo formato que los serializadores: decimales con dos cifras y ubicación en EWKT."""
+    if isinstance(valor, GEOSGeometry):
+        return str(valor)
+    if isinstance(valor, Decimal):
+        return formatear_decimal(valor)
+    return valor
+
+
+# -------------------------------------------------------------
+# Marca de agua: {'f': fecha_actualizacion, 'i': id} de la última fila
+# enviada y {'e': id} del último registro de Eliminacion enviado.
+# -------------------------------------------------------------
+def codificar_marca(marca):
+    return base64.urlsafe_b64encode(json.dumps(marca, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decodificar_marca(texto):
+    try:
+        marca = json.loads(base64.urlsafe_b64decode(texto.encode('ascii')))
+        fecha, id_, eliminacion = marca['f'], marca['i'], marca['e']
+    except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+        raise MarcaInvalida(texto)
+    if fecha is not None and (not isinstance(fecha, str) or parse_datetime(fecha) is None):
+        raise MarcaInvalida(texto)
+    if not isinstance(id_, int) or not isinstance(eliminacion, int):
+        raise MarcaInvalida(texto)
+    return {'f': fecha, 'i': id_, 'e': eliminacion}
+
+
+# Inicio de la transacción abierta más vieja (de otra conexión) que ya
+# escribió algo; NULL si no hay ninguna. Las transacciones se abren en la
+# primaria, así que se consulta siempre en 'default'.
+SQL_TRANSACCION_MAS_VIEJA = """
+    SELECT min(xact_start) FROM pg_stat_activity
+    WHERE datname = current_database() AND backend_xid IS NOT NULL AND pid <> pg_backend_pid()
+"""
+
+
+def horizonte():
+    """Fecha hasta la que las filas ya no pueden cambiar por transacciones abiertas."""
+    with connection.cursor() as cursor:
+        cursor.execute(SQL_TRANSACCION_MAS_VIEJA)
+        mas_vieja = cursor.fetchone()[0]
+    ahora = timezone.now()
+    margen = timedelta(seconds=getattr(settings, 'SINCRONIZACION_MARGEN', 5))
+    return (min(ahora, mas_vieja) if mas_vieja else ahora) - margen
+
+
+def cambios_desde(recurso, marca=None, limite=LIMITE_POR_DEFECTO):
+    """
+    Cambios del recurso desde la marca de agua (sin marca: todas las filas
+    activas, para la primera sincronización). Devuelve un diccionario con
+    cambios, eliminados, marca_agua y hay_mas.
+    """
+    modelo = recurso.modelo
+    etiqueta = modelo._meta.label_lower
+    hasta = horizonte()
+    eliminaciones = Eliminacion.objects.filter(modelo=etiqueta, fecha__lt=hasta)
+
+    if marca is None:
+        # La primera sincronización no necesita las filas inactivas ni los borrados anteriores.
+        filas = modelo.objects.all()
+        marca = {
+            'f': None, 'i': 0,
+            'e': eliminaciones.aggregate(ultima=Max('id'))['ultima'] or 0,
+        }
+    else:
+        filas = modelo.all_objects.all()
+        if marca['f'] is not None:
+            fecha = parse_datetime(marca['f'])
+            filas = filas.filter(
+                Q(fecha_actualizacion__gt=fecha) | Q(fecha_actualizacion=fecha, id__gt=marca['i'])
+            )
+
+    filas = list(
+        filas.filter(fecha_actualizacion__lt=hasta)
+        .order_by('fecha_actualizacion', 'id')
+        .values(*recurso.columnas, 'activo', 'fecha_actualizacion')[:limite + 1]
+    )
+    borrados = list(
+        eliminaciones.filter(id__gt=marca['e']).order_by('id').values_list('id', 'objeto_id')[:limite + 1]
+    )
+    hay_mas = len(filas) > limite or len(borrados) > limite
+    filas, borrados = filas[:limite], borrados[:limite]
+
+    nueva = dict(marca)
+    if filas:
+        nueva['f'], nueva['i'] = filas[-1]['fecha_actualizacion'].isoformat(), filas[-1]['id']
+    if borrados:
+        nueva['e'] = borrados[-1][0]
+    return {
+        'cambios': recurso.construir([fila for fila in filas if fila['activo']]),
+        'eliminados': [fila['id'] for fila in filas if not fila['activo']] + [id_ for _, id_ in borrados],
+        'marca_agua': codificar_marca(nueva),
+        'hay_mas': hay_mas,
+    }
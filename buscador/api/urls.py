@@ -1,11 +1,15 @@
 # buscador/api/urls.py
 # Este archivo mapea las URLs de la API a las vistas correspondientes.
 from django.urls import path
+from . import asincrono
 from .views import (
     TiendaList, TiendaDetail, SucursalList, SucursalDetail,
     CategoriaList, CategoriaDetail, VehiculoList, VehiculoDetail,
     RepuestoGlobalList, RepuestoGlobalDetail, RepuestoSucursalList,
-    RepuestoSucursalDetail
+    RepuestoSucursalDetail, RepuestoSucursalCercanosList, ImportarInventarioView,
+    RepuestosCompatiblesList, RepuestoGlobalFacetasView, SugerenciasView, ExportacionView,
+    ComparacionPreciosList, RepuestoGlobalHistorialPreciosView, RepuestoSucursalHistorialPreciosView,
+    SincronizacionView, ReservarOfertaView, ReservasView, ConfirmarReservaView, LiberarReservaView
 )
 
 urlpatterns = [
@@ -16,6 +20,7 @@ urlpatterns = [
     # URLs para Sucursales
     path('sucursales/', SucursalList.as_view(), name='sucursal-list'),
     path('sucursales/<int:pk>/', SucursalDetail.as_view(), name='sucursal-detail'),
+    path('sucursales/<int:pk>/importar-inventario/', ImportarInventarioView.as_view(), name='sucursal-importar-inventario'),
 
     # URLs para Categorías
     path('categorias/', CategoriaList.as_view(), name='categoria-list'),
@@ -27,9 +32,39 @@ urlpatterns = [
 
     # URLs para RepuestosGlobales
     path('repuestos-globales/', RepuestoGlobalList.as_view(), name='repuesto-global-list'),
+    path('repuestos-globales/facetas/', RepuestoGlobalFacetasView.as_view(), name='repuesto-global-facetas'),
     path('repuestos-globales/<int:pk>/', RepuestoGlobalDetail.as_view(), name='repuesto-global-detail'),
+    path('repuestos-globales/<int:pk>/cercanos/', RepuestoSucursalCercanosList.as_view(), name='repuesto-global-cercanos'),
+    path('repuestos-globales/<int:pk>/historial-precios/', RepuestoGlobalHistorialPreciosView.as_view(), name='repuesto-global-historial-precios'),
+
+    # Autocompletado del buscador
+    path('sugerencias/', SugerenciasView.as_view(), name='sugerencias'),
+
+    # Repuestos compatibles con un vehículo (marca, modelo, año o vehiculo_id)
+    path('fitment/', RepuestosCompatiblesList.as_view(), name='fitment'),
+
+    # Ofertas con stock más baratas de cada repuesto entre todas las tiendas
+    path('comparar-precios/', ComparacionPreciosList.as_view(), name='comparar-precios'),
 
     # URLs para RepuestosSucursales
     path('repuestos-sucursales/', RepuestoSucursalList.as_view(), name='repuesto-sucursal-list'),
     path('repuestos-sucursales/<int:pk>/', RepuestoSucursalDetail.as_view(), name='repuesto-sucursal-detail'),
+    path('repuestos-sucursales/<int:pk>/historial-precios/', RepuestoSucursalHistorialPreciosView.as_view(), name='repuesto-sucursal-historial-precios'),
+    path('repuestos-sucursales/<int:pk>/reservar/', ReservarOfertaView.as_view(), name='repuesto-sucursal-reservar'),
+
+    # Reservas de stock (pedidos de varias líneas, confirmación y liberación)
+    path('reservas/', ReservasView.as_view(), name='reserva-list'),
+    path('reservas/<uuid:pedido>/confirmar/', ConfirmarReservaView.as_view(), name='reserva-confirmar'),
+    path('reservas/<uuid:pedido>/liberar/', LiberarReservaView.as_view(), name='reserva-liberar'),
+
+    # Lecturas con vistas asíncronas (para servir con ASGI, ver core/gunicorn.conf.py)
+    path('async/repuestos-globales/', asincrono.repuestos_globales, name='async-repuesto-global-list'),
+    path('async/repuestos-globales/<int:pk>/cercanos/', asincrono.repuestos_cercanos, name='async-repuesto-global-cercanos'),
+
+    # Exportación completa en streaming (NDJSON o CSV)
+    path('export/repuestos.<str:formato>', ExportacionView.as_view(), {'recurso': 'repuestos'}, name='export-repuestos'),
+    path('export/inventario.<str:formato>', ExportacionView.as_view(), {'recurso': 'inventario'}, name='export-inventario'),
+
+    # Sincronización incremental (cambios desde una marca de agua)
+    path('sync/<str:recurso>/', SincronizacionView.as_view(), name='sync'),
 ]
@@ -1,35 +1,59 @@
 # buscador/api/views.py
 # Este archivo contiene las vistas de la API para los diferentes modelos.
-from rest_framework import generics, filters
+import io
+from datetime import date, timedelta
+
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import generics, status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import rest_framework as filters_drf
-from ..models import RepuestoGlobal, Tienda, Vehiculo, Categoria, RepuestoSucursal, Sucursal
+from ..busqueda import BusquedaRepuestosFilter
+from ..cache import CacheRespuestaMixin
+from ..compatibilidad import filtrar_compatibles, rangos_compatibles, rangos_del_vehiculo
+from ..facetas import FACETAS, contar_facetas
+from ..geo import repuestos_cercanos
+from ..historial import serie_diaria
+from ..importacion import FORMATOS, importar_inventario
+from ..precios import con_ofertas, ofertas_mas_baratas
+from ..replicas import LecturaReplicaMixin
+from ..reservas import ReservaNoPendiente, StockInsuficiente, confirmar, liberar, reservar
+from ..sugerencias import LIMITE_MAXIMO, LIMITE_POR_DEFECTO, TIPOS, sugerir
+from .exportacion import FORMATOS as FORMATOS_EXPORTACION, RECURSOS, respuesta_exportacion
+from .optimizacion import ConsultaOptimizadaMixin
+from .sincronizacion import (
+    LIMITE_MAXIMO as LIMITE_SINCRONIZACION, LIMITE_POR_DEFECTO as LIMITE_SINCRONIZACION_POR_DEFECTO,
+    RECURSOS as RECURSOS_SINCRONIZACION, MarcaInvalida, cambios_desde, decodificar_marca
+)
+from .rapido import FilasRepuestoGlobal, FilasRepuestoSucursal, ListadoRapidoMixin, formatear_decimal
+from ..models import (
+    RepuestoGlobal, Tienda, Vehiculo, Categoria, RepuestoSucursal, Sucursal, ResumenInventario, HistorialPrecio
+)
 from .serializers import (
     RepuestoGlobalSerializer, TiendaSerializer, RepuestoGlobalConInventarioSerializer,
-    SucursalSerializer, CategoriaSerializer, VehiculoSerializer, RepuestoSucursalSerializer
+    SucursalSerializer, CategoriaSerializer, VehiculoSerializer, RepuestoSucursalSerializer,
+    RepuestoSucursalCercanoSerializer, RepuestoGlobalOfertasSerializer, ReservaStockSerializer,
+    ReservarSerializer, PedidoReservaSerializer
 )
 
 # --- Filtros Personalizados ---
 class RepuestoGlobalFilter(filters_drf.FilterSet):
     """
     Filtro personalizado para el modelo RepuestoGlobal.
-    Permite filtrar por marca, modelo y año del vehículo compatible,
-    y por categoría del repuesto.
+    Permite filtrar por marca, modelo y año del vehículo compatible (o
+    directamente por vehiculo_id), y por categoría del repuesto.
     """
-    # Filtro por marca del vehículo.
-    marca = filters_drf.CharFilter(
-        field_name='compatibilidad__marca',
-        lookup_expr='iexact'
-    )
-    # Filtro por modelo del vehículo.
-    modelo = filters_drf.CharFilter(
-        field_name='compatibilidad__modelo',
-        lookup_expr='iexact'
-    )
-    # Filtro por año del vehículo.
-    anio = filters_drf.NumberFilter(
-        field_name='compatibilidad__anio'
-    )
+    # Filtros del vehículo compatible. Se aplican juntos en filter_queryset,
+    # para que marca, modelo y año se refieran al mismo vehículo.
+    marca = filters_drf.CharFilter(method='filtrar_vehiculo')
+    modelo = filters_drf.CharFilter(method='filtrar_vehiculo')
+    anio = filters_drf.NumberFilter(method='filtrar_vehiculo')
+    vehiculo_id = filters_drf.NumberFilter(method='filtrar_vehiculo')
     # Filtro por categoría del repuesto.
     categoria_id = filters_drf.NumberFilter(
         field_name='categoria__id'
@@ -37,17 +61,35 @@ class RepuestoGlobalFilter(filters_drf.FilterSet):
 
     class Meta:
         model = RepuestoGlobal
-        fields = ['marca', 'modelo', 'anio', 'categoria_id']
+        fields = ['marca', 'modelo', 'anio', 'vehiculo_id', 'categoria_id']
+
+    def filtrar_vehiculo(self, queryset, name, value):
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        datos = self.form.cleaned_data
+        if datos.get('vehiculo_id') is not None:
+            return filtrar_compatibles(queryset, rangos_del_vehiculo(int(datos['vehiculo_id'])))
+        anio = datos.get('anio')
+        if datos.get('marca') or datos.get('modelo') or anio is not None:
+            rangos = rangos_compatibles(
+                datos.get('marca'), datos.get('modelo'), int(anio) if anio is not None else None
+            )
+            queryset = filtrar_compatibles(queryset, rangos)
+        return queryset
 
 # --- Vistas para Tiendas ---
-class TiendaList(generics.ListCreateAPIView):
+class TiendaList(LecturaReplicaMixin, CacheRespuestaMixin, ConsultaOptimizadaMixin, generics.ListCreateAPIView):
     """
     Vista para listar todas las tiendas o crear una nueva.
     """
+    # Modelos cuyos cambios invalidan la respuesta en caché.
+    modelos_cache = [Tienda]
     queryset = Tienda.objects.all()
     serializer_class = TiendaSerializer
 
-class TiendaDetail(generics.RetrieveUpdateDestroyAPIView):
+class TiendaDetail(LecturaReplicaMixin, ConsultaOptimizadaMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Vista para ver, actualizar o eliminar una tienda específica.
     """
@@ -55,14 +97,16 @@ class TiendaDetail(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = TiendaSerializer
 
 # --- Vistas para Sucursales ---
-class SucursalList(generics.ListCreateAPIView):
+class SucursalList(LecturaReplicaMixin, CacheRespuestaMixin, ConsultaOptimizadaMixin, generics.ListCreateAPIView):
     """
     Vista para listar todas las sucursales o crear una nueva.
     """
+    # Modelos cuyos cambios invalidan la respuesta en caché.
+    modelos_cache = [Sucursal, Tienda]
     queryset = Sucursal.objects.all()
     serializer_class = SucursalSerializer
 
-class SucursalDetail(generics.RetrieveUpdateDestroyAPIView):
+class SucursalDetail(LecturaReplicaMixin, ConsultaOptimizadaMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Vista para ver, actualizar o eliminar una sucursal específica.
     """
@@ -70,14 +114,16 @@ class SucursalDetail(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = SucursalSerializer
 
 # --- Vistas para Categorías ---
-class CategoriaList(generics.ListCreateAPIView):
+class CategoriaList(LecturaReplicaMixin, CacheRespuestaMixin, ConsultaOptimizadaMixin, generics.ListCreateAPIView):
     """
     Vista para listar todas las categorías o crear una nueva.
     """
+    # Modelos cuyos cambios invalidan la respuesta en caché.
+    modelos_cache = [Categoria]
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
 
-class CategoriaDetail(generics.RetrieveUpdateDestroyAPIView):
+class CategoriaDetail(LecturaReplicaMixin, ConsultaOptimizadaMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Vista para ver, actualizar o eliminar una categoría específica.
     """
@@ -85,14 +131,16 @@ class CategoriaDetail(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = CategoriaSerializer
 
 # --- Vistas para Vehículos ---
-class VehiculoList(generics.ListCreateAPIView):
+class VehiculoList(LecturaReplicaMixin, CacheRespuestaMixin, ConsultaOptimizadaMixin, generics.ListCreateAPIView):
     """
     Vista para listar todos los vehículos o crear uno nuevo.
     """
+    # Modelos cuyos cambios invalidan la respuesta en caché.
+    modelos_cache = [Vehiculo]
     queryset = Vehiculo.objects.all()
     serializer_class = VehiculoSerializer
 
-class VehiculoDetail(generics.RetrieveUpdateDestroyAPIView):
+class VehiculoDetail(LecturaReplicaMixin, ConsultaOptimizadaMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Vista para ver, actualizar o eliminar un vehículo específico.
     """
@@ -100,26 +148,54 @@ class VehiculoDetail(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = VehiculoSerializer
 
 # --- Vistas para Repuestos Globales ---
-class RepuestoGlobalList(generics.ListAPIView):
+class RepuestoGlobalList(
+    LecturaReplicaMixin, CacheRespuestaMixin, ListadoRapidoMixin, ConsultaOptimizadaMixin, generics.ListAPIView
+):
     """
     Vista que devuelve una lista de todos los repuestos globales.
     Soporta búsqueda y filtrado por nombre, categoría, marca, modelo y año.
     """
+    # Modelos cuyos cambios invalidan la respuesta en caché.
+    modelos_cache = [RepuestoGlobal, Categoria, Vehiculo, ResumenInventario]
     # Consulta base para obtener todos los repuestos.
     queryset = RepuestoGlobal.objects.all()
     # Serializador que convierte los objetos de Django a JSON.
     serializer_class = RepuestoGlobalSerializer
+    # Mismas filas que el serializador, armadas desde .values() (ver api/rapido.py).
+    filas_rapidas = FilasRepuestoGlobal()
 
-    # Filtros de búsqueda y ordenación de la API.
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    # Filtros de la API. La búsqueda de texto libre (?search= o ?q=) usa el índice
+    # de texto completo sobre nombre, código, descripción, categoría y vehículos;
+    # con ?fuzzy=1 usa los índices de trigramas sobre el código y el nombre.
+    filter_backends = [DjangoFilterBackend, BusquedaRepuestosFilter]
 
     # Clase de filtro personalizada.
     filterset_class = RepuestoGlobalFilter
 
-    # Campos por los que se puede realizar una búsqueda de texto libre.
-    search_fields = ['nombre', 'descripcion', 'compatibilidad__marca', 'compatibilidad__modelo']
+class RepuestoGlobalFacetasView(LecturaReplicaMixin, CacheRespuestaMixin, generics.ListAPIView):
+    """
+    Vista que devuelve los conteos por faceta (categoria, marca, modelo y anio)
+    de los repuestos que cumplen los mismos filtros y búsqueda que el listado.
+    ?facets=categoria,marca elige las facetas (por defecto, todas).
+    """
+    # Modelos cuyos cambios invalidan la respuesta en caché.
+    modelos_cache = [RepuestoGlobal, Categoria, Vehiculo]
+    queryset = RepuestoGlobal.objects.all()
+    filter_backends = RepuestoGlobalList.filter_backends
+    filterset_class = RepuestoGlobalFilter
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        pedidas = request.query_params.get('facets')
+        facetas = [f.strip() for f in pedidas.split(',') if f.strip()] if pedidas else list(FACETAS)
+        desconocidas = [f for f in facetas if f not in FACETAS]
+        if desconocidas:
+            raise ValidationError({
+                'facets': f"Facetas desconocidas: {', '.join(desconocidas)}. Opciones: {', '.join(FACETAS)}."
+            })
+        return Response(contar_facetas(self.filter_queryset(self.get_queryset()), facetas))
 
-class RepuestoGlobalDetail(generics.RetrieveAPIView):
+class RepuestoGlobalDetail(LecturaReplicaMixin, ConsultaOptimizadaMixin, generics.RetrieveAPIView):
     """
     Vista para obtener los detalles de un repuesto, incluyendo el inventario en todas las sucursales.
     """
@@ -127,17 +203,389 @@ class RepuestoGlobalDetail(generics.RetrieveAPIView):
     serializer_class = RepuestoGlobalConInventarioSerializer
     lookup_field = 'pk'
 
+class RepuestosCompatiblesList(LecturaReplicaMixin, CacheRespuestaMixin, ConsultaOptimizadaMixin, generics.ListAPIView):
+    """
+    Vista de compatibilidad (/api/fitment/): repuestos que sirven para un vehículo.
+    Parámetros: vehiculo_id, o marca (obligatoria) con modelo y anio opcionales;
+    además categoria_id y búsqueda de texto (?search=).
+    Los repuestos se filtran con un EXISTS sobre los rangos de compatibilidad.
+    """
+    # Modelos cuyos cambios invalidan la respuesta en caché.
+    modelos_cache = [RepuestoGlobal, Categoria, Vehiculo, ResumenInventario]
+    queryset = RepuestoGlobal.objects.all()
+    serializer_class = RepuestoGlobalSerializer
+    filter_backends = [BusquedaRepuestosFilter]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        parametros = self.request.query_params
+        vehiculo_id = self.get_entero(parametros, 'vehiculo_id')
+        if vehiculo_id is not None:
+            rangos = rangos_del_vehiculo(vehiculo_id)
+        else:
+            marca = parametros.get('marca', '').strip()
+            if not marca:
+                raise ValidationError({'marca': 'Indique la marca del vehículo o vehiculo_id.'})
+            rangos = rangos_compatibles(
+                marca, parametros.get('modelo', '').strip(), self.get_entero(parametros, 'anio')
+            )
+
+        categoria_id = self.get_entero(parametros, 'categoria_id')
+        if categoria_id is not None:
+            queryset = queryset.filter(categoria_id=categoria_id)
+        return filtrar_compatibles(queryset, rangos)
+
+    def get_entero(self, parametros, nombre):
+        valor = parametros.get(nombre, '').strip()
+        if not valor:
+            return None
+        if not valor.isdigit():
+            raise ValidationError({nombre: 'Debe ser un número entero.'})
+        return int(valor)
+
+class ComparacionPreciosList(LecturaReplicaMixin, CacheRespuestaMixin, ConsultaOptimizadaMixin, generics.ListAPIView):
+    """
+    Vista de comparación de precios (/api/comparar-precios/): repuestos con
+    stock y sus ofertas más baratas entre todas las tiendas, con la sucursal
+    y la tienda. Acepta los filtros y la búsqueda del listado de repuestos
+    (marca, modelo, anio, vehiculo_id, categoria_id, ?search=) y repuesto_id.
+    ?ofertas= indica cuántas ofertas por repuesto (por defecto 3).
+    """
+    # Modelos cuyos cambios invalidan la respuesta en caché.
+    modelos_cache = [RepuestoGlobal, Categoria, Vehiculo, ResumenInventario, RepuestoSucursal, Sucursal, Tienda]
+    queryset = RepuestoGlobal.objects.all()
+    serializer_class = RepuestoGlobalOfertasSerializer
+    filter_backends = [DjangoFilterBackend, BusquedaRepuestosFilter]
+    filterset_class = RepuestoGlobalFilter
+
+    ofertas_por_defecto = 3
+    ofertas_maximo = 20
+
+    def get_queryset(self):
+        parametros = self.request.query_params
+        ofertas = parametros.get('ofertas', '').strip()
+        if ofertas and (not ofertas.isdigit() or not 1 <= int(ofertas) <= self.ofertas_maximo):
+            raise ValidationError({'ofertas': f'Debe ser un número entre 1 y {self.ofertas_maximo}.'})
+        self.limite_ofertas = int(ofertas or self.ofertas_por_defecto)
+
+        queryset = con_ofertas(super().get_queryset())
+        repuesto_id = parametros.get('repuesto_id', '').strip()
+        if repuesto_id:
+            if not repuesto_id.isdigit():
+                raise ValidationError({'repuesto_id': 'Debe ser un número entero.'})
+            queryset = queryset.filter(pk=int(repuesto_id))
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        # Las ofertas se buscan para toda la página en una sola consulta.
+        pagina = super().paginate_queryset(queryset)
+        return ofertas_mas_baratas(pagina if pagina is not None else list(queryset), self.limite_ofertas)
+
 # --- Vistas para Repuestos por Sucursal ---
-class RepuestoSucursalList(generics.ListCreateAPIView):
+class RepuestoSucursalList(
+    LecturaReplicaMixin, ListadoRapidoMixin, ConsultaOptimizadaMixin, generics.ListCreateAPIView
+):
     """
     Vista para listar todos los repuestos por sucursal o crear uno nuevo.
+    Permite filtrar por el repuesto global (?repuesto_id=) para saber dónde se vende.
     """
     queryset = RepuestoSucursal.objects.all()
     serializer_class = RepuestoSucursalSerializer
+    # Mismas filas que el serializador, armadas desde .values() (ver api/rapido.py).
+    filas_rapidas = FilasRepuestoSucursal()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        repuesto_id = self.request.query_params.get('repuesto_id')
+        if repuesto_id:
+            if not repuesto_id.isdigit():
+                raise ValidationError({'repuesto_id': 'Debe ser un número entero.'})
+            queryset = queryset.filter(repuesto_global_id=repuesto_id)
+        return queryset
 
-class RepuestoSucursalDetail(generics.RetrieveUpdateDestroyAPIView):
+class RepuestoSucursalDetail(LecturaReplicaMixin, ConsultaOptimizadaMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Vista para ver, actualizar o eliminar un repuesto de sucursal específico.
     """
     queryset = RepuestoSucursal.objects.all()
     serializer_class = RepuestoSucursalSerializer
+
+class RepuestoSucursalCercanosList(LecturaReplicaMixin, ConsultaOptimizadaMixin, generics.ListAPIView):
+    """
+    Vista que devuelve dónde comprar un repuesto cerca de un punto:
+    las sucursales con stock, ordenadas por distancia (en metros).
+    Parámetros: lat, lng (obligatorios), radio en metros y limite (opcionales).
+    """
+    queryset = RepuestoSucursal.objects.all()
+    serializer_class = RepuestoSucursalCercanoSerializer
+    # El orden por distancia y el límite los resuelve la consulta KNN.
+    filter_backends = []
+    pagination_class = None
+
+    limite_por_defecto = 20
+    limite_maximo = 100
+
+    def get_queryset(self):
+        repuesto = get_object_or_404(RepuestoGlobal, pk=self.kwargs['pk'])
+        return repuestos_cercanos(repuesto.pk, **self.get_parametros(), queryset=self.get_queryset_ofertas())
+
+    def get_queryset_ofertas(self):
+        """Queryset de las ofertas, optimizado para el serializador."""
+        return super().get_queryset()
+
+    def get_parametros(self):
+        parametros = self.request.query_params
+        limite = self.get_numero(parametros, 'limite', 1, self.limite_maximo, requerido=False)
+        return {
+            'lat': self.get_numero(parametros, 'lat', -90, 90),
+            'lng': self.get_numero(parametros, 'lng', -180, 180),
+            'radio': self.get_numero(parametros, 'radio', 0, None, requerido=False),
+            'limite': int(limite or self.limite_por_defecto),
+        }
+
+    def get_numero(self, parametros, nombre, minimo, maximo, requerido=True):
+        valor = parametros.get(nombre)
+        if valor in (None, ''):
+            if requerido:
+                raise ValidationError({nombre: 'Este parámetro es obligatorio.'})
+            return None
+        try:
+            numero = float(valor)
+        except ValueError:
+            raise ValidationError({nombre: 'Debe ser un número.'})
+        if numero < minimo or (maximo is not None and numero > maximo) or numero != numero:
+            rango = f'entre {minimo} y {maximo}' if maximo is not None else f'mayor o igual a {minimo}'
+            raise ValidationError({nombre: f'Debe ser un número {rango}.'})
+        return numero
+
+
+# --- Historial de precios ---
+class HistorialPreciosMixin(LecturaReplicaMixin):
+    """
+    Parámetros comunes de las series de precios: desde y hasta (AAAA-MM-DD,
+    incluidos). Por defecto, los últimos `dias_por_defecto` días hasta hoy.
+    """
+    dias_por_defecto = 90
+    dias_maximo = 366
+
+    def get_rango(self):
+        parametros = self.request.query_params
+        hasta = self.get_fecha(parametros, 'hasta') or timezone.localdate()
+        desde = self.get_fecha(parametros, 'desde') or hasta - timedelta(days=self.dias_por_defecto - 1)
+        if desde > hasta:
+            raise ValidationError({'desde': 'Debe ser anterior o igual a hasta.'})
+        if (hasta - desde).days >= self.dias_maximo:
+            raise ValidationError({'desde': f'El rango no puede superar {self.dias_maximo} días.'})
+        return desde, hasta
+
+    def get_fecha(self, parametros, nombre):
+        valor = parametros.get(nombre)
+        if not valor:
+            return None
+        try:
+            return date.fromisoformat(valor)
+        except ValueError:
+            raise ValidationError({nombre: 'Debe ser una fecha AAAA-MM-DD.'})
+
+    def respuesta_serie(self, historial, con_stock=False, **datos):
+        desde, hasta = self.get_rango()
+        serie = [
+            {
+                **fila,
+                'dia': fila['dia'].isoformat(),
+                'precio_minimo': formatear_decimal(fila['precio_minimo']),
+                'precio_promedio': formatear_decimal(fila['precio_promedio']),
+                'precio_maximo': formatear_decimal(fila['precio_maximo']),
+            }
+            for fila in serie_diaria(historial, desde, hasta, con_stock)
+        ]
+        return Response({**datos, 'desde': desde.isoformat(), 'hasta': hasta.isoformat(), 'serie': serie})
+
+
+class RepuestoGlobalHistorialPreciosView(HistorialPreciosMixin, APIView):
+    """
+    Serie diaria de precios de un repuesto en todas las sucursales (o en una,
+    con ?sucursal_id=): precio mínimo, promedio y máximo vigentes cada día.
+    """
+
+    def get(self, request, pk):
+        repuesto = get_object_or_404(RepuestoGlobal, pk=pk)
+        historial = HistorialPrecio.objects.filter(repuesto_global_id=repuesto.pk)
+        sucursal_id = request.query_params.get('sucursal_id')
+        if sucursal_id:
+            if not sucursal_id.isdigit():
+                raise ValidationError({'sucursal_id': 'Debe ser un número entero.'})
+            historial = historial.filter(sucursal_id=sucursal_id)
+        return self.respuesta_serie(historial, repuesto_global=repuesto.pk)
+
+
+class RepuestoSucursalHistorialPreciosView(HistorialPreciosMixin, APIView):
+    """Serie diaria de precios y stock de un repuesto en una sucursal."""
+
+    def get(self, request, pk):
+        oferta = get_object_or_404(RepuestoSucursal, pk=pk)
+        return self.respuesta_serie(
+            HistorialPrecio.objects.filter(oferta_id=oferta.pk), con_stock=True,
+            oferta=oferta.pk, repuesto_global=oferta.repuesto_global_id, sucursal=oferta.sucursal_id,
+        )
+
+
+# --- Importación masiva de inventario ---
+class ImportarInventarioView(APIView):
+    """
+    Vista para importar precios y stock de una sucursal desde un archivo
+    CSV o JSONL (campo 'archivo'). Devuelve los contadores de la importación
+    y las líneas rechazadas.
+    """
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, pk):
+        sucursal = get_object_or_404(Sucursal, pk=pk)
+        archivo = request.FILES.get('archivo')
+        if archivo is None:
+            raise ValidationError({'archivo': 'Este campo es obligatorio.'})
+        formato = request.data.get('formato') or (
+            'jsonl' if archivo.name.endswith(('.jsonl', '.ndjson')) else 'csv'
+        )
+        if formato not in FORMATOS:
+            raise ValidationError({'formato': f"Opciones: {', '.join(FORMATOS)}."})
+
+        texto = io.TextIOWrapper(archivo.file, encoding='utf-8-sig', newline='')
+        resultado = importar_inventario(sucursal, texto, formato)
+        return Response(resultado.as_dict())
+
+
+# --- Sugerencias para el buscador ---
+class SugerenciasView(APIView):
+    """
+    Vista de autocompletado: sugerencias de repuestos (nombre y código),
+    categorías, marcas y modelos que empiezan con el texto ?q=.
+    Devuelve solo tipo, id y etiqueta, desde un índice en memoria.
+    Parámetros opcionales: limite y tipos (por ejemplo tipos=repuesto,modelo).
+    """
+
+    def get(self, request):
+        texto = request.query_params.get('q', '')
+        limite = request.query_params.get('limite', '')
+        if not limite:
+            limite = LIMITE_POR_DEFECTO
+        elif not limite.isdigit() or not 1 <= int(limite) <= LIMITE_MAXIMO:
+            raise ValidationError({'limite': f'Debe ser un número entre 1 y {LIMITE_MAXIMO}.'})
+        tipos = [t for t in request.query_params.get('tipos', '').split(',') if t] or TIPOS
+        desconocidos = [t for t in tipos if t not in TIPOS]
+        if desconocidos:
+            raise ValidationError({
+                'tipos': f"Tipos desconocidos: {', '.join(desconocidos)}. Opciones: {', '.join(TIPOS)}."
+            })
+        return Response(sugerir(texto, int(limite), tuple(tipos)))
+
+
+class ExportacionView(LecturaReplicaMixin, APIView):
+    """
+    Vista de exportación completa para socios: /api/export/repuestos.ndjson,
+    /api/export/repuestos.csv y lo mismo para el inventario. La respuesta se
+    envía en streaming (comprimida con gzip si el cliente lo acepta).
+    """
+
+    def get(self, request, recurso, formato):
+        if formato not in FORMATOS_EXPORTACION:
+            raise Http404(f"Formato no soportado: {formato}. Opciones: {', '.join(FORMATOS_EXPORTACION)}.")
+        return respuesta_exportacion(request, RECURSOS[recurso], formato)
+
+
+class SincronizacionView(APIView):
+    """
+    Sincronización incremental (/api/sync/<recurso>/): las filas cambiadas y
+    los ids borrados o desactivados desde la marca de agua ?desde= que
+    devolvió la petición anterior. Sin ?desde=, todas las filas activas.
+    Mientras hay_mas sea true, hay que volver a pedir con la nueva marca.
+    Recursos: tiendas, sucursales, categorias, vehiculos, repuestos-globales
+    y repuestos-sucursales. Parámetro opcional: limite (filas por respuesta).
+    """
+
+    def get(self, request, recurso):
+        if recurso not in RECURSOS_SINCRONIZACION:
+            raise Http404(f"Recurso desconocido: {recurso}. Opciones: {', '.join(RECURSOS_SINCRONIZACION)}.")
+        limite = request.query_params.get('limite', '')
+        if not limite:
+            limite = LIMITE_SINCRONIZACION_POR_DEFECTO
+        elif not limite.isdigit() or not 1 <= int(limite) <= LIMITE_SINCRONIZACION:
+            raise ValidationError({'limite': f'Debe ser un número entre 1 y {LIMITE_SINCRONIZACION}.'})
+        marca = request.query_params.get('desde')
+        try:
+            marca = decodificar_marca(marca) if marca else None
+        except MarcaInvalida:
+            raise ValidationError({'desde': 'Marca de agua inválida.'})
+        return Response(cambios_desde(RECURSOS_SINCRONIZACION[recurso], marca, int(limite)))
+
+
+# --- Reservas de stock ---
+class Conflicto(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'La operación no se puede realizar en el estado actual.'
+    default_code = 'conflicto'
+
+
+def _respuesta_reservas(pedido, reservas, status_code=status.HTTP_200_OK):
+    reservas = list(reservas)
+    return Response({
+        'pedido': str(pedido),
+        'vence': reservas[0].vence.isoformat() if reservas else None,
+        'reservas': ReservaStockSerializer(reservas, many=True).data,
+    }, status=status_code)
+
+
+def _reservar(lineas, ttl):
+    try:
+        reservas = reservar(lineas, ttl)
+    except StockInsuficiente as exc:
+        raise Conflicto({'detail': str(exc), 'ofertas': exc.oferta_ids})
+    return _respuesta_reservas(reservas[0].pedido, reservas, status.HTTP_201_CREATED)
+
+
+class ReservarOfertaView(APIView):
+    """
+    Reserva stock de una oferta (repuesto en una sucursal): descuenta `cantidad`
+    del stock si alcanza y devuelve el pedido, que se confirma o libera en
+    /api/reservas/<pedido>/. Si no alcanza, responde 409.
+    `ttl` (opcional): segundos hasta que la reserva vence y el stock vuelve.
+    """
+
+    def post(self, request, pk):
+        oferta = get_object_or_404(RepuestoSucursal, pk=pk)
+        datos = ReservarSerializer(data=request.data)
+        datos.is_valid(raise_exception=True)
+        return _reservar([(oferta.pk, datos.validated_data['cantidad'])], datos.validated_data.get('ttl'))
+
+
+class ReservasView(APIView):
+    """
+    Reserva un pedido de varias líneas: {"lineas": [{"oferta": id, "cantidad": n}, ...], "ttl": s}.
+    Se reservan todas las líneas o ninguna (409 con las ofertas sin stock).
+    """
+
+    def post(self, request):
+        datos = PedidoReservaSerializer(data=request.data)
+        datos.is_valid(raise_exception=True)
+        lineas = [(linea['oferta'], linea['cantidad']) for linea in datos.validated_data['lineas']]
+        return _reservar(lineas, datos.validated_data.get('ttl'))
+
+
+class ConfirmarReservaView(APIView):
+    """Confirma las reservas pendientes de un pedido (409 si no hay o vencieron)."""
+
+    def post(self, request, pedido):
+        try:
+            return _respuesta_reservas(pedido, confirmar(pedido))
+        except ReservaNoPendiente as exc:
+            raise Conflicto(str(exc))
+
+
+class LiberarReservaView(APIView):
+    """Libera las reservas pendientes de un pedido y devuelve el stock (409 si no hay)."""
+
+    def post(self, request, pedido):
+        try:
+            return _respuesta_reservas(pedido, liberar(pedido))
+        except ReservaNoPendiente as exc:
+            raise Conflicto(str(exc))
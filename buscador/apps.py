@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BuscadorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'buscador'
+
+    def ready(self):
+        # Registra las señales que mantienen los datos desnormalizados.
+        from . import signals  # noqa: F401
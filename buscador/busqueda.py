@@ -0,0 +1,197 @@
+# buscador/busqueda.py
+# Motor de búsqueda para el catálogo de repuestos.
+# - Texto completo: usa el campo desnormalizado RepuestoGlobal.vector_busqueda
+#   (tsvector con índice GIN) en lugar de recorrer la tabla con icontains.
+# - Difusa: usa índices de trigramas (pg_trgm) sobre el código normalizado y
+#   el nombre para tolerar errores de tipeo ('pastiya de freno', 'FA123').
+import re
+from contextlib import contextmanager
+
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, TrigramSimilarity, TrigramWordSimilarity
+)
+from django.db import connection, connections, transaction
+from django.db.models import F, FloatField, Q, QuerySet
+from django.db.models.functions import Cast, Greatest
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import RepuestoGlobal
+
+# Configuración de texto de PostgreSQL creada en la migración 0002:
+# copia de 'spanish' (stemming en español) con el diccionario unaccent delante.
+CONFIGURACION_BUSQUEDA = 'es_unaccent'
+
+# Pesos de cada parte del documento: el nombre y el código pesan más que
+# la categoría y los vehículos, y estos más que la descripción.
+SQL_ACTUALIZAR_VECTOR = """
+    UPDATE buscador_repuestoglobal AS r SET vector_busqueda =
+        setweight(to_tsvector('{config}', coalesce(r.nombre, '')), 'A') ||
+        setweight(to_tsvector('{config}', coalesce(r.codigo, '')), 'A') ||
+        setweight(to_tsvector('{config}', coalesce((
+            SELECT c.nombre FROM buscador_categoria AS c
+            WHERE c.id = r.categoria_id
+        ), '')), 'B') ||
+        setweight(to_tsvector('{config}', coalesce((
+            SELECT string_agg(rc.marca || ' ' || rc.modelo, ' ')
+            FROM buscador_compatibilidadrango AS rc
+            WHERE rc.repuesto_global_id = r.id
+        ), '')), 'B') ||
+        setweight(to_tsvector('{config}', coalesce(r.descripcion, '')), 'C')
+""".format(config=CONFIGURACION_BUSQUEDA)
+
+# Similitud mínima (0 a 1) para la búsqueda difusa. Es el mismo valor por
+# defecto que usa pg_trgm para el operador %.
+UMBRAL_SIMILITUD = 0.3
+
+SQL_UMBRAL = (
+    "SELECT set_config('pg_trgm.similarity_threshold', %s, true), "
+    "set_config('pg_trgm.word_similarity_threshold', %s, true)"
+)
+
+
+def actualizar_vector_busqueda(repuesto_ids=None):
+    """
+    Recalcula el vector de búsqueda de los repuestos indicados.
+    Si no se indican ids, recalcula todo el catálogo (útil tras cargas masivas).
+    """
+    with connection.cursor() as cursor:
+        if repuesto_ids is None:
+            cursor.execute(SQL_ACTUALIZAR_VECTOR)
+            return
+        repuesto_ids = list(repuesto_ids)
+        if repuesto_ids:
+            cursor.execute(SQL_ACTUALIZAR_VECTOR + ' WHERE r.id = ANY(%s)', [repuesto_ids])
+
+
+def construir_consulta(termino):
+    """
+    Convierte el texto ingresado por el usuario en un SearchQuery.
+    Cada palabra se busca como prefijo ('pastill' encuentra 'Pastilla') y
+    todas deben aparecer. Solo se usan caracteres de palabra, por lo que el
+    texto del usuario nunca llega sin filtrar a to_tsquery.
+    """
+    palabras = re.findall(r'\w+', termino)
+    if not palabras:
+        return None
+    return SearchQuery(
+        ' & '.join(f'{palabra}:*' for palabra in palabras),
+        config=CONFIGURACION_BUSQUEDA,
+        search_type='raw'
+    )
+
+
+def buscar_repuestos(queryset, termino):
+    """
+    Filtra un queryset de RepuestoGlobal por texto completo y lo ordena por
+    relevancia. El campo anotado 'rank' queda disponible para la paginación.
+
+    ts_rank() y similarity() devuelven real (float4): se convierten a double
+    precision para que el valor que vuelve en el cursor sea exactamente el de
+    la columna y los empates en el límite de una página no se salteen.
+    """
+    consulta = construir_consulta(termino)
+    if consulta is None:
+        return queryset
+    return queryset.filter(vector_busqueda=consulta).annotate(
+        rank=Cast(SearchRank(F('vector_busqueda'), consulta), FloatField())
+    ).order_by('-rank', 'nombre', 'id')
+
+
+def normalizar_codigo(texto):
+    """Normaliza un código igual que RepuestoGlobal.codigo_normalizado."""
+    return re.sub(r'[-\s]', '', texto).upper()
+
+
+class TrigramasQuerySet(QuerySet):
+    """
+    Queryset de la búsqueda difusa. Los operadores % y %> solo usan el índice
+    GIN si el umbral se fija en pg_trgm.similarity_threshold /
+    word_similarity_threshold (en lugar de comparar similarity() >= umbral).
+    Se fija con set_config(..., true), que vale hasta el fin de la
+    transacción, en la misma transacción en que se lee el queryset: con
+    conexiones persistentes, el umbral de una petición no queda en la
+    conexión para las siguientes.
+    """
+    umbral = UMBRAL_SIMILITUD
+
+    def _clone(self):
+        clon = super()._clone()
+        clon.umbral = self.umbral
+        return clon
+
+    @contextmanager
+    def con_umbral(self):
+        """Transacción con el umbral fijado en la conexión de la que se lee el queryset."""
+        with transaction.atomic(using=self.db), connections[self.db].cursor() as cursor:
+            cursor.execute(SQL_UMBRAL, [str(self.umbral), str(self.umbral)])
+            yield cursor
+
+    def _fetch_all(self):
+        if self._result_cache is None:
+            with self.con_umbral():
+                super()._fetch_all()
+
+    def count(self):
+        with self.con_umbral():
+            return super().count()
+
+    def exists(self):
+        with self.con_umbral():
+            return super().exists()
+
+
+def buscar_repuestos_difuso(queryset, termino, umbral=UMBRAL_SIMILITUD):
+    """
+    Filtra un queryset de RepuestoGlobal por similitud de trigramas con el
+    código normalizado o con alguna palabra del nombre, y lo ordena por
+    similitud. El campo anotado 'similitud' queda disponible para la paginación.
+    Devuelve un TrigramasQuerySet con el umbral indicado.
+    """
+    codigo = normalizar_codigo(termino)
+    difuso = TrigramasQuerySet(queryset.model, queryset.query.chain(), queryset._db, queryset._hints)
+    difuso._prefetch_related_lookups = queryset._prefetch_related_lookups
+    difuso.umbral = umbral
+    return difuso.filter(
+        Q(codigo_normalizado__trigram_similar=codigo) |
+        Q(nombre__trigram_word_similar=termino)
+    ).annotate(
+        similitud=Cast(Greatest(
+            TrigramSimilarity('codigo_normalizado', codigo),
+            TrigramWordSimilarity(termino, 'nombre')
+        ), FloatField())
+    ).order_by('-similitud', 'nombre', 'id')
+
+
+class BusquedaRepuestosFilter(BaseFilterBackend):
+    """
+    Backend de filtro de DRF que reemplaza a SearchFilter para RepuestoGlobal.
+    - ?search= o ?q=: búsqueda de texto completo (usa el índice GIN).
+    - ?q=...&fuzzy=1: búsqueda difusa por trigramas; ?similitud= ajusta el umbral.
+    """
+    search_params = ('search', 'q')
+    fuzzy_param = 'fuzzy'
+    umbral_param = 'similitud'
+
+    def filter_queryset(self, request, queryset, view):
+        termino = next(
+            (request.query_params[p].strip() for p in self.search_params if request.query_params.get(p)),
+            ''
+        )
+        if not termino or queryset.model is not RepuestoGlobal:
+            return queryset
+        if request.query_params.get(self.fuzzy_param) in ('1', 'true', 'True'):
+            return buscar_repuestos_difuso(queryset, termino, self.get_umbral(request))
+        return buscar_repuestos(queryset, termino)
+
+    def get_umbral(self, request):
+        valor = request.query_params.get(self.umbral_param)
+        if valor is None:
+            return UMBRAL_SIMILITUD
+        try:
+            umbral = float(valor)
+        except ValueError:
+            umbral = -1
+        if not 0 < umbral <= 1:
+            raise ValidationError({self.umbral_param: 'Debe ser un número entre 0 y 1.'})
+        return umbral
@@ -0,0 +1,111 @@
+# buscador/cache.py
+# Caché de respuestas de los listados del catálogo.
+# Cada modelo tiene un número de versión en la caché; las señales lo cambian
+# cuando se guarda o borra una fila. La clave de una respuesta incluye los
+# parámetros normalizados de la petición y las versiones de los modelos de
+# los que depende, así que al cambiar un modelo las claves viejas dejan de
+# usarse (y expiran solas) sin tener que buscarlas ni borrarlas.
+#
+# Las versiones se guardan en su propia caché (CATALOGO_VERSIONES_CACHE_ALIAS),
+# que tiene que ser compartida por todos los procesos aunque las respuestas
+# se guarden en la memoria de cada uno: si no, una escritura en un worker no
+# invalida las respuestas de los demás.
+import hashlib
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .replicas import cambio_reciente, leer_de_primaria
+
+ALIAS_CACHE = getattr(settings, 'CATALOGO_CACHE_ALIAS', 'default')
+ALIAS_VERSIONES = getattr(settings, 'CATALOGO_VERSIONES_CACHE_ALIAS', ALIAS_CACHE)
+
+
+def get_cache():
+    return caches[ALIAS_CACHE]
+
+
+def get_cache_versiones():
+    return caches[ALIAS_VERSIONES]
+
+
+def _clave_version(modelo):
+    return f'catalogo:version:{modelo._meta.label_lower}'
+
+
+def versiones(modelos):
+    """Versiones actuales de los modelos, en una sola consulta a la caché."""
+    cache = get_cache_versiones()
+    claves = [_clave_version(modelo) for modelo in modelos]
+    actuales = cache.get_many(claves)
+    faltantes = {clave: time.time_ns() for clave in claves if clave not in actuales}
+    if faltantes:
+        # Una versión nueva basada en el reloj nunca repite una versión
+        # anterior, aunque la caché la haya descartado.
+        cache.set_many(faltantes, timeout=None)
+        actuales.update(faltantes)
+    return [actuales[clave] for clave in claves]
+
+
+def invalidar_modelos(*modelos):
+    """Cambia la versión de los modelos: las respuestas que dependen de ellos dejan de usarse."""
+    get_cache_versiones().set_many({_clave_version(modelo): time.time_ns() for modelo in modelos}, timeout=None)
+
+
+def clave_respuesta(request, modelos):
+    """
+    Clave de caché para una petición: ruta, host y parámetros ordenados (los
+    valores repetidos también), más las versiones de los modelos.
+    """
+    parametros = sorted(
+        (clave, valor)
+        for clave, valores in request.query_params.lists()
+        for valor in valores
+    )
+    base = repr((
+        request.scheme, request.get_host(), request.path, parametros, versiones(modelos)
+    ))
+    return 'catalogo:respuesta:' + hashlib.sha1(base.encode('utf-8')).hexdigest()
+
+
+class CacheRespuestaMixin:
+    """
+    Mixin para vistas de listado de DRF: guarda en caché los datos
+    serializados y responde con ETag. Si el cliente envía If-None-Match con
+    el ETag vigente, responde 304 sin consultar la base de datos.
+
+    `modelos_cache` son los modelos de los que depende la respuesta.
+    """
+    modelos_cache = ()
+    tiempo_cache = getattr(settings, 'CATALOGO_CACHE_TIMEOUT', 300)
+
+    def list(self, request, *args, **kwargs):
+        clave = clave_respuesta(request, self.modelos_cache)
+        etag = f'"{clave.rsplit(":", 1)[-1]}"'
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            respuesta = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache = get_cache()
+            datos = cache.get(clave)
+            if datos is not None:
+                respuesta = Response(datos)
+            else:
+                # Recién invalidada, una réplica puede no tener todavía el
+                # cambio: la respuesta que queda en la caché se lee de la primaria.
+                lectura = leer_de_primaria() if cambio_reciente(versiones(self.modelos_cache)) else nullcontext()
+                with lectura:
+                    respuesta = super().list(request, *args, **kwargs)
+                if respuesta.status_code == status.HTTP_200_OK:
+                    cache.set(clave, respuesta.data, self.tiempo_cache)
+
+        respuesta['ETag'] = etag
+        # El cliente puede guardar la respuesta, pero debe revalidarla con el ETag.
+        patch_cache_control(respuesta, no_cache=True)
+        return respuesta
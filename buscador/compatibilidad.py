@@ -0,0 +1,132 @@
+# buscador/compatibilidad.py
+# Compatibilidad de repuestos con vehículos (marca, modelo y año).
+# Se guarda solo en CompatibilidadRango: una fila por marca, modelo y años
+# consecutivos ('Toyota Corolla 2005-2019'), en lugar de una fila por año.
+# Se escribe con establecer_compatibilidad y se busca con un EXISTS sobre
+# los rangos: cada repuesto aparece una sola vez y la consulta no tiene que
+# eliminar duplicados.
+# La API sigue publicando también la compatibilidad por vehículo (un
+# elemento por año, el campo 'compatibilidad' de antes de los rangos): se
+# arma con los vehículos de cada rango, en la misma consulta (con_vehiculos).
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.fields.ranges import NumericRange
+from django.db import transaction
+from django.db.models import BigIntegerField, Exists, F, Func, OuterRef, Value
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .busqueda import actualizar_vector_busqueda
+from .cache import invalidar_modelos
+from .models import CompatibilidadRango, RepuestoGlobal, Vehiculo
+
+
+def compactar_anios(vehiculos):
+    """
+    Agrupa los vehículos (instancias de Vehiculo o tuplas (marca, modelo, anio))
+    en rangos de años consecutivos: lista ordenada de (marca, modelo, desde, hasta).
+    """
+    anios = sorted({
+        (v.marca, v.modelo, v.anio) if isinstance(v, Vehiculo) else tuple(v) for v in vehiculos
+    })
+    rangos = []
+    for marca, modelo, anio in anios:
+        if rangos and rangos[-1][:2] == [marca, modelo] and rangos[-1][3] == anio - 1:
+            rangos[-1][3] = anio
+        else:
+            rangos.append([marca, modelo, anio, anio])
+    return [tuple(rango) for rango in rangos]
+
+
+def establecer_compatibilidad(repuesto, vehiculos):
+    """
+    Reemplaza la compatibilidad del repuesto por la de los vehículos indicados
+    (como RepuestoGlobal.compatibilidad.set() antes de que existieran los rangos).
+    """
+    with transaction.atomic():
+        CompatibilidadRango.objects.filter(repuesto_global=repuesto).delete()
+        CompatibilidadRango.objects.bulk_create(
+            CompatibilidadRango(
+                repuesto_global=repuesto, marca=marca, modelo=modelo, anios=NumericRange(desde, hasta + 1)
+            )
+            for marca, modelo, desde, hasta in compactar_anios(vehiculos)
+        )
+        compatibilidad_modificada([repuesto.pk])
+
+
+def compatibilidad_modificada(repuesto_ids):
+    """Actualiza lo que depende de la compatibilidad de los repuestos (bulk_create no dispara señales)."""
+    repuesto_ids = list(repuesto_ids)
+    actualizar_vector_busqueda(repuesto_ids)
+    # La compatibilidad se publica en la fila del repuesto: se mueve
+    # fecha_actualizacion para que la sincronización incremental la envíe.
+    RepuestoGlobal.all_objects.filter(pk__in=repuesto_ids).update(fecha_actualizacion=timezone.now())
+    transaction.on_commit(lambda: invalidar_modelos(RepuestoGlobal))
+
+
+def rangos_compatibles(marca=None, modelo=None, anio=None, exacto=True):
+    """
+    Rangos que coinciden con marca y modelo y contienen el año. Con `exacto`,
+    marca y modelo se comparan enteros sin distinguir mayúsculas; si no, como
+    texto contenido (icontains). Los criterios vacíos no se aplican.
+    """
+    rangos = CompatibilidadRango.objects.all()
+    # Se compara lower(columna) = lower(valor) para que la base use el índice
+    # 'compat_rango_gist' (iexact genera UPPER(...) y no lo usaría).
+    if marca:
+        rangos = (
+            rangos.alias(marca_min=Lower('marca')).filter(marca_min=Lower(Value(marca)))
+            if exacto else rangos.filter(marca__icontains=marca)
+        )
+    if modelo:
+        rangos = (
+            rangos.alias(modelo_min=Lower('modelo')).filter(modelo_min=Lower(Value(modelo)))
+            if exacto else rangos.filter(modelo__icontains=modelo)
+        )
+    if anio is not None:
+        rangos = rangos.filter(anios__contains=int(anio))
+    return rangos
+
+
+def rangos_del_vehiculo(vehiculo_id):
+    """Rangos que incluyen al vehículo indicado, o None si el vehículo no existe."""
+    vehiculo = Vehiculo.objects.filter(pk=vehiculo_id).values('marca', 'modelo', 'anio').first()
+    if vehiculo is None:
+        return None
+    return rangos_compatibles(**vehiculo)
+
+
+def filtrar_compatibles(queryset, rangos):
+    """Filtra los repuestos que tienen alguno de los `rangos` (None: ninguno)."""
+    if rangos is None:
+        return queryset.none()
+    return queryset.filter(Exists(rangos.filter(repuesto_global_id=OuterRef('pk'))))
+
+
+def con_vehiculos(rangos):
+    """
+    Agrega a cada rango `vehiculos`: los pares [id, anio] de los vehículos
+    activos de su marca y modelo en sus años, ordenados por año. Es una
+    subconsulta por rango sobre el índice único (marca, modelo, anio).
+    """
+    vehiculos = Vehiculo.objects.filter(
+        marca=OuterRef('marca'), modelo=OuterRef('modelo'),
+        anio__gte=OuterRef('anios__startswith'), anio__lt=OuterRef('anios__endswith'),
+    ).order_by('anio').values(par=Func(
+        F('id'), F('anio'), function='ARRAY', template='%(function)s[%(expressions)s]',
+        output_field=ArrayField(BigIntegerField()),
+    ))
+    return rangos.annotate(vehiculos=ArraySubquery(vehiculos))
+
+
+def vehiculos_compatibles(rangos, con_id=True):
+    """
+    Compatibilidad por vehículo a partir de tuplas (marca, modelo, vehiculos)
+    de rangos con con_vehiculos(): [{'id', 'marca', 'modelo', 'anio'}, ...].
+    """
+    return [
+        {'id': pk, 'marca': marca, 'modelo': modelo, 'anio': anio} if con_id
+        else {'marca': marca, 'modelo': modelo, 'anio': anio}
+        for marca, modelo, vehiculos in rangos
+        for pk, anio in vehiculos
+    ]
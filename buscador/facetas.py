@@ -0,0 +1,98 @@
+# buscador/facetas.py
+# Conteos por faceta (categoría, marca, modelo y año) para la navegación
+# del catálogo. Todas las facetas se calculan en una sola consulta con
+# GROUPING SETS sobre los repuestos que cumplen los filtros actuales, en
+# lugar de una consulta de agregación por faceta.
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+from .busqueda import TrigramasQuerySet
+
+# Faceta -> (columnas que la agrupan, JOIN que necesita).
+FACETAS = {
+    'categoria': (('c.id', 'c.nombre'), 'categoria'),
+    'marca': (('r.marca',), 'rango'),
+    'modelo': (('r.marca', 'r.modelo'), 'rango'),
+    'anio': (('a.anio',), 'anio'),
+}
+
+JOINS = {
+    'categoria': "LEFT JOIN buscador_categoria AS c ON c.id = f.categoria_id AND c.activo",
+    'rango': "LEFT JOIN buscador_compatibilidadrango AS r ON r.repuesto_global_id = f.id",
+    # Un rango 2005-2019 cuenta para cada uno de sus años.
+    'anio': "LEFT JOIN LATERAL generate_series(lower(r.anios), upper(r.anios) - 1) AS a(anio) ON true",
+}
+
+SQL_FACETAS = """
+    WITH filtrados AS ({filtrados})
+    SELECT GROUPING({columnas}), {columnas}, count(DISTINCT f.id)
+    FROM filtrados AS f
+    {joins}
+    GROUP BY GROUPING SETS ({conjuntos})
+"""
+
+
+def contar_facetas(queryset, facetas=tuple(FACETAS)):
+    """
+    Cuenta los repuestos de `queryset` (ya filtrado) por cada faceta pedida.
+    Devuelve un diccionario faceta -> lista de valores con su cantidad,
+    ordenada de mayor a menor cantidad.
+    """
+    facetas = [faceta for faceta in FACETAS if faceta in facetas]
+    if not facetas:
+        return {}
+
+    columnas = list(dict.fromkeys(col for faceta in facetas for col in FACETAS[faceta][0]))
+    joins = [FACETAS[faceta][1] for faceta in facetas]
+    if 'anio' in joins:
+        joins.append('rango')
+    joins = [JOINS[join] for join in JOINS if join in joins]
+
+    resultado = {faceta: [] for faceta in facetas}
+    # La subconsulta es la del queryset filtrado, sin orden ni relaciones.
+    try:
+        filtrados, parametros = (
+            queryset.order_by().values('id', 'categoria_id').query.sql_with_params()
+        )
+    except EmptyResultSet:
+        return resultado
+    sql = SQL_FACETAS.format(
+        filtrados=filtrados,
+        columnas=', '.join(columnas),
+        joins='\n    '.join(joins),
+        conjuntos=', '.join(f"({', '.join(FACETAS[faceta][0])})" for faceta in facetas),
+    )
+
+    # GROUPING(...) devuelve un bit por columna, en 1 si no agrupa esa fila:
+    # identifica a qué faceta corresponde cada fila.
+    mascaras = {
+        sum(1 << (len(columnas) - 1 - i) for i, col in enumerate(columnas) if col not in FACETAS[faceta][0]): faceta
+        for faceta in facetas
+    }
+    # La misma base de la que el ORM leería el queryset (ver replicas.py); la
+    # búsqueda difusa necesita además su umbral en la misma transacción.
+    if isinstance(queryset, TrigramasQuerySet):
+        abrir_cursor = queryset.con_umbral
+    else:
+        abrir_cursor = connections[queryset.db].cursor
+    with abrir_cursor() as cursor:
+        cursor.execute(sql, parametros)
+        for mascara, *valores, cantidad in cursor.fetchall():
+            faceta = mascaras[mascara]
+            fila = dict(zip(columnas, valores))
+            # Repuestos sin categoría o sin compatibilidad.
+            if any(fila[col] is None for col in FACETAS[faceta][0]):
+                continue
+            resultado[faceta].append(_formatear(faceta, fila, cantidad))
+
+    for valores in resultado.values():
+        valores.sort(key=lambda v: (-v['cantidad'], str(v.get('nombre', v.get('valor')))))
+    return resultado
+
+
+def _formatear(faceta, fila, cantidad):
+    if faceta == 'categoria':
+        return {'id': fila['c.id'], 'nombre': fila['c.nombre'], 'cantidad': cantidad}
+    if faceta == 'modelo':
+        return {'marca': fila['r.marca'], 'valor': fila['r.modelo'], 'cantidad': cantidad}
+    return {'valor': fila[FACETAS[faceta][0][0]], 'cantidad': cantidad}
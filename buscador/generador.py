@@ -0,0 +1,246 @@
+# buscador/generador.py
+# Generador de datos sintéticos para pruebas de carga.
+# Crea tiendas, sucursales, categorías, vehículos, repuestos, compatibilidades
+# y ofertas por sucursal en lotes con bulk_create, de forma determinística
+# (misma semilla = mismos datos) y reportando el rendimiento de cada etapa.
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.gis.geos import Point
+from django.contrib.postgres.fields.ranges import NumericRange
+from django.db import connection, transaction
+
+from .busqueda import actualizar_vector_busqueda
+from .cache import invalidar_modelos
+from .inventario import actualizar_resumen_inventario
+from .models import Categoria, CompatibilidadRango, RepuestoGlobal, RepuestoSucursal, Sucursal, Tienda, Vehiculo
+
+# Rectángulo (lng_min, lat_min, lng_max, lat_max) donde se ubican las sucursales.
+# Por defecto, Paraguay.
+BBOX_POR_DEFECTO = (-62.65, -27.60, -54.25, -19.30)
+
+ANIO_DESDE, ANIO_HASTA = 1990, 2025
+
+MARCAS = [
+    "Toyota", "Nissan", "Ford", "Chevrolet", "Volkswagen", "Hyundai", "Kia", "Honda",
+    "Mitsubishi", "Suzuki", "Mazda", "Renault", "Peugeot", "Fiat", "Isuzu", "Subaru",
+    "Mercedes-Benz", "BMW", "Audi", "Jeep",
+]
+MODELOS = [
+    "Corolla", "Hilux", "Sentra", "Frontier", "Focus", "Ranger", "Onix", "S10", "Gol",
+    "Amarok", "Tucson", "Accent", "Sportage", "Rio", "Civic", "Fit", "L200", "Swift",
+    "CX-5", "Duster",
+]
+CATEGORIAS = [
+    "Motor", "Frenos", "Suspension", "Transmision", "Electrico", "Refrigeracion",
+    "Escape", "Direccion", "Carroceria", "Filtros", "Iluminacion", "Embrague",
+]
+TIPOS_REPUESTO = [
+    "Filtro de Aceite", "Filtro de Aire", "Pastilla de Freno", "Disco de Freno",
+    "Amortiguador", "Bujia", "Correa de Distribucion", "Bomba de Agua", "Radiador",
+    "Embrague", "Alternador", "Motor de Arranque", "Rotula", "Terminal de Direccion",
+    "Buje de Parrilla", "Sensor de Oxigeno", "Bobina de Encendido", "Faro Delantero",
+]
+POSICIONES = ["", "Delantero", "Trasero", "Izquierdo", "Derecho", "Superior", "Inferior"]
+
+
+class GeneradorCatalogo:
+    """
+    Genera un catálogo sintético del tamaño pedido.
+    `salida` recibe los mensajes de progreso (por defecto, print).
+    """
+
+    def __init__(self, semilla=42, lote=5000, bbox=BBOX_POR_DEFECTO, salida=print):
+        self.rng = random.Random(semilla)
+        self.lote = lote
+        self.bbox = bbox
+        self.salida = salida
+        self.etapas = []
+
+    # -------------------------------------------------------------
+    # Utilidades
+    # -------------------------------------------------------------
+    def medir(self, nombre, filas, inicio):
+        segundos = time.monotonic() - inicio
+        self.etapas.append({'etapa': nombre, 'filas': filas, 'segundos': round(segundos, 3)})
+        por_segundo = filas / segundos if segundos else 0
+        self.salida(f"{nombre}: {filas} filas en {segundos:.2f} s ({por_segundo:.0f} filas/s).")
+
+    def en_lotes(self, cantidad):
+        for desde in range(0, cantidad, self.lote):
+            yield desde, min(desde + self.lote, cantidad)
+
+    @staticmethod
+    def borrar_datos():
+        """Vacía las tablas del catálogo (TRUNCATE es mucho más rápido que DELETE)."""
+        tablas = [
+            modelo._meta.db_table
+            for modelo in (RepuestoSucursal, RepuestoGlobal, Sucursal, Vehiculo, Categoria, Tienda)
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {', '.join(tablas)} RESTART IDENTITY CASCADE")
+
+    # -------------------------------------------------------------
+    # Etapas
+    # -------------------------------------------------------------
+    def crear_tiendas(self, cantidad):
+        inicio = time.monotonic()
+        ids = []
+        for desde, hasta in self.en_lotes(cantidad):
+            tiendas = Tienda.objects.bulk_create([
+                Tienda(
+                    nombre=f"Tienda {i + 1:06d}",
+                    telefono=f"021{self.rng.randrange(100000, 999999)}",
+                    tiene_delivery=self.rng.random() < 0.4,
+                )
+                for i in range(desde, hasta)
+            ])
+            ids.extend(t.pk for t in tiendas)
+        self.medir("Tiendas", cantidad, inicio)
+        return ids
+
+    def crear_sucursales(self, cantidad, tienda_ids):
+        inicio = time.monotonic()
+        lng_min, lat_min, lng_max, lat_max = self.bbox
+        ids = []
+        for desde, hasta in self.en_lotes(cantidad):
+            sucursales = Sucursal.objects.bulk_create([
+                Sucursal(
+                    tienda_id=self.rng.choice(tienda_ids),
+                    nombre=f"Sucursal {i + 1:06d}",
+                    direccion=f"Calle {self.rng.randrange(1, 5000)}",
+                    ubicacion=Point(
+                        self.rng.uniform(lng_min, lng_max),
+                        self.rng.uniform(lat_min, lat_max),
+                        srid=4326
+                    ),
+                )
+                for i in range(desde, hasta)
+            ])
+            ids.extend(s.pk for s in sucursales)
+        self.medir("Sucursales", cantidad, inicio)
+        return ids
+
+    def crear_categorias(self, cantidad):
+        inicio = time.monotonic()
+        nombres = CATEGORIAS[:cantidad] + [
+            f"Categoria {i + 1}" for i in range(max(0, cantidad - len(CATEGORIAS)))
+        ]
+        categorias = Categoria.objects.bulk_create([Categoria(nombre=n) for n in nombres])
+        self.medir("Categorías", cantidad, inicio)
+        return [c.pk for c in categorias]
+
+    def crear_vehiculos(self, cantidad):
+        """
+        Crea `cantidad` combinaciones únicas de marca, modelo y año. Devuelve
+        las tuplas (marca, modelo, anio) en orden, así que un tramo de la lista
+        es un mismo modelo en años seguidos.
+        """
+        inicio = time.monotonic()
+        anios = ANIO_HASTA - ANIO_DESDE + 1
+        creados = []
+        for desde, hasta in self.en_lotes(cantidad):
+            vehiculos = []
+            for i in range(desde, hasta):
+                modelo, anio = divmod(i, anios)
+                marca = MARCAS[modelo % len(MARCAS)]
+                nombre_modelo = MODELOS[(modelo // len(MARCAS)) % len(MODELOS)]
+                serie = modelo // (len(MARCAS) * len(MODELOS))
+                if serie:
+                    nombre_modelo = f"{nombre_modelo} {serie + 1}"
+                vehiculos.append(Vehiculo(marca=marca, modelo=nombre_modelo, anio=ANIO_DESDE + anio))
+            Vehiculo.objects.bulk_create(vehiculos)
+            creados.extend((v.marca, v.modelo, v.anio) for v in vehiculos)
+        self.medir("Vehículos", cantidad, inicio)
+        return creados
+
+    def crear_repuestos(self, cantidad, categoria_ids, vehiculos, sucursal_ids,
+                        compat_por_repuesto, ofertas_por_repuesto):
+        """
+        Crea los repuestos por lotes y, para cada lote, sus rangos de
+        compatibilidad y sus ofertas.
+        No se guarda nada de lotes anteriores, así que la memoria es constante.
+        """
+        inicio = time.monotonic()
+        total_compat = total_ofertas = 0
+        # Los vehículos de cada modelo, en orden de año (ver crear_vehiculos).
+        anios = ANIO_HASTA - ANIO_DESDE + 1
+        modelos = [vehiculos[i:i + anios] for i in range(0, len(vehiculos), anios)]
+        compat_por_repuesto = min(compat_por_repuesto, max(map(len, modelos), default=0))
+        modelos = [modelo for modelo in modelos if len(modelo) >= compat_por_repuesto]
+        ofertas_por_repuesto = min(ofertas_por_repuesto, len(sucursal_ids))
+
+        for desde, hasta in self.en_lotes(cantidad):
+            with transaction.atomic():
+                repuestos = RepuestoGlobal.objects.bulk_create([
+                    self.nuevo_repuesto(i, categoria_ids) for i in range(desde, hasta)
+                ])
+
+                compatibilidades, ofertas = [], []
+                for repuesto in repuestos:
+                    # Años consecutivos de un mismo modelo, como en un catálogo real.
+                    if compat_por_repuesto:
+                        modelo = self.rng.choice(modelos)
+                        primero = self.rng.randrange(0, len(modelo) - compat_por_repuesto + 1)
+                        marca, nombre_modelo, desde = modelo[primero]
+                        compatibilidades.append(CompatibilidadRango(
+                            repuesto_global_id=repuesto.pk, marca=marca, modelo=nombre_modelo,
+                            anios=NumericRange(desde, desde + compat_por_repuesto),
+                        ))
+                    for sucursal_id in self.rng.sample(sucursal_ids, ofertas_por_repuesto):
+                        ofertas.append(RepuestoSucursal(
+                            repuesto_global_id=repuesto.pk,
+                            sucursal_id=sucursal_id,
+                            precio=Decimal(self.rng.randrange(500, 500000)) / 100,
+                            stock=self.rng.randrange(0, 50),
+                            stock_minimo=self.rng.randrange(0, 5),
+                        ))
+                CompatibilidadRango.objects.bulk_create(compatibilidades, batch_size=self.lote)
+                RepuestoSucursal.objects.bulk_create(ofertas, batch_size=self.lote)
+            total_compat += len(compatibilidades)
+            total_ofertas += len(ofertas)
+            self.salida(f"  {hasta}/{cantidad} repuestos...")
+
+        self.medir("Repuestos + compatibilidades + ofertas", cantidad + total_compat + total_ofertas, inicio)
+
+    def nuevo_repuesto(self, i, categoria_ids):
+        tipo = self.rng.choice(TIPOS_REPUESTO)
+        posicion = self.rng.choice(POSICIONES)
+        nombre = f"{tipo} {posicion}".strip()
+        return RepuestoGlobal(
+            nombre=nombre,
+            codigo=f"{''.join(p[0] for p in tipo.split())}-{i + 1:07d}".upper(),
+            descripcion=f"{nombre} para {self.rng.choice(MARCAS)} {self.rng.choice(MODELOS)}.",
+            categoria_id=self.rng.choice(categoria_ids),
+        )
+
+    def actualizar_derivados(self):
+        """bulk_create no dispara señales: se recalculan los datos derivados al final."""
+        inicio = time.monotonic()
+        actualizar_vector_busqueda()
+        self.medir("Vector de búsqueda", RepuestoGlobal.objects.count(), inicio)
+        inicio = time.monotonic()
+        actualizar_resumen_inventario()
+        self.medir("Resumen de inventario", RepuestoGlobal.objects.count(), inicio)
+        invalidar_modelos(Tienda, Sucursal, Categoria, Vehiculo, RepuestoGlobal, RepuestoSucursal)
+
+    # -------------------------------------------------------------
+    # Punto de entrada
+    # -------------------------------------------------------------
+    def generar(self, tiendas, sucursales, categorias, vehiculos, repuestos,
+                compat_por_repuesto, ofertas_por_repuesto):
+        inicio = time.monotonic()
+        tienda_ids = self.crear_tiendas(tiendas)
+        sucursal_ids = self.crear_sucursales(sucursales, tienda_ids)
+        categoria_ids = self.crear_categorias(categorias)
+        vehiculos = self.crear_vehiculos(vehiculos)
+        self.crear_repuestos(
+            repuestos, categoria_ids, vehiculos, sucursal_ids,
+            compat_por_repuesto, ofertas_por_repuesto
+        )
+        self.actualizar_derivados()
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.salida(f"Total: {time.monotonic() - inicio:.2f} s.")
+        return self.etapas
@@ -0,0 +1,73 @@
+# buscador/geo.py
+# Consultas geoespaciales sobre las sucursales (PostGIS).
+from asgiref.sync import sync_to_async
+from django.db import connections
+
+from .models import RepuestoSucursal
+from .replicas import alias_lectura
+
+# Búsqueda de los vecinos más cercanos (KNN): el operador <-> sobre
+# geography recorre el índice GiST de sucursal_ubicacion_geog_gist en orden
+# de distancia, y ST_DWithin limita el radio en metros usando el mismo índice.
+SQL_CERCANOS = """
+    SELECT rs.id, ST_Distance(s.ubicacion::geography, {punto}) AS distancia
+    FROM buscador_repuestosucursal AS rs
+    JOIN buscador_sucursal AS s ON s.id = rs.sucursal_id
+    WHERE rs.repuesto_global_id = %(repuesto)s
+      AND rs.stock > 0
+      AND rs.activo
+      {filtro_radio}
+    ORDER BY s.ubicacion::geography <-> {punto}
+    LIMIT %(limite)s
+"""
+PUNTO = "ST_SetSRID(ST_MakePoint(%(lng)s, %(lat)s), 4326)::geography"
+FILTRO_RADIO = "AND ST_DWithin(s.ubicacion::geography, {punto}, %(radio)s)".format(punto=PUNTO)
+
+
+def _buscar_cercanos(repuesto_id, lat, lng, radio, limite):
+    """Ejecuta la consulta KNN y devuelve una lista de (id de la oferta, distancia)."""
+    sql = SQL_CERCANOS.format(
+        punto=PUNTO,
+        filtro_radio=FILTRO_RADIO if radio is not None else ''
+    )
+    parametros = {'repuesto': repuesto_id, 'lat': lat, 'lng': lng, 'radio': radio, 'limite': limite}
+    with connections[alias_lectura()].cursor() as cursor:
+        cursor.execute(sql, parametros)
+        return cursor.fetchall()
+
+
+def _con_distancia(objetos, filas):
+    """Los objetos en el orden de la consulta KNN, con el atributo `distancia`."""
+    resultado = []
+    for pk, distancia in filas:
+        objeto = objetos.get(pk)
+        if objeto is not None:
+            objeto.distancia = distancia
+            resultado.append(objeto)
+    return resultado
+
+
+def repuestos_cercanos(repuesto_id, lat, lng, radio=None, limite=20, queryset=None):
+    """
+    Devuelve las ofertas con stock de un repuesto ordenadas por distancia a
+    (lat, lng). Cada objeto trae el atributo `distancia` en metros.
+    `radio` (en metros) es opcional; `queryset` permite pasar un queryset de
+    RepuestoSucursal con las relaciones ya optimizadas para el serializador.
+    """
+    filas = _buscar_cercanos(repuesto_id, lat, lng, radio, limite)
+    if queryset is None:
+        queryset = RepuestoSucursal.objects.all()
+    return _con_distancia(queryset.in_bulk([pk for pk, _ in filas]), filas)
+
+
+async def arepuestos_cercanos(repuesto_id, lat, lng, radio=None, limite=20, queryset=None):
+    """
+    Versión asíncrona de repuestos_cercanos(). Django no tiene cursores
+    asíncronos: la consulta KNN corre en el hilo de la petición con
+    sync_to_async, y las ofertas se leen con el ORM asíncrono.
+    """
+    filas = await sync_to_async(_buscar_cercanos)(repuesto_id, lat, lng, radio, limite)
+    if queryset is None:
+        queryset = RepuestoSucursal.objects.all()
+    objetos = {objeto.pk: objeto async for objeto in queryset.filter(pk__in=[pk for pk, _ in filas])}
+    return _con_distancia(objetos, filas)
@@ -0,0 +1,151 @@
+# buscador/historial.py
+# Historial de precios y stock de las ofertas (HistorialPrecio).
+# Las filas las agregan triggers de la base sobre RepuestoSucursal (migración
+# 0013). La tabla está particionada por mes (UTC): las consultas por rango de
+# fechas solo leen las particiones de esos meses y los meses viejos se borran
+# enteros, sin DELETE. Las series diarias se calculan en la base.
+from datetime import datetime, time, timedelta
+
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+TABLA = 'buscador_historialprecio'
+
+# Particiones mensuales: buscador_historialprecio_AAAA_MM.
+SQL_PARTICIONES = """
+    SELECT hija.relname
+    FROM pg_inherits
+    JOIN pg_class AS padre ON padre.oid = pg_inherits.inhparent
+    JOIN pg_class AS hija ON hija.oid = pg_inherits.inhrelid
+    WHERE padre.relname = %s AND hija.relname ~ '_[0-9]{4}_[0-9]{2}$'
+    ORDER BY hija.relname
+"""
+
+
+def _sumar_meses(fecha, meses):
+    mes = fecha.year * 12 + fecha.month - 1 + meses
+    return fecha.replace(year=mes // 12, month=mes % 12 + 1, day=1)
+
+
+def crear_particiones(meses=3, desde=None):
+    """
+    Crea las particiones mensuales desde el mes de `desde` (hoy, en UTC) y los
+    `meses` - 1 siguientes. Devuelve los meses creados (los que ya existían no
+    se tocan).
+    """
+    # timezone.now() está en UTC, como los límites de las particiones.
+    inicio = (desde or timezone.now().date()).replace(day=1)
+    creados = []
+    with connection.cursor() as cursor:
+        for i in range(meses):
+            mes = _sumar_meses(inicio, i)
+            cursor.execute('SELECT buscador_crear_particion_historial(%s)', [mes])
+            if cursor.fetchone()[0]:
+                creados.append(mes)
+    return creados
+
+
+def borrar_particiones_anteriores(meses):
+    """
+    Borra las particiones de los meses anteriores a los últimos `meses`
+    (contando el actual). Devuelve los nombres de las borradas.
+    """
+    limite = _sumar_meses(timezone.now().date(), -(meses - 1))
+    sufijo_limite = limite.strftime('_%Y_%m')
+    borradas = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(SQL_PARTICIONES, [TABLA])
+        for (nombre,) in cursor.fetchall():
+            if nombre[-len(sufijo_limite):] < sufijo_limite:
+                nombre_sql = connection.ops.quote_name(nombre)
+                cursor.execute(f'ALTER TABLE {TABLA} DETACH PARTITION {nombre_sql}')
+                cursor.execute(f'DROP TABLE {nombre_sql}')
+                borradas.append(nombre)
+    return borradas
+
+
+def rango_de_dias(desde, hasta):
+    """Límites [inicio, fin) en la zona horaria actual de los días desde..hasta (incluidos)."""
+    zona = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(desde, time.min), zona),
+        timezone.make_aware(datetime.combine(hasta + timedelta(days=1), time.min), zona),
+    )
+
+
+# Serie diaria a partir del precio vigente de cada oferta al final de cada
+# día (la última fila hasta ese momento, arrastrada a los días sin cambios),
+# así que todas las ofertas cuentan todos los días aunque no hayan cambiado.
+# Las filas que solo cambian el stock (reservas, ventas) no son precios
+# nuevos: `cambios` cuenta solo las filas del día con un precio distinto del
+# anterior de la oferta. El stock mínimo y máximo incluye el stock anterior a
+# cada fila del día (el que estuvo vigente hasta ese momento).
+SQL_SERIE_DIARIA = """
+    WITH ofertas AS ({ofertas}),
+    dias AS (
+        SELECT d::date AS dia, d AT TIME ZONE %s AS inicio, (d + interval '1 day') AT TIME ZONE %s AS fin
+        FROM generate_series(%s::timestamp, %s::timestamp, interval '1 day') AS d
+    ),
+    vigentes AS (
+        SELECT dias.dia, h.precio, h.stock, h.activo
+        FROM dias
+        CROSS JOIN ofertas AS o
+        CROSS JOIN LATERAL (
+            SELECT precio, stock, activo FROM buscador_historialprecio
+            WHERE oferta_id = o.oferta_id AND fecha < dias.fin
+            ORDER BY fecha DESC, id DESC
+            LIMIT 1
+        ) AS h
+    ),
+    movimientos AS (
+        SELECT dias.dia, h.stock, h.stock_anterior, h.precio IS DISTINCT FROM h.precio_anterior AS cambio
+        FROM (
+            SELECT fecha, precio, stock,
+                   lag(precio) OVER (PARTITION BY oferta_id ORDER BY fecha, id) AS precio_anterior,
+                   lag(stock) OVER (PARTITION BY oferta_id ORDER BY fecha, id) AS stock_anterior
+            FROM buscador_historialprecio
+            WHERE oferta_id IN (SELECT oferta_id FROM ofertas) AND fecha < %s
+        ) AS h
+        JOIN dias ON h.fecha >= dias.inicio AND h.fecha < dias.fin
+    ),
+    por_dia AS (
+        SELECT dia, count(*) FILTER (WHERE cambio) AS cambios,
+               least(min(stock), min(stock_anterior)) AS stock_minimo,
+               greatest(max(stock), max(stock_anterior)) AS stock_maximo
+        FROM movimientos
+        GROUP BY dia
+    )
+    SELECT v.dia, min(v.precio), avg(v.precio)::numeric(10, 2), max(v.precio), coalesce(max(p.cambios), 0),
+           least(min(v.stock), min(p.stock_minimo)), greatest(max(v.stock), max(p.stock_maximo))
+    FROM vigentes AS v
+    LEFT JOIN por_dia AS p ON p.dia = v.dia
+    WHERE v.activo
+    GROUP BY v.dia
+    ORDER BY v.dia
+"""
+
+
+def serie_diaria(historial, desde, hasta, con_stock=False):
+    """
+    Serie diaria del historial (un queryset de HistorialPrecio ya filtrado por
+    repuesto u oferta) entre las fechas desde y hasta, incluidas: precio
+    mínimo, promedio y máximo de las ofertas activas con el precio vigente al
+    final de cada día, y cantidad de cambios de precio. Los días anteriores a
+    la primera oferta no aparecen. Con `con_stock`, también el stock mínimo y
+    máximo del día (tiene sentido para una sola oferta).
+    """
+    inicio, fin = rango_de_dias(desde, hasta)
+    ofertas, parametros_ofertas = (
+        historial.filter(fecha__lt=fin).order_by().values('oferta_id').distinct().query.sql_with_params()
+    )
+    zona = timezone.get_current_timezone_name()
+    with connections[historial.db].cursor() as cursor:
+        cursor.execute(
+            SQL_SERIE_DIARIA.format(ofertas=ofertas),
+            [*parametros_ofertas, zona, zona, desde, hasta, fin],
+        )
+        filas = cursor.fetchall()
+    columnas = ['dia', 'precio_minimo', 'precio_promedio', 'precio_maximo', 'cambios']
+    if con_stock:
+        columnas += ['stock_minimo', 'stock_maximo']
+    return [dict(zip(columnas, fila)) for fila in filas]
@@ -0,0 +1,239 @@
+# buscador/importacion.py
+# Importación masiva de precios y stock de una sucursal (RepuestoSucursal).
+# El archivo se lee en streaming y se procesa por lotes: los códigos se
+# resuelven a ids de RepuestoGlobal con una consulta por lote, las filas
+# válidas se cargan con COPY en una tabla temporal y desde allí se hace un
+# único INSERT ... ON CONFLICT DO UPDATE por lote.
+import csv
+import io
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+
+from .cache import invalidar_modelos
+from .inventario import actualizar_resumen_inventario
+from .models import RepuestoGlobal, RepuestoSucursal
+
+TAMANIO_LOTE = 5000
+# Líneas rechazadas que se guardan con su motivo; las demás solo se cuentan.
+MAX_RECHAZADAS = 1000
+FORMATOS = ('csv', 'jsonl')
+
+SQL_CREAR_TABLA_TEMPORAL = """
+    CREATE TEMPORARY TABLE IF NOT EXISTS importacion_inventario (
+        repuesto_global_id bigint NOT NULL,
+        precio numeric(10, 2) NOT NULL,
+        stock integer NOT NULL,
+        stock_minimo integer NOT NULL
+    ) ON COMMIT DELETE ROWS
+"""
+COLUMNAS_TABLA_TEMPORAL = ('repuesto_global_id', 'precio', 'stock', 'stock_minimo')
+STOCK_MAXIMO = 2 ** 31 - 1  # Columnas integer.
+
+# Las filas que no cambian no se reescriben, para no generar versiones
+# muertas ni mover fecha_actualizacion.
+SQL_UPSERT = """
+    INSERT INTO buscador_repuestosucursal AS rs (
+        fecha_creacion, fecha_actualizacion, activo,
+        sucursal_id, repuesto_global_id, precio, stock, stock_minimo
+    )
+    SELECT now(), now(), true, %s, repuesto_global_id, precio, stock, stock_minimo
+    FROM importacion_inventario
+    ON CONFLICT (sucursal_id, repuesto_global_id) DO UPDATE SET
+        precio = EXCLUDED.precio,
+        stock = EXCLUDED.stock,
+        stock_minimo = EXCLUDED.stock_minimo,
+        activo = true,
+        fecha_actualizacion = EXCLUDED.fecha_actualizacion
+    WHERE (rs.precio, rs.stock, rs.stock_minimo, rs.activo)
+        IS DISTINCT FROM (EXCLUDED.precio, EXCLUDED.stock, EXCLUDED.stock_minimo, true)
+"""
+
+
+class ResultadoImportacion:
+    """
+    Contadores y líneas rechazadas de una importación. Se guardan las
+    primeras MAX_RECHAZADAS líneas rechazadas; filas_rechazadas es el total.
+    """
+
+    def __init__(self, max_rechazadas=MAX_RECHAZADAS):
+        self.filas_leidas = 0
+        self.filas_importadas = 0
+        self.filas_modificadas = 0
+        self.filas_rechazadas = 0
+        self.rechazadas = []
+        self.max_rechazadas = max_rechazadas
+        self.repuesto_ids = set()
+        self.segundos = 0.0
+
+    def rechazar(self, linea, motivo):
+        self.filas_rechazadas += 1
+        if len(self.rechazadas) < self.max_rechazadas:
+            self.rechazadas.append((linea, motivo))
+
+    @property
+    def filas_por_segundo(self):
+        return self.filas_leidas / self.segundos if self.segundos else 0.0
+
+    def as_dict(self, max_rechazadas=100):
+        return {
+            'filas_leidas': self.filas_leidas,
+            'filas_importadas': self.filas_importadas,
+            'filas_modificadas': self.filas_modificadas,
+            'filas_rechazadas': self.filas_rechazadas,
+            'segundos': round(self.segundos, 3),
+            'filas_por_segundo': round(self.filas_por_segundo, 1),
+            'rechazadas': [
+                {'linea': linea, 'motivo': motivo}
+                for linea, motivo in self.rechazadas[:max_rechazadas]
+            ],
+        }
+
+
+# -------------------------------------------------------------
+# Lectura y validación
+# -------------------------------------------------------------
+def leer_filas(archivo, formato):
+    """
+    Recorre un archivo de texto CSV (con encabezado) o JSONL y devuelve
+    tuplas (número de línea, fila). Una línea JSON inválida se devuelve
+    como fila None para que se registre como rechazada.
+    """
+    if formato == 'csv':
+        lector = csv.DictReader(archivo)
+        for fila in lector:
+            yield lector.line_num, fila
+    elif formato == 'jsonl':
+        for numero, linea in enumerate(archivo, start=1):
+            if not linea.strip():
+                continue
+            try:
+                fila = json.loads(linea)
+            except ValueError:
+                fila = None
+            yield numero, fila if isinstance(fila, dict) else None
+    else:
+        raise ValueError(f"Formato desconocido: {formato!r}. Opciones: {', '.join(FORMATOS)}.")
+
+
+def validar_fila(fila):
+    """Devuelve (codigo, precio, stock, stock_minimo) o lanza ValueError con el motivo."""
+    if fila is None:
+        raise ValueError("Línea con formato inválido.")
+    codigo = str(fila.get('codigo') or '').strip()
+    if not codigo:
+        raise ValueError("Falta el código.")
+    try:
+        precio = Decimal(str(fila.get('precio', '')).strip())
+    except InvalidOperation:
+        raise ValueError("Precio inválido.")
+    if not precio.is_finite() or precio < 0 or precio >= Decimal('1e8'):
+        raise ValueError("Precio fuera de rango.")
+    stock = _validar_stock(fila.get('stock'))
+    stock_minimo = _validar_stock(fila.get('stock_minimo'))
+    return codigo, precio.quantize(Decimal('0.01')), stock, stock_minimo
+
+
+def _validar_stock(valor):
+    """Un entero entre 0 y STOCK_MAXIMO; vacío es 0. 2.7 no se trunca: se rechaza."""
+    if valor is None or valor == '':
+        return 0
+    try:
+        numero = Decimal(str(valor).strip())
+    except InvalidOperation:
+        raise ValueError("Stock inválido.")
+    if not numero.is_finite() or numero != numero.to_integral_value():
+        raise ValueError("Stock inválido.")
+    if numero < 0:
+        raise ValueError("El stock no puede ser negativo.")
+    if numero > STOCK_MAXIMO:
+        raise ValueError("Stock fuera de rango.")
+    return int(numero)
+
+
+# -------------------------------------------------------------
+# Carga
+# -------------------------------------------------------------
+def _copiar(cursor, tabla, columnas, filas):
+    """COPY ... FROM STDIN con psycopg 3 o psycopg2."""
+    sql = f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN"
+    crudo = cursor.cursor
+    if hasattr(crudo, 'copy'):
+        with crudo.copy(sql) as copia:
+            for fila in filas:
+                copia.write_row(fila)
+    else:
+        texto = io.StringIO(''.join('\t'.join(str(valor) for valor in fila) + '\n' for fila in filas))
+        crudo.copy_expert(sql, texto)
+
+
+def _procesar_lote(sucursal_id, lote, resultado):
+    codigos = {fila[0] for _, fila in lote}
+    # También los inactivos, para rechazarlos con su propio motivo.
+    repuestos = {
+        codigo: (repuesto_id, activo)
+        for codigo, repuesto_id, activo in RepuestoGlobal.all_objects.filter(codigo__in=codigos)
+        .values_list('codigo', 'id', 'activo')
+    }
+
+    # Un mismo repuesto no puede actualizarse dos veces en el mismo INSERT:
+    # gana la última línea del archivo.
+    por_repuesto = {}
+    for linea, (codigo, precio, stock, stock_minimo) in lote:
+        repuesto_id, activo = repuestos.get(codigo, (None, False))
+        if repuesto_id is None:
+            resultado.rechazar(linea, f"Código desconocido: {codigo}.")
+            continue
+        if not activo:
+            resultado.rechazar(linea, f"Repuesto inactivo: {codigo}.")
+            continue
+        if repuesto_id in por_repuesto:
+            resultado.rechazar(por_repuesto[repuesto_id][0], f"Código repetido más adelante: {codigo}.")
+        por_repuesto[repuesto_id] = (linea, (repuesto_id, precio, stock, stock_minimo))
+
+    if not por_repuesto:
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(SQL_CREAR_TABLA_TEMPORAL)
+        # Dentro de la transacción de quien llama (ATOMIC_REQUESTS, un atomic
+        # externo) este atomic es un savepoint y ON COMMIT DELETE ROWS no
+        # vacía la tabla entre lotes.
+        cursor.execute('TRUNCATE importacion_inventario')
+        _copiar(cursor, 'importacion_inventario', COLUMNAS_TABLA_TEMPORAL,
+                [fila for _, fila in por_repuesto.values()])
+        cursor.execute(SQL_UPSERT, [sucursal_id])
+        resultado.filas_modificadas += cursor.rowcount
+    resultado.filas_importadas += len(por_repuesto)
+    resultado.repuesto_ids.update(por_repuesto)
+
+
+def importar_inventario(sucursal, archivo, formato='csv', tamanio_lote=TAMANIO_LOTE, max_rechazadas=MAX_RECHAZADAS):
+    """
+    Importa precios y stock de `sucursal` desde un archivo de texto.
+    Columnas: codigo, precio, stock y stock_minimo (opcional).
+    Devuelve un ResultadoImportacion con contadores, filas por segundo y
+    las líneas rechazadas con su motivo (las primeras max_rechazadas).
+    """
+    resultado = ResultadoImportacion(max_rechazadas)
+    inicio = time.monotonic()
+    lote = []
+    for linea, fila in leer_filas(archivo, formato):
+        resultado.filas_leidas += 1
+        try:
+            lote.append((linea, validar_fila(fila)))
+        except ValueError as error:
+            resultado.rechazar(linea, str(error))
+        if len(lote) >= tamanio_lote:
+            _procesar_lote(sucursal.pk, lote, resultado)
+            lote = []
+    if lote:
+        _procesar_lote(sucursal.pk, lote, resultado)
+
+    # El upsert no dispara señales: se actualizan aquí los datos derivados.
+    actualizar_resumen_inventario(resultado.repuesto_ids)
+    if resultado.filas_modificadas:
+        invalidar_modelos(RepuestoSucursal)
+    resultado.segundos = time.monotonic() - inicio
+    return resultado
@@ -0,0 +1,241 @@
+# buscador/instrumentacion.py
+# Instrumentación de cada petición: cantidad de consultas y tiempo en la
+# base (de todas las conexiones), tiempo de serialización, de renderizado y
+# total. Se envían en el encabezado Server-Timing (las herramientas de
+# desarrollo del navegador los muestran) y en una línea de log JSON por
+# petición (logger 'buscador.instrumentacion').
+#
+# También detecta N+1: la misma consulta (la misma forma de SQL, sin los
+# valores) repetida INSTRUMENTACION_N_MAS_1 veces o más en una petición se
+# registra como advertencia. Y una fracción de las peticiones
+# (INSTRUMENTACION_PERFIL_MUESTRA) se perfila con cProfile; el .prof queda en
+# INSTRUMENTACION_PERFIL_DIR (se puede ver con snakeviz o pstats).
+#
+# Las consultas de las respuestas en streaming se hacen después de que la
+# vista devuelve la respuesta y no se cuentan.
+import cProfile
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('buscador.instrumentacion')
+
+_medicion = ContextVar('medicion', default=None)
+# cProfile no admite dos perfiles activos a la vez en el proceso.
+_perfilando = threading.Lock()
+_perfiles = itertools.count(1)
+
+# Forma de una consulta: sin literales y con las listas IN (%s, %s, ...) colapsadas.
+TEXTOS = re.compile(r"'(?:[^']|'')*'")
+NUMEROS = re.compile(r'\b\d+(?:\.\d+)?\b')
+LISTAS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+
+
+def forma_sql(sql):
+    return LISTAS.sub('(%s, ...)', NUMEROS.sub('?', TEXTOS.sub('?', sql)))
+
+
+class Medicion:
+    """Lo medido durante una petición. Se usa como execute_wrapper de las conexiones."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.db = 0.0
+        self.serializacion = 0.0
+        self.serializando = False
+        self.fin_vista = None
+        self.formas = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - inicio
+            self.consultas += 1
+            self.formas[forma_sql(sql)] += 1
+
+    def repetidas(self, umbral):
+        return [(forma, cantidad) for forma, cantidad in self.formas.most_common() if cantidad >= umbral]
+
+
+def medicion_actual():
+    """La Medicion de la petición en curso, o None si no se está midiendo."""
+    return _medicion.get()
+
+
+class medir_serializacion:
+    """
+    Suma el tiempo del bloque a la serialización de la petición en curso.
+    Los bloques anidados (serializadores dentro de serializadores) no se
+    cuentan dos veces.
+    """
+
+    def __enter__(self):
+        self.medicion = medicion_actual()
+        if self.medicion is None or self.medicion.serializando:
+            self.medicion = None
+            return
+        self.medicion.serializando = True
+        self.inicio = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.medicion is not None:
+            self.medicion.serializacion += time.perf_counter() - self.inicio
+            self.medicion.serializando = False
+
+
+class SerializacionMedidaMixin:
+    """Mixin para serializadores: mide to_representation() (ver medir_serializacion)."""
+
+    def to_representation(self, instance):
+        medicion = _medicion.get()
+        if medicion is None or medicion.serializando:
+            return super().to_representation(instance)
+        with medir_serializacion():
+            return super().to_representation(instance)
+
+
+def _medir_conexiones(medicion):
+    """Instala `medicion` en las conexiones del hilo actual (hasta cerrar la pila devuelta)."""
+    pila = ExitStack()
+    for alias in connections:
+        pila.enter_context(connections[alias].execute_wrapper(medicion))
+    return pila
+
+
+class InstrumentacionMiddleware:
+    """
+    Middleware de instrumentación. Va primero en MIDDLEWARE, para medir la petición completa.
+    Con ASGI atiende la petición sin pasar a un hilo. Las conexiones son de
+    cada hilo: la medición se instala en el hilo donde sync_to_async ejecuta
+    el ORM de la petición (uno solo por petición).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTACION_ACTIVA', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.umbral_n_mas_1 = getattr(settings, 'INSTRUMENTACION_N_MAS_1', 10)
+        self.muestra_perfil = getattr(settings, 'INSTRUMENTACION_PERFIL_MUESTRA', 0.0)
+        self.directorio_perfiles = Path(getattr(settings, 'INSTRUMENTACION_PERFIL_DIR', 'perfiles'))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        perfil = self.iniciar_perfil()
+        inicio = time.perf_counter()
+        try:
+            with _medir_conexiones(medicion):
+                respuesta = self.get_response(request)
+        finally:
+            fin = time.perf_counter()
+            _medicion.reset(token)
+            if perfil is not None:
+                self.terminar_perfil(perfil, request)
+        return self.completar(request, respuesta, medicion, inicio, fin)
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        token = _medicion.set(medicion)
+        perfil = self.iniciar_perfil()
+        inicio = time.perf_counter()
+        try:
+            conexiones = await sync_to_async(_medir_conexiones)(medicion)
+            try:
+                respuesta = await self.get_response(request)
+            finally:
+                await sync_to_async(conexiones.close)()
+        finally:
+            fin = time.perf_counter()
+            _medicion.reset(token)
+            if perfil is not None:
+                self.terminar_perfil(perfil, request)
+        return self.completar(request, respuesta, medicion, inicio, fin)
+
+    def completar(self, request, respuesta, medicion, inicio, fin):
+        """Agrega Server-Timing a la respuesta y registra la petición."""
+        render = fin - medicion.fin_vista if medicion.fin_vista is not None else 0.0
+        tiempos = {
+            'db': medicion.db,
+            'serializacion': medicion.serializacion,
+            'render': render,
+            'total': fin - inicio,
+        }
+        metricas = [f'{nombre};dur={segundos * 1000:.2f}' for nombre, segundos in tiempos.items()]
+        metricas[0] += f';desc="{medicion.consultas} consultas"'
+        respuesta['Server-Timing'] = ', '.join(metricas)
+        self.registrar(request, respuesta, medicion, tiempos)
+        return respuesta
+
+    def process_template_response(self, request, response):
+        # Se llama cuando la vista terminó y antes de renderizar la respuesta.
+        medicion = _medicion.get()
+        if medicion is not None:
+            medicion.fin_vista = time.perf_counter()
+        return response
+
+    def registrar(self, request, respuesta, medicion, tiempos):
+        coincidencia = request.resolver_match
+        datos = {
+            'metodo': request.method,
+            'ruta': request.path,
+            'vista': coincidencia.view_name if coincidencia else None,
+            'estado': respuesta.status_code,
+            'consultas': medicion.consultas,
+            **{f'{nombre}_ms': round(segundos * 1000, 2) for nombre, segundos in tiempos.items()},
+        }
+        logger.info(json.dumps(datos, ensure_ascii=False))
+        for forma, cantidad in medicion.repetidas(self.umbral_n_mas_1):
+            logger.warning(json.dumps({
+                'evento': 'n_mas_1', 'ruta': datos['ruta'], 'vista': datos['vista'],
+                'repeticiones': cantidad, 'sql': forma,
+            }, ensure_ascii=False))
+
+    # -------------------------------------------------------------
+    # Perfiles con cProfile
+    # -------------------------------------------------------------
+    def iniciar_perfil(self):
+        if not self.muestra_perfil or random.random() >= self.muestra_perfil:
+            return None
+        if not _perfilando.acquire(blocking=False):
+            return None
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Otra herramienta de perfilado ya está activa.
+            _perfilando.release()
+            return None
+        return perfil
+
+    def terminar_perfil(self, perfil, request):
+        try:
+            perfil.disable()
+        finally:
+            _perfilando.release()
+        self.directorio_perfiles.mkdir(parents=True, exist_ok=True)
+        ruta = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'raiz'
+        archivo = self.directorio_perfiles / f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_perfiles)}-{ruta}.prof"
+        perfil.dump_stats(archivo)
+        logger.info(json.dumps({'evento': 'perfil', 'ruta': request.path, 'archivo': str(archivo)}, ensure_ascii=False))
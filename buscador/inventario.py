@@ -0,0 +1,52 @@
+# buscador/inventario.py
+# Mantenimiento del resumen de inventario por repuesto (ResumenInventario).
+from django.db import connection
+
+from .cache import invalidar_modelos
+from .models import ResumenInventario
+
+# Recalcula el resumen de los repuestos indicados a partir de las ofertas
+# activas de RepuestoSucursal y lo guarda con un upsert. Los repuestos sin
+# ofertas quedan con stock 0.
+SQL_ACTUALIZAR_RESUMEN = """
+    INSERT INTO buscador_resumeninventario AS ri (
+        repuesto_global_id, stock_total, precio_minimo, precio_maximo,
+        cantidad_sucursales, ultima_actualizacion
+    )
+    SELECT r.id,
+           coalesce(sum(rs.stock), 0),
+           min(rs.precio),
+           max(rs.precio),
+           count(rs.id),
+           max(rs.fecha_actualizacion)
+    FROM buscador_repuestoglobal AS r
+    LEFT JOIN buscador_repuestosucursal AS rs ON rs.repuesto_global_id = r.id AND rs.activo
+    {filtro}
+    GROUP BY r.id
+    ON CONFLICT (repuesto_global_id) DO UPDATE SET
+        stock_total = EXCLUDED.stock_total,
+        precio_minimo = EXCLUDED.precio_minimo,
+        precio_maximo = EXCLUDED.precio_maximo,
+        cantidad_sucursales = EXCLUDED.cantidad_sucursales,
+        ultima_actualizacion = EXCLUDED.ultima_actualizacion
+"""
+
+
+def actualizar_resumen_inventario(repuesto_ids=None):
+    """
+    Recalcula el resumen de inventario de los repuestos indicados.
+    Si no se indican ids, recalcula todo el catálogo (útil tras cargas masivas).
+    """
+    if repuesto_ids is not None:
+        repuesto_ids = list(repuesto_ids)
+        if not repuesto_ids:
+            return
+    with connection.cursor() as cursor:
+        if repuesto_ids is None:
+            cursor.execute(SQL_ACTUALIZAR_RESUMEN.format(filtro=''))
+        else:
+            cursor.execute(
+                SQL_ACTUALIZAR_RESUMEN.format(filtro='WHERE r.id = ANY(%s)'),
+                [repuesto_ids]
+            )
+    invalidar_modelos(ResumenInventario)
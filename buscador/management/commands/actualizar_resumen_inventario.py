@@ -0,0 +1,12 @@
+# buscador/management/commands/actualizar_resumen_inventario.py
+from django.core.management.base import BaseCommand
+
+from buscador.inventario import actualizar_resumen_inventario
+
+
+class Command(BaseCommand):
+    help = "Recalcula el resumen de inventario (stock total, precios, sucursales) de todos los repuestos."
+
+    def handle(self, *args, **options):
+        actualizar_resumen_inventario()
+        self.stdout.write(self.style.SUCCESS("Resumen de inventario actualizado."))
@@ -0,0 +1,283 @@
+# buscador/management/commands/benchmark_api.py
+# Benchmark de los endpoints más usados de la API.
+# Crea una base de datos de prueba, la llena con el generador sintético y
+# mide para cada endpoint la latencia (p50/p95), las consultas SQL por
+# petición (la mayor de todas las repeticiones) y los bytes de la respuesta. Guarda los resultados en JSON y
+# falla si se supera un presupuesto o si hay una regresión respecto de una
+# corrida anterior.
+import json
+import statistics
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from buscador.cache import get_cache
+from buscador.generador import GeneradorCatalogo
+from buscador.models import Categoria, RepuestoGlobal, RepuestoSucursal, Sucursal, Vehiculo
+from buscador.sugerencias import sugerencias
+
+DIRECTORIO = Path(settings.BASE_DIR) / 'benchmarks'
+
+
+def percentil(valores, p):
+    """Percentil p (0-100) por interpolación lineal."""
+    ordenados = sorted(valores)
+    if len(ordenados) == 1:
+        return ordenados[0]
+    posicion = (len(ordenados) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+class Command(BaseCommand):
+    help = "Mide latencia, consultas y bytes de los endpoints principales y compara con los presupuestos."
+
+    # Endpoints que no usan la caché de respuestas: vaciarla también cambiaría
+    # las versiones de los modelos y les haría releer los cambios en cada petición.
+    sin_vaciar_cache = {'sugerencias'}
+
+    # Endpoints que no pueden consultar la base en ninguna petición: el
+    # índice de sugerencias está en memoria y se sincroniza en segundo plano.
+    sin_consultas = {'sugerencias'}
+
+    # Listados que se arman sin ModelSerializer (buscador/api/rapido.py): se
+    # miden también con el serializador para registrar la diferencia.
+    comparar_listados = ('repuestos-globales', 'repuestos-globales?search', 'repuestos-sucursales?repuesto_id')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tiendas', type=int, default=50)
+        parser.add_argument('--sucursales', type=int, default=500)
+        parser.add_argument('--vehiculos', type=int, default=2000)
+        parser.add_argument('--repuestos', type=int, default=20000)
+        parser.add_argument('--compat-per-part', type=int, default=10)
+        parser.add_argument('--ofertas-por-repuesto', type=int, default=5)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--repeticiones', type=int, default=30, help="Peticiones medidas por endpoint.")
+        parser.add_argument('--calentamiento', type=int, default=3, help="Peticiones previas sin medir.")
+        parser.add_argument('--presupuestos', default=str(DIRECTORIO / 'presupuestos.json'))
+        parser.add_argument('--salida', default=str(DIRECTORIO / 'resultados.json'))
+        parser.add_argument('--base', help="Resultados anteriores (JSON) contra los que detectar regresiones.")
+        parser.add_argument('--keepdb', action='store_true',
+                            help="Reutiliza la base de prueba (y sus datos) entre corridas.")
+        parser.add_argument('--con-cache', action='store_true',
+                            help="Mide con la caché de respuestas activa (por defecto se vacía antes de cada petición).")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            if not RepuestoGlobal.objects.exists():
+                self.stdout.write("Generando datos...")
+                GeneradorCatalogo(semilla=options['semilla'], salida=self.stdout.write).generar(
+                    tiendas=options['tiendas'],
+                    sucursales=options['sucursales'],
+                    categorias=12,
+                    vehiculos=options['vehiculos'],
+                    repuestos=options['repuestos'],
+                    compat_por_repuesto=options['compat_per_part'],
+                    ofertas_por_repuesto=options['ofertas_por_repuesto'],
+                )
+            # El índice de sugerencias se construye antes de medir, para no
+            # medir respuestas vacías mientras se construye en segundo plano.
+            sugerencias.construir()
+            resultados = {
+                'fecha': datetime.now(timezone.utc).isoformat(),
+                'escala': {
+                    'repuestos': RepuestoGlobal.objects.count(),
+                    'vehiculos': Vehiculo.objects.count(),
+                    'sucursales': Sucursal.objects.count(),
+                    'ofertas': RepuestoSucursal.objects.count(),
+                },
+                'con_cache': options['con_cache'],
+                'endpoints': {
+                    nombre: self.medir(
+                        url, options['repeticiones'], options['calentamiento'],
+                        options['con_cache'] or nombre in self.sin_vaciar_cache,
+                        sin_consultas=nombre in self.sin_consultas,
+                    )
+                    for nombre, url in self.get_endpoints()
+                },
+            }
+            resultados['listado_rapido'] = self.comparar_listado_rapido(
+                resultados['endpoints'], options['repeticiones'], options['calentamiento']
+            )
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        salida = Path(options['salida'])
+        salida.parent.mkdir(parents=True, exist_ok=True)
+        salida.write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding='utf-8')
+        self.mostrar(resultados)
+        self.stdout.write(f"Resultados guardados en {salida}.")
+
+        errores = self.verificar_presupuestos(resultados, options['presupuestos'])
+        if options['base']:
+            errores += self.verificar_regresiones(resultados, options['base'], options['presupuestos'])
+        if errores:
+            for error in errores:
+                self.stderr.write(error)
+            raise CommandError(f"{len(errores)} presupuesto(s) superado(s).")
+        self.stdout.write(self.style.SUCCESS("Todos los endpoints están dentro del presupuesto."))
+
+    # -------------------------------------------------------------
+    # Endpoints y medición
+    # -------------------------------------------------------------
+    def get_endpoints(self):
+        """Endpoints a medir, con ids y valores reales de los datos generados."""
+        vehiculo = Vehiculo.objects.order_by('id').first()
+        categoria = Categoria.objects.order_by('id').first()
+        repuesto = RepuestoGlobal.objects.filter(repuestosucursal__isnull=False).order_by('id').first()
+        oferta = RepuestoSucursal.objects.order_by('id').first()
+        sucursal = Sucursal.objects.order_by('id').first()
+        return [
+            ('repuestos', '/api/repuestos/'),
+            ('repuestos-globales', '/api/repuestos-globales/'),
+            ('repuestos-globales?marca', f'/api/repuestos-globales/?marca={vehiculo.marca}'),
+            ('repuestos-globales?modelo', f'/api/repuestos-globales/?modelo={vehiculo.modelo}'),
+            ('repuestos-globales?anio', f'/api/repuestos-globales/?anio={vehiculo.anio}'),
+            ('repuestos-globales?categoria_id', f'/api/repuestos-globales/?categoria_id={categoria.pk}'),
+            ('repuestos-globales?search', '/api/repuestos-globales/?search=pastilla freno'),
+            ('repuestos-globales/facetas', '/api/repuestos-globales/facetas/'),
+            ('repuestos-globales/facetas?marca', f'/api/repuestos-globales/facetas/?marca={vehiculo.marca}'),
+            ('sugerencias', '/api/sugerencias/?q=pastilla%20de%20fr'),
+            ('fitment', f'/api/fitment/?marca={vehiculo.marca}&modelo={vehiculo.modelo}&anio={vehiculo.anio}'),
+            ('comparar-precios?marca', f'/api/comparar-precios/?marca={vehiculo.marca}'),
+            ('repuestos-sucursales?repuesto_id', f'/api/repuestos-sucursales/?repuesto_id={repuesto.pk}'),
+            ('repuesto-global-detalle', f'/api/repuestos-globales/{repuesto.pk}/'),
+            ('repuesto-sucursal-detalle', f'/api/repuestos-sucursales/{oferta.pk}/'),
+            ('sucursal-detalle', f'/api/sucursales/{sucursal.pk}/'),
+        ]
+
+    def medir(self, url, repeticiones, calentamiento, con_cache, sin_consultas=False):
+        """
+        Mide las repeticiones después del calentamiento. Las consultas se
+        cuentan en todas las conexiones (también las réplicas) en cada
+        petición medida, y se informa la mayor: una petición que consulta
+        solo a veces (caché vencida, sincronización) también cuenta.
+        """
+        client = Client()
+        cache = get_cache()
+        consultas = []
+
+        def contar(execute, sql, params, many, context):
+            consultas[-1] += 1
+            return execute(sql, params, many, context)
+
+        def pedir():
+            # Sin --con-cache se mide el camino completo (consultas y serialización).
+            if not con_cache:
+                cache.clear()
+            consultas.append(0)
+            with ExitStack() as pila:
+                for conexion in connections.all():
+                    pila.enter_context(conexion.execute_wrapper(contar))
+                inicio = time.perf_counter()
+                respuesta = client.get(url)
+                milisegundos = (time.perf_counter() - inicio) * 1000
+            if respuesta.status_code != 200:
+                raise CommandError(f"{url} respondió {respuesta.status_code}.")
+            return respuesta, milisegundos
+
+        for _ in range(calentamiento):
+            pedir()
+        del consultas[:]
+
+        tiempos = []
+        for _ in range(repeticiones):
+            respuesta, milisegundos = pedir()
+            tiempos.append(milisegundos)
+        if sin_consultas and any(consultas):
+            raise CommandError(
+                f"{url} consultó la base en {sum(map(bool, consultas))} de {repeticiones} peticiones "
+                f"(hasta {max(consultas)} consultas)."
+            )
+
+        return {
+            'url': url,
+            'p50_ms': round(statistics.median(tiempos), 2),
+            'p95_ms': round(percentil(tiempos, 95), 2),
+            'consultas': max(consultas),
+            'bytes': len(respuesta.content),
+        }
+
+    def comparar_listado_rapido(self, endpoints, repeticiones, calentamiento):
+        """p50 de cada listado con el serializador de DRF y con el camino rápido, sin caché."""
+        comparacion = {}
+        for nombre in self.comparar_listados:
+            url = endpoints[nombre]['url']
+            with override_settings(API_LISTADO_RAPIDO=False):
+                serializador = self.medir(url, repeticiones, calentamiento, con_cache=False)
+            rapido = self.medir(url, repeticiones, calentamiento, con_cache=False)
+            comparacion[nombre] = {
+                'serializador_p50_ms': serializador['p50_ms'],
+                'rapido_p50_ms': rapido['p50_ms'],
+                'aceleracion': round(serializador['p50_ms'] / rapido['p50_ms'], 2),
+                'mismos_bytes': serializador['bytes'] == rapido['bytes'],
+            }
+        return comparacion
+
+    def mostrar(self, resultados):
+        self.stdout.write(f"{'endpoint':38} {'p50 ms':>8} {'p95 ms':>8} {'consultas':>9} {'bytes':>9}")
+        for nombre, r in resultados['endpoints'].items():
+            self.stdout.write(
+                f"{nombre:38} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['consultas']:9d} {r['bytes']:9d}"
+            )
+        self.stdout.write(f"\n{'listado (serializador vs. rápido)':38} {'p50 ms':>8} {'p50 ms':>8} {'aceler.':>9}")
+        for nombre, r in resultados.get('listado_rapido', {}).items():
+            self.stdout.write(
+                f"{nombre:38} {r['serializador_p50_ms']:8.2f} {r['rapido_p50_ms']:8.2f} {r['aceleracion']:8.2f}x"
+            )
+
+    # -------------------------------------------------------------
+    # Presupuestos
+    # -------------------------------------------------------------
+    @staticmethod
+    def cargar_presupuestos(ruta):
+        try:
+            return json.loads(Path(ruta).read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            raise CommandError(f"No se encontró el archivo de presupuestos {ruta}.")
+
+    def verificar_presupuestos(self, resultados, ruta):
+        """Compara cada métrica con su presupuesto absoluto (por endpoint o por defecto)."""
+        presupuestos = self.cargar_presupuestos(ruta)
+        errores = []
+        for nombre, medicion in resultados['endpoints'].items():
+            limites = {**presupuestos.get('por_defecto', {}), **presupuestos.get('endpoints', {}).get(nombre, {})}
+            for metrica, limite in limites.items():
+                if metrica in medicion and medicion[metrica] > limite:
+                    errores.append(f"{nombre}: {metrica} = {medicion[metrica]} (presupuesto {limite}).")
+        return errores
+
+    def verificar_regresiones(self, resultados, ruta_base, ruta_presupuestos):
+        """
+        Compara con una corrida anterior: las consultas no pueden aumentar y
+        la latencia p95 no puede crecer más que 'regresion_maxima' (fracción).
+        """
+        base = json.loads(Path(ruta_base).read_text(encoding='utf-8'))['endpoints']
+        tolerancia = self.cargar_presupuestos(ruta_presupuestos).get('regresion_maxima', 0.25)
+        errores = []
+        for nombre, medicion in resultados['endpoints'].items():
+            anterior = base.get(nombre)
+            if anterior is None:
+                continue
+            if medicion['consultas'] > anterior['consultas']:
+                errores.append(
+                    f"{nombre}: consultas {anterior['consultas']} -> {medicion['consultas']}."
+                )
+            if medicion['p95_ms'] > anterior['p95_ms'] * (1 + tolerancia):
+                errores.append(
+                    f"{nombre}: p95 {anterior['p95_ms']} ms -> {medicion['p95_ms']} ms "
+                    f"(tolerancia {tolerancia:.0%})."
+                )
+        return errores
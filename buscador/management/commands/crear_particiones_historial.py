@@ -0,0 +1,34 @@
+# buscador/management/commands/crear_particiones_historial.py
+from django.core.management.base import BaseCommand, CommandError
+
+from buscador.historial import borrar_particiones_anteriores, crear_particiones
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea por adelantado las particiones mensuales del historial de precios y, "
+        "opcionalmente, borra las de los meses más viejos (para cron, una vez al mes)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses', type=int, default=3,
+            help="Cantidad de meses a crear contando el actual (por defecto 3)."
+        )
+        parser.add_argument(
+            '--conservar', type=int,
+            help="Borra las particiones anteriores a los últimos N meses (contando el actual)."
+        )
+
+    def handle(self, *args, **options):
+        if options['meses'] < 1:
+            raise CommandError("--meses debe ser mayor que cero.")
+        if options['conservar'] is not None and options['conservar'] < 1:
+            raise CommandError("--conservar debe ser mayor que cero.")
+
+        creados = crear_particiones(options['meses'])
+        meses = ', '.join(mes.strftime('%Y-%m') for mes in creados) or 'ninguna (ya existían)'
+        self.stdout.write(self.style.SUCCESS(f"Particiones creadas: {meses}."))
+        if options['conservar'] is not None:
+            borradas = borrar_particiones_anteriores(options['conservar'])
+            self.stdout.write(self.style.SUCCESS(f"Particiones borradas: {', '.join(borradas) or 'ninguna'}."))
@@ -0,0 +1,38 @@
+# buscador/management/commands/importar_inventario.py
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from buscador.importacion import FORMATOS, TAMANIO_LOTE, importar_inventario
+from buscador.models import Sucursal
+
+
+class Command(BaseCommand):
+    help = "Importa precios y stock de una sucursal desde un archivo CSV o JSONL."
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo (columnas: codigo, precio, stock, stock_minimo).")
+        parser.add_argument('--sucursal', type=int, required=True, help="Id de la sucursal.")
+        parser.add_argument('--formato', choices=FORMATOS, help="Por defecto se deduce de la extensión.")
+        parser.add_argument('--lote', type=int, default=TAMANIO_LOTE, help="Filas por lote.")
+
+    def handle(self, *args, **options):
+        ruta = Path(options['archivo'])
+        formato = options['formato'] or ('jsonl' if ruta.suffix in ('.jsonl', '.ndjson') else 'csv')
+        try:
+            sucursal = Sucursal.objects.get(pk=options['sucursal'])
+        except Sucursal.DoesNotExist:
+            raise CommandError(f"No existe la sucursal {options['sucursal']}.")
+
+        with ruta.open(encoding='utf-8-sig', newline='') as archivo:
+            resultado = importar_inventario(sucursal, archivo, formato, options['lote'])
+
+        for linea, motivo in resultado.rechazadas:
+            self.stderr.write(f"Línea {linea}: {motivo}")
+        if resultado.filas_rechazadas > len(resultado.rechazadas):
+            self.stderr.write(f"... y {resultado.filas_rechazadas - len(resultado.rechazadas)} líneas rechazadas más.")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.filas_importadas} filas importadas ({resultado.filas_modificadas} con cambios), "
+            f"{resultado.filas_rechazadas} rechazadas, "
+            f"{resultado.filas_por_segundo:.0f} filas/s en {resultado.segundos:.2f} s."
+        ))
@@ -0,0 +1,12 @@
+# buscador/management/commands/liberar_reservas_vencidas.py
+from django.core.management.base import BaseCommand
+
+from buscador.reservas import liberar_vencidas
+
+
+class Command(BaseCommand):
+    help = "Libera las reservas de stock pendientes que vencieron y devuelve el stock a las ofertas (para cron)."
+
+    def handle(self, *args, **options):
+        liberadas = liberar_vencidas()
+        self.stdout.write(self.style.SUCCESS(f"Reservas vencidas liberadas: {liberadas}."))
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:12
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import UnaccentExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0001_initial'),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        # Configuración de búsqueda en español que además ignora los acentos.
+        migrations.RunSQL(
+            sql="""
+                CREATE TEXT SEARCH CONFIGURATION es_unaccent ( COPY = pg_catalog.spanish );
+                ALTER TEXT SEARCH CONFIGURATION es_unaccent
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+            """,
+            reverse_sql="DROP TEXT SEARCH CONFIGURATION IF EXISTS es_unaccent;",
+        ),
+        migrations.AddField(
+            model_name='repuestoglobal',
+            name='vector_busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Vector de Búsqueda'),
+        ),
+        migrations.AddIndex(
+            model_name='repuestoglobal',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['vector_busqueda'], name='repuesto_vector_busqueda_gin'),
+        ),
+        # Calcula el vector para los repuestos que ya existen.
+        migrations.RunSQL(
+            sql="""
+                UPDATE buscador_repuestoglobal AS r SET vector_busqueda =
+                    setweight(to_tsvector('es_unaccent', coalesce(r.nombre, '')), 'A') ||
+                    setweight(to_tsvector('es_unaccent', coalesce(r.codigo, '')), 'A') ||
+                    setweight(to_tsvector('es_unaccent', coalesce((
+                        SELECT c.nombre FROM buscador_categoria AS c
+                        WHERE c.id = r.categoria_id
+                    ), '')), 'B') ||
+                    setweight(to_tsvector('es_unaccent', coalesce((
+                        SELECT string_agg(v.marca || ' ' || v.modelo, ' ')
+                        FROM buscador_repuestoglobal_compatibilidad AS rc
+                        JOIN buscador_vehiculo AS v ON v.id = rc.vehiculo_id
+                        WHERE rc.repuestoglobal_id = r.id
+                    ), '')), 'B') ||
+                    setweight(to_tsvector('es_unaccent', coalesce(r.descripcion, '')), 'C');
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:03
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0002_repuestoglobal_vector_busqueda'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='repuestoglobal',
+            name='codigo_normalizado',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Upper(django.db.models.functions.text.Replace(django.db.models.functions.text.Replace('codigo', models.Value('-')), models.Value(' '))), output_field=models.CharField(max_length=50), verbose_name='Código Normalizado'),
+        ),
+        migrations.AddIndex(
+            model_name='repuestoglobal',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['codigo_normalizado'], name='repuesto_codigo_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='repuestoglobal',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['nombre'], name='repuesto_nombre_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
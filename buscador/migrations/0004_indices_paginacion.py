@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0003_repuestoglobal_codigo_normalizado_trgm'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='repuestosucursal',
+            options={'ordering': ['-fecha_actualizacion', '-id'], 'verbose_name': 'Repuesto por Sucursal', 'verbose_name_plural': 'Repuestos por Sucursal'},
+        ),
+        migrations.AddIndex(
+            model_name='repuestoglobal',
+            index=models.Index(fields=['nombre', 'id'], name='repuesto_orden_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repuestosucursal',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='repuesto_suc_orden_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sucursal',
+            index=models.Index(fields=['tienda', 'nombre', 'id'], name='sucursal_orden_idx'),
+        ),
+    ]
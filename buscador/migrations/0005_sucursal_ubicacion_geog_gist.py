@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0004_indices_paginacion'),
+    ]
+
+    operations = [
+        # Índice GiST sobre la ubicación como geography, para ordenar por
+        # distancia en metros con el operador <-> (KNN).
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX sucursal_ubicacion_geog_gist
+                ON buscador_sucursal USING GIST ((ubicacion::geography));
+            """,
+            reverse_sql="DROP INDEX IF EXISTS sucursal_ubicacion_geog_gist;",
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0005_sucursal_ubicacion_geog_gist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenInventario',
+            fields=[
+                ('repuesto_global', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen_inventario', serialize=False, to='buscador.repuestoglobal', verbose_name='Repuesto Global')),
+                ('stock_total', models.IntegerField(default=0, verbose_name='Stock total')),
+                ('precio_minimo', models.DecimalField(decimal_places=2, max_digits=10, null=True, verbose_name='Precio mínimo')),
+                ('precio_maximo', models.DecimalField(decimal_places=2, max_digits=10, null=True, verbose_name='Precio máximo')),
+                ('cantidad_sucursales', models.IntegerField(default=0, verbose_name='Cantidad de sucursales')),
+                ('ultima_actualizacion', models.DateTimeField(null=True, verbose_name='Última actualización del inventario')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Inventario',
+                'verbose_name_plural': 'Resúmenes de Inventario',
+            },
+        ),
+        # Calcula el resumen de los repuestos que ya existen.
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO buscador_resumeninventario (
+                    repuesto_global_id, stock_total, precio_minimo, precio_maximo,
+                    cantidad_sucursales, ultima_actualizacion
+                )
+                SELECT r.id, coalesce(sum(rs.stock), 0), min(rs.precio), max(rs.precio),
+                       count(rs.id), max(rs.fecha_actualizacion)
+                FROM buscador_repuestoglobal AS r
+                LEFT JOIN buscador_repuestosucursal AS rs ON rs.repuesto_global_id = r.id
+                GROUP BY r.id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
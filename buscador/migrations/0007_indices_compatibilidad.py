@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:20
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0006_resumeninventario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(django.db.models.functions.text.Lower('marca'), django.db.models.functions.text.Lower('modelo'), models.F('anio'), name='vehiculo_compatibilidad_idx'),
+        ),
+        # La tabla intermedia del ManyToMany ya tiene el índice único
+        # (repuestoglobal_id, vehiculo_id) para ir de repuesto a vehículos.
+        # Este es el del sentido inverso (vehículo -> repuestos), y permite
+        # resolver el EXISTS leyendo solo el índice.
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX compatibilidad_vehiculo_repuesto_idx
+                ON buscador_repuestoglobal_compatibilidad (vehiculo_id, repuestoglobal_id);
+            """,
+            reverse_sql="DROP INDEX IF EXISTS compatibilidad_vehiculo_repuesto_idx;",
+        ),
+    ]
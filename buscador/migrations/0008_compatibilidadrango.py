@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:05
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0007_indices_compatibilidad'),
+    ]
+
+    operations = [
+        # Permite combinar columnas de texto y rangos en un mismo índice GiST.
+        BtreeGistExtension(),
+        migrations.CreateModel(
+            name='CompatibilidadRango',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('marca', models.CharField(max_length=50, verbose_name='Marca')),
+                ('modelo', models.CharField(max_length=50, verbose_name='Modelo')),
+                ('anios', django.contrib.postgres.fields.ranges.IntegerRangeField(verbose_name='Años')),
+                ('repuesto_global', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rangos_compatibilidad', to='buscador.repuestoglobal', verbose_name='Repuesto Global')),
+            ],
+            options={
+                'verbose_name': 'Rango de Compatibilidad',
+                'verbose_name_plural': 'Rangos de Compatibilidad',
+                'ordering': ['marca', 'modelo', 'anios'],
+                'indexes': [django.contrib.postgres.indexes.GistIndex(django.db.models.functions.text.Lower('marca'), django.db.models.functions.text.Lower('modelo'), models.F('anios'), name='compat_rango_gist')],
+            },
+        ),
+        # Compacta la compatibilidad existente: los años consecutivos de un
+        # mismo modelo quedan en una sola fila.
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO buscador_compatibilidadrango (repuesto_global_id, marca, modelo, anios)
+                SELECT repuesto_global_id, marca, modelo, int4range(min(anio), max(anio) + 1)
+                FROM (
+                    SELECT rc.repuestoglobal_id AS repuesto_global_id, v.marca, v.modelo, v.anio,
+                           v.anio - row_number() OVER (
+                               PARTITION BY rc.repuestoglobal_id, v.marca, v.modelo ORDER BY v.anio
+                           ) AS racha
+                    FROM buscador_repuestoglobal_compatibilidad AS rc
+                    JOIN buscador_vehiculo AS v ON v.id = rc.vehiculo_id
+                ) AS anios
+                GROUP BY repuesto_global_id, marca, modelo, racha;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0008_compatibilidadrango'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='repuestoglobal',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='repuesto_actualizacion_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0009_repuestoglobal_actualizacion_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='repuestosucursal',
+            index=models.Index(
+                condition=models.Q(('activo', True), ('stock__gt', 0)),
+                fields=['repuesto_global', 'precio', 'id'],
+                name='oferta_precio_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0010_repuestosucursal_oferta_precio_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='repuestoglobal',
+            name='repuesto_orden_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='sucursal',
+            name='sucursal_orden_idx',
+        ),
+        migrations.AddIndex(
+            model_name='repuestoglobal',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['nombre', 'id'], name='repuesto_activo_orden_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repuestosucursal',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['repuesto_global'], name='oferta_activa_repuesto_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sucursal',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['tienda', 'nombre', 'id'], name='sucursal_activa_orden_idx'),
+        ),
+    ]
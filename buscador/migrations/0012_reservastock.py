@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 20:30
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0011_indices_activos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pedido', models.UUIDField(db_index=True, default=uuid.uuid4, verbose_name='Pedido')),
+                ('cantidad', models.PositiveIntegerField(verbose_name='Cantidad')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('confirmada', 'Confirmada'), ('liberada', 'Liberada'), ('vencida', 'Vencida')], default='pendiente', max_length=10, verbose_name='Estado')),
+                ('vence', models.DateTimeField(verbose_name='Vence')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('oferta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='buscador.repuestosucursal', verbose_name='Oferta')),
+            ],
+            options={
+                'verbose_name': 'Reserva de Stock',
+                'verbose_name_plural': 'Reservas de Stock',
+                'ordering': ['-fecha_creacion', '-id'],
+                'indexes': [models.Index(condition=models.Q(('estado', 'pendiente')), fields=['vence'], name='reserva_pendiente_vence_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('cantidad__gt', 0)), name='reserva_cantidad_positiva')],
+            },
+        ),
+    ]
@@ -0,0 +1,152 @@
+# Generated by Django 5.2.5 on 2026-10-18 21:10
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0012_reservastock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistorialPrecio',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('precio', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio')),
+                ('stock', models.IntegerField(verbose_name='Stock')),
+                ('activo', models.BooleanField(verbose_name='Activo')),
+                ('fecha', models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), verbose_name='Fecha')),
+                ('oferta', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='historial', to='buscador.repuestosucursal', verbose_name='Oferta')),
+                ('repuesto_global', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='buscador.repuestoglobal', verbose_name='Repuesto Global')),
+                ('sucursal', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='buscador.sucursal', verbose_name='Sucursal')),
+            ],
+            options={
+                'verbose_name': 'Historial de Precio',
+                'verbose_name_plural': 'Historial de Precios',
+                'db_table': 'buscador_historialprecio',
+                'ordering': ['fecha', 'id'],
+                'managed': False,
+            },
+        ),
+        # Tabla particionada por mes (en UTC). La partición por defecto recibe
+        # las filas de los meses que todavía no tienen partición, para que
+        # ningún cambio de inventario falle por eso.
+        migrations.RunSQL(
+            sql="""
+                CREATE TABLE buscador_historialprecio (
+                    id bigserial,
+                    oferta_id bigint NOT NULL,
+                    repuesto_global_id bigint NOT NULL,
+                    sucursal_id bigint NOT NULL,
+                    precio numeric(10, 2) NOT NULL,
+                    stock integer NOT NULL,
+                    activo boolean NOT NULL,
+                    fecha timestamp with time zone NOT NULL DEFAULT now(),
+                    PRIMARY KEY (id, fecha)
+                ) PARTITION BY RANGE (fecha);
+                CREATE TABLE buscador_historialprecio_default
+                    PARTITION OF buscador_historialprecio DEFAULT;
+
+                -- Las filas se agregan en orden de fecha: BRIN ocupa muy poco
+                -- y alcanza para los recorridos por rango de fechas.
+                CREATE INDEX historial_fecha_brin ON buscador_historialprecio USING brin (fecha);
+                -- Series de un repuesto (todas las sucursales) y de una oferta.
+                CREATE INDEX historial_repuesto_fecha_idx ON buscador_historialprecio (repuesto_global_id, fecha);
+                CREATE INDEX historial_oferta_fecha_idx ON buscador_historialprecio (oferta_id, fecha);
+            """,
+            reverse_sql="DROP TABLE IF EXISTS buscador_historialprecio;",
+        ),
+        # Crea la partición del mes que contiene `mes` si no existe. Las filas
+        # de ese mes que hayan caído en la partición por defecto se pasan a la
+        # nueva antes de adjuntarla (si no, ATTACH PARTITION falla).
+        migrations.RunSQL(
+            sql="""
+                CREATE FUNCTION buscador_crear_particion_historial(mes date) RETURNS boolean AS $$
+                DECLARE
+                    inicio timestamp := date_trunc('month', mes::timestamp);
+                    desde timestamptz := inicio AT TIME ZONE 'UTC';
+                    hasta timestamptz := (inicio + interval '1 month') AT TIME ZONE 'UTC';
+                    nombre text := 'buscador_historialprecio_' || to_char(inicio, 'YYYY_MM');
+                BEGIN
+                    IF to_regclass(nombre) IS NOT NULL THEN
+                        RETURN false;
+                    END IF;
+                    EXECUTE format(
+                        'CREATE TABLE %I (LIKE buscador_historialprecio INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                        nombre
+                    );
+                    EXECUTE format(
+                        'WITH movidas AS (DELETE FROM buscador_historialprecio_default'
+                        ' WHERE fecha >= %L AND fecha < %L RETURNING *) INSERT INTO %I SELECT * FROM movidas',
+                        desde, hasta, nombre
+                    );
+                    EXECUTE format(
+                        'ALTER TABLE buscador_historialprecio ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                        nombre, desde, hasta
+                    );
+                    RETURN true;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                SELECT buscador_crear_particion_historial(
+                    ((now() AT TIME ZONE 'UTC')::date + make_interval(months => m))::date
+                )
+                FROM generate_series(0, 2) AS m;
+            """,
+            reverse_sql="DROP FUNCTION IF EXISTS buscador_crear_particion_historial(date);",
+        ),
+        # Triggers por sentencia con tablas de transición: una importación
+        # masiva agrega su historial con un solo INSERT ... SELECT. En las
+        # actualizaciones solo se registran las filas en las que cambió el
+        # precio, el stock o activo.
+        migrations.RunSQL(
+            sql="""
+                CREATE FUNCTION buscador_historial_ofertas_insertadas() RETURNS trigger AS $$
+                BEGIN
+                    INSERT INTO buscador_historialprecio
+                        (oferta_id, repuesto_global_id, sucursal_id, precio, stock, activo)
+                    SELECT n.id, n.repuesto_global_id, n.sucursal_id, n.precio, n.stock, n.activo
+                    FROM nuevas AS n;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE FUNCTION buscador_historial_ofertas_actualizadas() RETURNS trigger AS $$
+                BEGIN
+                    INSERT INTO buscador_historialprecio
+                        (oferta_id, repuesto_global_id, sucursal_id, precio, stock, activo)
+                    SELECT n.id, n.repuesto_global_id, n.sucursal_id, n.precio, n.stock, n.activo
+                    FROM nuevas AS n
+                    JOIN viejas AS v ON v.id = n.id
+                    WHERE (n.precio, n.stock, n.activo) IS DISTINCT FROM (v.precio, v.stock, v.activo);
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER historial_ofertas_insertadas
+                    AFTER INSERT ON buscador_repuestosucursal
+                    REFERENCING NEW TABLE AS nuevas
+                    FOR EACH STATEMENT EXECUTE FUNCTION buscador_historial_ofertas_insertadas();
+                CREATE TRIGGER historial_ofertas_actualizadas
+                    AFTER UPDATE ON buscador_repuestosucursal
+                    REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas
+                    FOR EACH STATEMENT EXECUTE FUNCTION buscador_historial_ofertas_actualizadas();
+
+                -- Estado inicial de las ofertas que ya existen.
+                INSERT INTO buscador_historialprecio
+                    (oferta_id, repuesto_global_id, sucursal_id, precio, stock, activo)
+                SELECT id, repuesto_global_id, sucursal_id, precio, stock, activo
+                FROM buscador_repuestosucursal;
+            """,
+            reverse_sql="""
+                DROP TRIGGER IF EXISTS historial_ofertas_actualizadas ON buscador_repuestosucursal;
+                DROP TRIGGER IF EXISTS historial_ofertas_insertadas ON buscador_repuestosucursal;
+                DROP FUNCTION IF EXISTS buscador_historial_ofertas_actualizadas();
+                DROP FUNCTION IF EXISTS buscador_historial_ofertas_insertadas();
+            """,
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-18 22:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0013_historialprecio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Eliminacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=100, verbose_name='Modelo')),
+                ('objeto_id', models.BigIntegerField(verbose_name='Id del objeto')),
+                ('fecha', models.DateTimeField(auto_now_add=True, verbose_name='Fecha')),
+            ],
+            options={
+                'verbose_name': 'Eliminación',
+                'verbose_name_plural': 'Eliminaciones',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['modelo', 'id'], name='eliminacion_modelo_idx')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tienda',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='tienda_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sucursal',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='sucursal_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='categoria',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='categoria_actualizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehiculo',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='vehiculo_actualizacion_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Tabla de la caché de versiones del catálogo (CACHES['catalogo_versiones'])
+# cuando no se usa Redis: la comparten todos los procesos.
+from django.core.management import call_command
+from django.db import migrations
+
+TABLA = 'buscador_cache_versiones'
+
+
+def crear_tabla(apps, schema_editor):
+    call_command('createcachetable', TABLA, database=schema_editor.connection.alias, verbosity=0)
+
+
+def borrar_tabla(apps, schema_editor):
+    schema_editor.execute(f'DROP TABLE IF EXISTS {schema_editor.quote_name(TABLA)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0014_sincronizacion'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_tabla, borrar_tabla),
+    ]
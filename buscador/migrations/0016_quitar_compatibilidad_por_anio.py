@@ -0,0 +1,71 @@
+# La compatibilidad se guarda solo por rangos (CompatibilidadRango): se
+# recalculan los rangos desde la tabla intermedia, una fila por año, y se
+# borra esa tabla junto con su índice (0007).
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0015_cache_versiones'),
+    ]
+
+    operations = [
+        # Los mismos rangos que mantenían las señales: años consecutivos de
+        # vehículos activos.
+        migrations.RunSQL(
+            sql="""
+                DELETE FROM buscador_compatibilidadrango;
+                INSERT INTO buscador_compatibilidadrango (repuesto_global_id, marca, modelo, anios)
+                SELECT repuesto_global_id, marca, modelo, int4range(min(anio), max(anio) + 1)
+                FROM (
+                    SELECT rc.repuestoglobal_id AS repuesto_global_id, v.marca, v.modelo, v.anio,
+                           v.anio - row_number() OVER (
+                               PARTITION BY rc.repuestoglobal_id, v.marca, v.modelo ORDER BY v.anio
+                           ) AS racha
+                    FROM buscador_repuestoglobal_compatibilidad AS rc
+                    JOIN buscador_vehiculo AS v ON v.id = rc.vehiculo_id
+                    WHERE v.activo
+                ) AS anios
+                GROUP BY repuesto_global_id, marca, modelo, racha;
+            """,
+            # Vuelve a llenar la tabla intermedia con los vehículos de cada rango.
+            reverse_sql="""
+                INSERT INTO buscador_repuestoglobal_compatibilidad (repuestoglobal_id, vehiculo_id)
+                SELECT DISTINCT r.repuesto_global_id, v.id
+                FROM buscador_compatibilidadrango AS r
+                JOIN buscador_vehiculo AS v
+                  ON v.marca = r.marca AND v.modelo = r.modelo AND r.anios @> v.anio;
+            """,
+        ),
+        migrations.RunSQL(
+            sql="DROP INDEX IF EXISTS compatibilidad_vehiculo_repuesto_idx;",
+            reverse_sql="""
+                CREATE INDEX compatibilidad_vehiculo_repuesto_idx
+                ON buscador_repuestoglobal_compatibilidad (vehiculo_id, repuestoglobal_id);
+            """,
+        ),
+        migrations.RemoveField(
+            model_name='repuestoglobal',
+            name='compatibilidad',
+        ),
+        # El vector de búsqueda toma las marcas y modelos de los rangos.
+        migrations.RunSQL(
+            sql="""
+                UPDATE buscador_repuestoglobal AS r SET vector_busqueda =
+                    setweight(to_tsvector('es_unaccent', coalesce(r.nombre, '')), 'A') ||
+                    setweight(to_tsvector('es_unaccent', coalesce(r.codigo, '')), 'A') ||
+                    setweight(to_tsvector('es_unaccent', coalesce((
+                        SELECT c.nombre FROM buscador_categoria AS c
+                        WHERE c.id = r.categoria_id
+                    ), '')), 'B') ||
+                    setweight(to_tsvector('es_unaccent', coalesce((
+                        SELECT string_agg(rc.marca || ' ' || rc.modelo, ' ')
+                        FROM buscador_compatibilidadrango AS rc
+                        WHERE rc.repuesto_global_id = r.id
+                    ), '')), 'B') ||
+                    setweight(to_tsvector('es_unaccent', coalesce(r.descripcion, '')), 'C');
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,23 @@
+# El índice GiST de los rangos incluye el repuesto: reemplaza al índice
+# (vehiculo_id, repuestoglobal_id) de la tabla intermedia borrada en 0016.
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buscador', '0016_quitar_compatibilidad_por_anio'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='compatibilidadrango',
+            name='compat_rango_gist',
+        ),
+        migrations.AddIndex(
+            model_name='compatibilidadrango',
+            index=django.contrib.postgres.indexes.GistIndex(django.db.models.functions.text.Lower('marca'), django.db.models.functions.text.Lower('modelo'), 'anios', include=['repuesto_global'], name='compat_rango_gist'),
+        ),
+    ]
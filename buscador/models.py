@@ -1,12 +1,25 @@
 # buscador/models.py
+import uuid
+
 from django.db import models
 from django.contrib.gis.db import models as gis_models
 from django.contrib.gis.geos import Point
+from django.contrib.postgres.fields import IntegerRangeField
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models.functions import Lower, Now, Replace, Upper
 
 # =================================================================
 # Modelo Base (Abstracto)
 # Contiene campos comunes a todos los modelos para evitar repetición.
 # =================================================================
+class ActivosManager(models.Manager):
+    """Manager que devuelve solo las filas activas (activo=True)."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(activo=True)
+
+
 class BaseModel(models.Model):
     """
     Modelo base abstracto para incluir campos comunes como la fecha de
@@ -25,6 +38,13 @@ class BaseModel(models.Model):
         verbose_name="Activo"
     )
 
+    # El manager por defecto (el primero) oculta las filas inactivas: lo usan
+    # las vistas, los filtros y las relaciones inversas y ManyToMany.
+    # all_objects incluye también las inactivas (mantenimiento, sincronización).
+    # Las FK hacia un objeto inactivo se siguen resolviendo (_base_manager).
+    objects = ActivosManager()
+    all_objects = models.Manager()
+
     class Meta:
         abstract = True
         verbose_name = "Modelo Base"
@@ -74,6 +94,10 @@ class Tienda(BaseModel):
         verbose_name = "Tienda"
         verbose_name_plural = "Tiendas"
         ordering = ['nombre']
+        indexes = [
+            # Lectura incremental de los cambios (sincronización, /api/sync/).
+            models.Index(fields=['fecha_actualizacion', 'id'], name='tienda_actualizacion_idx'),
+        ]
 
     def __str__(self):
         return self.nombre
@@ -114,6 +138,17 @@ class Sucursal(BaseModel):
         verbose_name = "Sucursal"
         verbose_name_plural = "Sucursales"
         ordering = ['tienda', 'nombre']
+        indexes = [
+            # Orden de la paginación por cursor: (tienda_id, nombre, id), y
+            # sucursales de una tienda. Solo las filas activas.
+            models.Index(
+                fields=['tienda', 'nombre', 'id'],
+                condition=models.Q(activo=True),
+                name='sucursal_activa_orden_idx'
+            ),
+            # Lectura incremental de los cambios (sincronización, /api/sync/).
+            models.Index(fields=['fecha_actualizacion', 'id'], name='sucursal_actualizacion_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} ({self.tienda.nombre})"
@@ -141,6 +176,10 @@ class Categoria(BaseModel):
         verbose_name = "Categoría"
         verbose_name_plural = "Categorías"
         ordering = ['nombre']
+        indexes = [
+            # Lectura incremental de los cambios (sincronización, /api/sync/).
+            models.Index(fields=['fecha_actualizacion', 'id'], name='categoria_actualizacion_idx'),
+        ]
 
     def __str__(self):
         return self.nombre
@@ -149,7 +188,8 @@ class Categoria(BaseModel):
 class Vehiculo(BaseModel):
     """
     Representa la información de un vehículo (marca, modelo, año).
-    Este modelo es la clave para manejar la compatibilidad de forma robusta.
+    La compatibilidad de los repuestos se guarda por rangos de años en
+    CompatibilidadRango, no por vehículo.
     """
     marca = models.CharField(
         max_length=50,
@@ -168,6 +208,12 @@ class Vehiculo(BaseModel):
         verbose_name_plural = "Vehículos"
         unique_together = ('marca', 'modelo', 'anio')
         ordering = ['marca', 'modelo', 'anio']
+        indexes = [
+            # Búsqueda de vehículos sin distinguir mayúsculas (ver buscador/compatibilidad.py).
+            models.Index(Lower('marca'), Lower('modelo'), 'anio', name='vehiculo_compatibilidad_idx'),
+            # Lectura incremental de los cambios (sincronización, /api/sync/).
+            models.Index(fields=['fecha_actualizacion', 'id'], name='vehiculo_actualizacion_idx'),
+        ]
 
     def __str__(self):
         return f"{self.marca} {self.modelo} ({self.anio})"
@@ -209,27 +255,101 @@ class RepuestoGlobal(BaseModel):
         blank=False,
         verbose_name="Código del Repuesto"
     )
+    # Código sin guiones ni espacios y en mayúsculas ('fa 123' -> 'FA123').
+    # Lo calcula la base de datos y se usa para la búsqueda difusa por código.
+    codigo_normalizado = models.GeneratedField(
+        expression=Upper(Replace(Replace('codigo', models.Value('-')), models.Value(' '))),
+        output_field=models.CharField(max_length=50),
+        db_persist=True,
+        verbose_name="Código Normalizado"
+    )
     cantidad = models.IntegerField(
         default=0,
         verbose_name="Cantidad"
     )
-    
-    # Relación ManyToMany con el modelo Vehiculo para manejar la compatibilidad.
-    compatibilidad = models.ManyToManyField(
-        Vehiculo,
-        related_name='repuestos_compatibles',
-        verbose_name="Vehículos compatibles"
+
+    # Vector de búsqueda de texto completo (nombre, código, descripción, categoría
+    # y marcas y modelos compatibles). Es un campo desnormalizado que se mantiene
+    # desde las señales de buscador/signals.py y desde establecer_compatibilidad
+    # (buscador/compatibilidad.py); no se edita a mano.
+    vector_busqueda = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name="Vector de Búsqueda"
     )
 
     class Meta:
         verbose_name = "Repuesto Global"
         verbose_name_plural = "Repuestos Globales"
         ordering = ['nombre']
+        indexes = [
+            # Orden de la paginación por cursor: (nombre, id). Solo las filas activas.
+            models.Index(fields=['nombre', 'id'], condition=models.Q(activo=True), name='repuesto_activo_orden_idx'),
+            # Lectura incremental de los cambios (índice de sugerencias, /api/sync/).
+            models.Index(fields=['fecha_actualizacion', 'id'], name='repuesto_actualizacion_idx'),
+            GinIndex(fields=['vector_busqueda'], name='repuesto_vector_busqueda_gin'),
+            # Índices de trigramas para la búsqueda difusa (tolerante a errores de tipeo).
+            GinIndex(fields=['codigo_normalizado'], opclasses=['gin_trgm_ops'], name='repuesto_codigo_trgm'),
+            GinIndex(fields=['nombre'], opclasses=['gin_trgm_ops'], name='repuesto_nombre_trgm'),
+        ]
 
     def __str__(self):
         return self.nombre
 
 
+class CompatibilidadRango(models.Model):
+    """
+    Compatibilidad de un repuesto expresada por rangos de años: una fila por
+    marca, modelo y años consecutivos ('Toyota Corolla 2005-2019'), en lugar
+    de una fila por año. Es la única tabla de compatibilidad: se escribe con
+    compatibilidad.establecer_compatibilidad y es la que usan los filtros.
+    """
+    repuesto_global = models.ForeignKey(
+        RepuestoGlobal,
+        on_delete=models.CASCADE,
+        related_name='rangos_compatibilidad',
+        verbose_name="Repuesto Global"
+    )
+    marca = models.CharField(
+        max_length=50,
+        verbose_name="Marca"
+    )
+    modelo = models.CharField(
+        max_length=50,
+        verbose_name="Modelo"
+    )
+    # Rango semiabierto [desde, hasta + 1), la forma canónica de int4range.
+    anios = IntegerRangeField(
+        verbose_name="Años"
+    )
+
+    class Meta:
+        verbose_name = "Rango de Compatibilidad"
+        verbose_name_plural = "Rangos de Compatibilidad"
+        ordering = ['marca', 'modelo', 'anios']
+        indexes = [
+            # marca y modelo sin distinguir mayúsculas y año contenido en el rango
+            # (anios @> 2020), en un solo índice GiST (requiere btree_gist). Con
+            # el repuesto incluido, el EXISTS de los filtros se resuelve leyendo
+            # solo el índice, como con el de la tabla intermedia (0007). El otro
+            # sentido (repuesto -> rangos) usa el índice de la FK.
+            GistIndex(
+                Lower('marca'), Lower('modelo'), 'anios', include=['repuesto_global'], name='compat_rango_gist'
+            ),
+        ]
+
+    @property
+    def anio_desde(self):
+        return self.anios.lower
+
+    @property
+    def anio_hasta(self):
+        return self.anios.upper - 1 if self.anios.upper is not None else None
+
+    def __str__(self):
+        return f"{self.marca} {self.modelo} ({self.anio_desde}-{self.anio_hasta})"
+
+
 # =================================================================
 # Relación de Repuestos con Sucursales (Stock y Precio)
 # =================================================================
@@ -266,6 +386,242 @@ class RepuestoSucursal(BaseModel):
         verbose_name = "Repuesto por Sucursal"
         verbose_name_plural = "Repuestos por Sucursal"
         unique_together = ('sucursal', 'repuesto_global')
+        # Los cambios más recientes primero.
+        ordering = ['-fecha_actualizacion', '-id']
+        indexes = [
+            # Orden de la paginación por cursor: (fecha_actualizacion, id), y
+            # lectura incremental de los cambios (/api/sync/).
+            models.Index(fields=['fecha_actualizacion', 'id'], name='repuesto_suc_orden_idx'),
+            # Ofertas activas de un repuesto (?repuesto_id=, detalle con inventario).
+            models.Index(
+                fields=['repuesto_global'],
+                condition=models.Q(activo=True),
+                name='oferta_activa_repuesto_idx'
+            ),
+            # Ofertas con stock de un repuesto ordenadas por precio (comparación
+            # de precios, ver buscador/precios.py). Solo las filas que se comparan.
+            models.Index(
+                fields=['repuesto_global', 'precio', 'id'],
+                condition=models.Q(stock__gt=0, activo=True),
+                name='oferta_precio_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.repuesto_global.nombre} en {self.sucursal.nombre}"
+
+
+# =================================================================
+# Historial de precios y stock (serie temporal)
+# =================================================================
+class HistorialPrecio(models.Model):
+    """
+    Estado de una oferta (precio, stock y activo) cada vez que cambia. Solo se
+    agregan filas, desde triggers de la base sobre RepuestoSucursal, así que
+    también quedan registrados los cambios hechos con UPDATE o la importación
+    masiva. La tabla está particionada por mes en la base (ver la migración
+    0013 y buscador/historial.py) y Django no la administra.
+    Las referencias no tienen restricción de FK: el historial se conserva
+    aunque se borre la oferta.
+    """
+    # En la base la clave primaria es (id, fecha), como exige el particionado.
+    id = models.BigAutoField(primary_key=True)
+    oferta = models.ForeignKey(
+        RepuestoSucursal,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='historial',
+        verbose_name="Oferta"
+    )
+    repuesto_global = models.ForeignKey(
+        RepuestoGlobal,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name="Repuesto Global"
+    )
+    sucursal = models.ForeignKey(
+        Sucursal,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name="Sucursal"
+    )
+    precio = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        verbose_name="Precio"
+    )
+    stock = models.IntegerField(
+        verbose_name="Stock"
+    )
+    activo = models.BooleanField(
+        verbose_name="Activo"
+    )
+    fecha = models.DateTimeField(
+        db_default=Now(),
+        verbose_name="Fecha"
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'buscador_historialprecio'
+        verbose_name = "Historial de Precio"
+        verbose_name_plural = "Historial de Precios"
+        ordering = ['fecha', 'id']
+
+    def __str__(self):
+        return f"{self.oferta_id}: {self.precio} ({self.fecha})"
+
+
+# =================================================================
+# Reservas de stock
+# =================================================================
+class ReservaStock(models.Model):
+    """
+    Reserva de stock de una oferta mientras se completa una venta. Al reservar
+    se descuenta el stock de la oferta; si la reserva no se confirma antes de
+    `vence`, se libera y el stock vuelve (ver buscador/reservas.py). Las
+    líneas de un mismo pedido comparten el identificador `pedido`.
+    """
+
+    class Estado(models.TextChoices):
+        PENDIENTE = 'pendiente', "Pendiente"
+        CONFIRMADA = 'confirmada', "Confirmada"
+        LIBERADA = 'liberada', "Liberada"
+        VENCIDA = 'vencida', "Vencida"
+
+    pedido = models.UUIDField(
+        default=uuid.uuid4,
+        db_index=True,
+        verbose_name="Pedido"
+    )
+    oferta = models.ForeignKey(
+        RepuestoSucursal,
+        on_delete=models.CASCADE,
+        related_name='reservas',
+        verbose_name="Oferta"
+    )
+    cantidad = models.PositiveIntegerField(
+        verbose_name="Cantidad"
+    )
+    estado = models.CharField(
+        max_length=10,
+        choices=Estado.choices,
+        default=Estado.PENDIENTE,
+        verbose_name="Estado"
+    )
+    vence = models.DateTimeField(
+        verbose_name="Vence"
+    )
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Fecha de Creación"
+    )
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Fecha de Actualización"
+    )
+
+    class Meta:
+        verbose_name = "Reserva de Stock"
+        verbose_name_plural = "Reservas de Stock"
+        ordering = ['-fecha_creacion', '-id']
+        constraints = [
+            models.CheckConstraint(condition=models.Q(cantidad__gt=0), name='reserva_cantidad_positiva'),
+        ]
+        indexes = [
+            # Reservas pendientes por vencimiento (liberación de las vencidas).
+            models.Index(
+                fields=['vence'],
+                condition=models.Q(estado='pendiente'),
+                name='reserva_pendiente_vence_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.cantidad} x {self.oferta_id} ({self.estado})"
+
+
+# =================================================================
+# Registro de borrados (sincronización incremental)
+# =================================================================
+class Eliminacion(models.Model):
+    """
+    Registro de una fila borrada del catálogo, para que la sincronización
+    incremental (/api/sync/) informe el borrado a los clientes. Lo agregan
+    las señales (post_delete) de los modelos que se sincronizan.
+    """
+    modelo = models.CharField(
+        max_length=100,
+        verbose_name="Modelo"
+    )
+    objeto_id = models.BigIntegerField(
+        verbose_name="Id del objeto"
+    )
+    fecha = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Fecha"
+    )
+
+    class Meta:
+        verbose_name = "Eliminación"
+        verbose_name_plural = "Eliminaciones"
+        ordering = ['id']
+        indexes = [
+            # Borrados de un modelo a partir de la marca de agua del cliente.
+            models.Index(fields=['modelo', 'id'], name='eliminacion_modelo_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo} {self.objeto_id}"
+
+
+# =================================================================
+# Resumen de Inventario (datos derivados)
+# =================================================================
+class ResumenInventario(models.Model):
+    """
+    Resumen del inventario de un repuesto en todas las sucursales: stock
+    total, precios mínimo y máximo y cantidad de sucursales que lo ofrecen.
+    Es una tabla derivada de RepuestoSucursal que se actualiza por repuesto
+    (ver buscador/inventario.py), para no agregar en cada listado.
+    """
+    repuesto_global = models.OneToOneField(
+        RepuestoGlobal,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='resumen_inventario',
+        verbose_name="Repuesto Global"
+    )
+    stock_total = models.IntegerField(
+        default=0,
+        verbose_name="Stock total"
+    )
+    precio_minimo = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        verbose_name="Precio mínimo"
+    )
+    precio_maximo = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        verbose_name="Precio máximo"
+    )
+    cantidad_sucursales = models.IntegerField(
+        default=0,
+        verbose_name="Cantidad de sucursales"
+    )
+    ultima_actualizacion = models.DateTimeField(
+        null=True,
+        verbose_name="Última actualización del inventario"
+    )
+
+    class Meta:
+        verbose_name = "Resumen de Inventario"
+        verbose_name_plural = "Resúmenes de Inventario"
+
+    def __str__(self):
+        return f"Inventario de {self.repuesto_global_id}"
@@ -0,0 +1,48 @@
+# buscador/precios.py
+# Comparación de precios: las ofertas con stock más baratas de cada repuesto
+# entre todas las tiendas. Se resuelve con una sola consulta para toda la
+# página de repuestos: ROW_NUMBER() OVER (PARTITION BY repuesto_global_id
+# ORDER BY precio) numera las ofertas de cada repuesto y se quedan las
+# primeras. El índice parcial 'oferta_precio_idx' (repuesto_global_id,
+# precio, id) WHERE stock > 0 AND activo ya entrega las filas en ese orden.
+from django.db.models import Exists, F, OuterRef, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import RepuestoSucursal
+
+# Misma condición que el índice parcial, para que la base pueda usarlo.
+CON_STOCK = Q(stock__gt=0, activo=True)
+
+
+def con_ofertas(queryset):
+    """Filtra los repuestos que tienen al menos una oferta con stock."""
+    return queryset.filter(Exists(
+        RepuestoSucursal.objects.filter(CON_STOCK, repuesto_global_id=OuterRef('pk'))
+    ))
+
+
+def ofertas_mas_baratas(repuestos, limite=3, queryset=None):
+    """
+    Asigna a cada repuesto de la lista el atributo `ofertas_mas_baratas`: sus
+    `limite` ofertas con stock de menor precio (a igual precio, la más antigua).
+    `queryset` permite pasar un queryset de RepuestoSucursal con las relaciones
+    ya optimizadas para el serializador.
+    """
+    if queryset is None:
+        queryset = RepuestoSucursal.objects.select_related('sucursal__tienda')
+    ofertas = (
+        queryset.filter(CON_STOCK, repuesto_global_id__in=[repuesto.pk for repuesto in repuestos])
+        .annotate(puesto=Window(
+            RowNumber(),
+            partition_by=F('repuesto_global_id'),
+            order_by=[F('precio').asc(), F('id').asc()],
+        ))
+        .filter(puesto__lte=limite)
+        .order_by('repuesto_global_id', 'puesto')
+    )
+    por_repuesto = {repuesto.pk: [] for repuesto in repuestos}
+    for oferta in ofertas:
+        por_repuesto[oferta.repuesto_global_id].append(oferta)
+    for repuesto in repuestos:
+        repuesto.ofertas_mas_baratas = por_repuesto[repuesto.pk]
+    return repuestos
@@ -0,0 +1,222 @@
+# buscador/replicas.py
+# Lecturas en réplicas de la base de datos.
+# settings.REPLICAS indica los alias de DATABASES que son réplicas (de solo
+# lectura, por replicación de PostgreSQL) y su peso: {'replica_1': 3, 'replica_2': 1}
+# manda tres de cada cuatro peticiones a replica_1. Sin réplicas todo va a la
+# primaria ('default'), como siempre.
+#
+# Solo se leen de una réplica las peticiones GET/HEAD de las vistas marcadas
+# (listados, detalles y búsquedas del catálogo): las de clase con
+# LecturaReplicaMixin y las de función con el decorador lectura_en_replica.
+# El middleware elige la réplica para toda la petición. Todo lo demás usa la
+# primaria:
+# - las escrituras, y las lecturas dentro de una transacción;
+# - el resto de la petición después de una escritura;
+# - las peticiones del mismo cliente durante REPLICAS_PRIMARIA_SEGUNDOS después
+#   de una escritura (cookie firmada): una réplica puede estar unos instantes
+#   atrasada y el cliente tiene que ver lo que acaba de guardar.
+#
+# Las consultas con SQL propio usan connections[alias_lectura()] en lugar de
+# connection para respetar la misma elección. Las respuestas en streaming
+# recorren su contenido con iterar_en_la_peticion().
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+COOKIE = 'primaria_hasta'
+METODOS_LECTURA = ('GET', 'HEAD', 'OPTIONS')
+
+_estado = ContextVar('replicas', default=None)
+
+
+class EstadoPeticion:
+    """Réplica elegida para la petición en curso (None: primaria) y si ya escribió."""
+
+    def __init__(self):
+        self.alias = None
+        self.escribio = False
+
+
+def pesos_replicas():
+    return {alias: peso for alias, peso in getattr(settings, 'REPLICAS', {}).items() if peso > 0}
+
+
+def elegir_replica(pesos=None, aleatorio=random):
+    """Una réplica al azar según su peso, o None si no hay réplicas."""
+    pesos = pesos_replicas() if pesos is None else pesos
+    if not pesos:
+        return None
+    alias = list(pesos)
+    return aleatorio.choices(alias, weights=[pesos[a] for a in alias])[0]
+
+
+def alias_lectura():
+    """Alias de la base para las lecturas de este momento: la réplica de la petición o la primaria."""
+    estado = _estado.get()
+    if estado is None or estado.alias is None or estado.escribio:
+        return DEFAULT_DB_ALIAS
+    # Dentro de una transacción se lee lo que la transacción ve.
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return estado.alias
+
+
+@contextmanager
+def leer_de_primaria():
+    """Las lecturas del bloque van a la primaria."""
+    token = _estado.set(None)
+    try:
+        yield
+    finally:
+        _estado.reset(token)
+
+
+def iterar_en_la_peticion(iterable):
+    """
+    Recorre `iterable` con la réplica elegida para la petición en curso. Para
+    el contenido de StreamingHttpResponse, que se genera después de que el
+    middleware termina: cada paso lee de la misma base que la vista.
+    """
+    estado = _estado.get()
+    iterador = iter(iterable)
+
+    def recorrer():
+        while True:
+            # Se fija y se restablece en cada paso: entre un paso y otro el
+            # servidor puede recorrer la respuesta desde otro contexto.
+            token = _estado.set(estado)
+            try:
+                parte = next(iterador)
+            except StopIteration:
+                return
+            finally:
+                _estado.reset(token)
+            yield parte
+
+    return recorrer()
+
+
+def cambio_reciente(versiones):
+    """
+    Si alguna versión de la caché (ver cache.versiones) cambió hace menos de
+    REPLICAS_PRIMARIA_SEGUNDOS: las réplicas pueden no tener todavía el cambio.
+    """
+    margen = getattr(settings, 'REPLICAS_PRIMARIA_SEGUNDOS', 5) * 10 ** 9
+    return any(time.time_ns() - version < margen for version in versiones)
+
+
+def lectura_en_replica(vista):
+    """Marca una vista de función cuyos GET se pueden leer de una réplica."""
+    vista.lectura_en_replica = True
+    return vista
+
+
+class LecturaReplicaMixin:
+    """
+    Mixin para vistas de clase: sus GET/HEAD se leen de una réplica. Los
+    métodos que escriben (POST, PUT, DELETE) de la misma vista siguen en la
+    primaria.
+    """
+    lectura_en_replica = True
+
+
+class ReplicasRouter:
+    """Router de DATABASE_ROUTERS: lecturas según alias_lectura(), escrituras y migraciones en la primaria."""
+
+    def db_for_read(self, model, **hints):
+        # Solo los modelos del catálogo; la caché en la base (versiones), las
+        # sesiones y los usuarios se leen de la primaria.
+        if model._meta.app_label != 'buscador':
+            return DEFAULT_DB_ALIAS
+        return alias_lectura()
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None:
+            estado.escribio = True
+        # Siempre la primaria, aunque la instancia se haya leído de una réplica.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las réplicas tienen los mismos datos que la primaria.
+        bases = {DEFAULT_DB_ALIAS, *getattr(settings, 'REPLICAS', {})}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por replicación.
+        if db in getattr(settings, 'REPLICAS', {}):
+            return False
+        return None
+
+
+class ReplicasMiddleware:
+    """
+    Elige la réplica de las peticiones de lectura y fija la primaria después de escribir.
+    Con ASGI atiende la petición sin pasar a un hilo: el estado es un objeto
+    compartido, así que lo que marcan el router y process_view desde los
+    hilos de sync_to_async se ve al terminar.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.segundos_primaria = getattr(settings, 'REPLICAS_PRIMARIA_SEGUNDOS', 5)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        estado = EstadoPeticion()
+        token = _estado.set(estado)
+        try:
+            respuesta = self.get_response(request)
+        finally:
+            _estado.reset(token)
+        return self.completar(request, respuesta, estado)
+
+    async def __acall__(self, request):
+        estado = EstadoPeticion()
+        token = _estado.set(estado)
+        try:
+            respuesta = await self.get_response(request)
+        finally:
+            _estado.reset(token)
+        return self.completar(request, respuesta, estado)
+
+    def completar(self, request, respuesta, estado):
+        """Después de escribir, el cliente lee de la primaria durante REPLICAS_PRIMARIA_SEGUNDOS."""
+        if estado.escribio or request.method not in METODOS_LECTURA:
+            respuesta.set_signed_cookie(
+                COOKIE, str(time.time() + self.segundos_primaria),
+                max_age=self.segundos_primaria, httponly=True, samesite='Lax',
+            )
+        return respuesta
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        vista = getattr(view_func, 'view_class', view_func)
+        if (
+            request.method in METODOS_LECTURA
+            and getattr(vista, 'lectura_en_replica', False)
+            and not self.primaria_fijada(request)
+        ):
+            estado = _estado.get()
+            if estado is not None:
+                estado.alias = elegir_replica()
+        return None
+
+    def primaria_fijada(self, request):
+        """Si el cliente escribió hace menos de REPLICAS_PRIMARIA_SEGUNDOS."""
+        hasta = request.get_signed_cookie(COOKIE, default=None)
+        try:
+            return hasta is not None and float(hasta) > time.time()
+        except ValueError:
+            return False
@@ -0,0 +1,162 @@
+# buscador/reservas.py
+# Reservas de stock de las ofertas (RepuestoSucursal) mientras se completa una
+# venta. El stock se descuenta con un UPDATE condicional:
+#   UPDATE buscador_repuestosucursal SET stock = stock - n WHERE id = ... AND stock >= n
+# que la base resuelve de forma atómica sobre la fila: con muchas reservas
+# concurrentes de la misma oferta nunca se vende más de lo que hay, sin leer el
+# stock antes ni bloquear la fila durante la petición. Si el UPDATE no modifica
+# ninguna fila, no alcanza el stock.
+#
+# Cada reserva queda PENDIENTE hasta `vence`: se confirma (la venta se concretó)
+# o se libera y el stock vuelve a la oferta. Las vencidas se liberan solas al
+# reservar la misma oferta y con el comando liberar_reservas_vencidas.
+#
+# Los pedidos de varias líneas descuentan las ofertas en orden de id dentro de
+# una transacción: dos pedidos con las mismas ofertas bloquean las filas en el
+# mismo orden y no pueden quedar esperándose uno al otro (deadlock).
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import invalidar_modelos
+from .inventario import actualizar_resumen_inventario
+from .models import RepuestoSucursal, ReservaStock
+
+# Segundos que dura una reserva pendiente si no se indica otra duración.
+TTL_POR_DEFECTO = getattr(settings, 'RESERVA_STOCK_TTL', 15 * 60)
+TTL_MAXIMO = 24 * 60 * 60
+
+
+class StockInsuficiente(Exception):
+    """Alguna oferta no tiene stock para la cantidad pedida (o no existe o está inactiva)."""
+
+    def __init__(self, oferta_ids):
+        self.oferta_ids = oferta_ids
+        super().__init__(f"Stock insuficiente para las ofertas {', '.join(map(str, oferta_ids))}.")
+
+
+class ReservaNoPendiente(Exception):
+    """El pedido no tiene reservas pendientes (no existe, ya se confirmó o se liberó, o venció)."""
+
+
+def reservar(lineas, ttl=None):
+    """
+    Reserva stock para un pedido. `lineas` es una lista de (oferta_id, cantidad);
+    las líneas de la misma oferta se suman. Es todo o nada: si alguna oferta no
+    alcanza, no se reserva ninguna y se lanza StockInsuficiente.
+    Devuelve las reservas creadas (comparten el mismo `pedido`).
+    """
+    cantidades = Counter()
+    for oferta_id, cantidad in lineas:
+        if cantidad <= 0:
+            raise ValueError("La cantidad a reservar debe ser mayor que cero.")
+        cantidades[oferta_id] += cantidad
+    if not cantidades:
+        raise ValueError("El pedido no tiene líneas.")
+    oferta_ids = sorted(cantidades)
+
+    # Lo que tengan retenido las reservas vencidas de estas ofertas vuelve antes.
+    liberar_vencidas(oferta_ids)
+
+    ahora = timezone.now()
+    vence = ahora + timedelta(seconds=TTL_POR_DEFECTO if ttl is None else ttl)
+    sin_stock = []
+    with transaction.atomic():
+        for oferta_id in oferta_ids:
+            cantidad = cantidades[oferta_id]
+            actualizadas = RepuestoSucursal.objects.filter(pk=oferta_id, stock__gte=cantidad).update(
+                stock=F('stock') - cantidad, fecha_actualizacion=ahora
+            )
+            if not actualizadas:
+                sin_stock.append(oferta_id)
+        if sin_stock:
+            # Deshace lo descontado a las demás ofertas.
+            raise StockInsuficiente(sin_stock)
+
+        pedido = ReservaStock._meta.get_field('pedido').get_default()
+        reservas = ReservaStock.objects.bulk_create([
+            ReservaStock(pedido=pedido, oferta_id=oferta_id, cantidad=cantidades[oferta_id], vence=vence)
+            for oferta_id in oferta_ids
+        ])
+        _stock_modificado(oferta_ids)
+    return reservas
+
+
+def confirmar(pedido):
+    """Confirma las reservas pendientes y no vencidas del pedido. El stock ya quedó descontado."""
+    confirmadas = ReservaStock.objects.filter(
+        pedido=pedido, estado=ReservaStock.Estado.PENDIENTE, vence__gt=timezone.now()
+    ).update(estado=ReservaStock.Estado.CONFIRMADA, fecha_actualizacion=timezone.now())
+    if not confirmadas:
+        raise ReservaNoPendiente(f"El pedido {pedido} no tiene reservas pendientes.")
+    return ReservaStock.objects.filter(pedido=pedido).order_by('oferta_id')
+
+
+def liberar(pedido):
+    """Libera las reservas pendientes del pedido y devuelve el stock a las ofertas."""
+    liberadas = _devolver(
+        ReservaStock.objects.filter(pedido=pedido, estado=ReservaStock.Estado.PENDIENTE),
+        ReservaStock.Estado.LIBERADA,
+    )
+    if not liberadas:
+        raise ReservaNoPendiente(f"El pedido {pedido} no tiene reservas pendientes.")
+    return ReservaStock.objects.filter(pedido=pedido).order_by('oferta_id')
+
+
+def liberar_vencidas(oferta_ids=None):
+    """
+    Marca como vencidas las reservas pendientes cuyo plazo pasó y devuelve su
+    stock. Se puede limitar a algunas ofertas. Devuelve cuántas se liberaron.
+    """
+    reservas = ReservaStock.objects.filter(estado=ReservaStock.Estado.PENDIENTE, vence__lte=timezone.now())
+    if oferta_ids is not None:
+        reservas = reservas.filter(oferta_id__in=oferta_ids)
+    # Las que otra transacción está liberando o confirmando se saltan.
+    return _devolver(reservas, ReservaStock.Estado.VENCIDA, saltar_bloqueadas=True)
+
+
+def _devolver(reservas, estado, saltar_bloqueadas=False):
+    """Pasa las reservas al estado indicado y suma su cantidad al stock de cada oferta."""
+    with transaction.atomic():
+        filas = list(
+            reservas.select_for_update(skip_locked=saltar_bloqueadas)
+            .order_by('oferta_id', 'id')
+            .values_list('id', 'oferta_id', 'cantidad')
+        )
+        if not filas:
+            return 0
+        ahora = timezone.now()
+        ReservaStock.objects.filter(pk__in=[id_ for id_, _, _ in filas]).update(
+            estado=estado, fecha_actualizacion=ahora
+        )
+        cantidades = Counter()
+        for _, oferta_id, cantidad in filas:
+            cantidades[oferta_id] += cantidad
+        oferta_ids = sorted(cantidades)
+        for oferta_id in oferta_ids:
+            # all_objects: el stock vuelve aunque la oferta se haya desactivado.
+            RepuestoSucursal.all_objects.filter(pk=oferta_id).update(
+                stock=F('stock') + cantidades[oferta_id], fecha_actualizacion=ahora
+            )
+        _stock_modificado(oferta_ids)
+    return len(filas)
+
+
+def _stock_modificado(oferta_ids):
+    """
+    Los UPDATE no envían post_save: el resumen de inventario y la caché de
+    respuestas se actualizan aquí, al confirmar la transacción.
+    """
+    def actualizar():
+        repuesto_ids = list(
+            RepuestoSucursal.all_objects.filter(pk__in=oferta_ids)
+            .values_list('repuesto_global_id', flat=True).distinct()
+        )
+        actualizar_resumen_inventario(repuesto_ids)
+        invalidar_modelos(RepuestoSucursal)
+
+    transaction.on_commit(actualizar)
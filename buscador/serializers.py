@@ -1,13 +1,17 @@
 # buscador/serializers.py
 from rest_framework import serializers
-from .models import RepuestoGlobal, Vehiculo, Categoria
+from .api.serializers import CompatibilidadPorVehiculoField
+from .models import RepuestoGlobal, Categoria, CompatibilidadRango
+
+# Serializador para los rangos de compatibilidad (años consecutivos de un modelo)
+class CompatibilidadRangoSerializer(serializers.ModelSerializer):
+    """Serializador para el modelo CompatibilidadRango."""
+    anio_desde = serializers.IntegerField(read_only=True)
+    anio_hasta = serializers.IntegerField(read_only=True)
 
-# Definimos un serializador para el modelo Vehiculo
-class VehiculoSerializer(serializers.ModelSerializer):
-    """Serializador para el modelo Vehiculo."""
     class Meta:
-        model = Vehiculo
-        fields = ['marca', 'modelo', 'anio']
+        model = CompatibilidadRango
+        fields = ['marca', 'modelo', 'anio_desde', 'anio_hasta']
 
 # Definimos un serializador para el modelo Categoria
 class CategoriaSerializer(serializers.ModelSerializer):
@@ -17,14 +21,28 @@ class CategoriaSerializer(serializers.ModelSerializer):
         fields = ['nombre']
 
 # Serializador principal para RepuestoGlobal, que incluirá
-# los datos de Vehiculos y Categorias relacionados.
+# la compatibilidad y la categoría relacionada.
 class RepuestoGlobalSerializer(serializers.ModelSerializer):
     """Serializador para el modelo RepuestoGlobal, mostrando relaciones anidadas."""
-    # Usamos el nombre 'compatibilidad' para que coincida con el modelo.
-    compatibilidad = VehiculoSerializer(many=True, read_only=True)
+    # Vehículos compatibles (marca, modelo y año), uno por año.
+    compatibilidad = CompatibilidadPorVehiculoField(con_id=False)
+    compatibilidad_rangos = CompatibilidadRangoSerializer(source='rangos_compatibilidad', many=True, read_only=True)
     categoria = CategoriaSerializer(read_only=True)
 
+    # Resumen del inventario en todas las sucursales (tabla ResumenInventario).
+    stock_total = serializers.IntegerField(source='resumen_inventario.stock_total', read_only=True)
+    precio_minimo = serializers.DecimalField(
+        source='resumen_inventario.precio_minimo', max_digits=10, decimal_places=2, read_only=True
+    )
+    precio_maximo = serializers.DecimalField(
+        source='resumen_inventario.precio_maximo', max_digits=10, decimal_places=2, read_only=True
+    )
+    cantidad_sucursales = serializers.IntegerField(source='resumen_inventario.cantidad_sucursales', read_only=True)
+
     class Meta:
         model = RepuestoGlobal
         # Campos que queremos exponer en la API. He añadido 'codigo' y 'cantidad'.
-        fields = ['id', 'nombre', 'descripcion', 'codigo', 'cantidad', 'categoria', 'compatibilidad']
+        fields = [
+            'id', 'nombre', 'descripcion', 'codigo', 'cantidad', 'categoria', 'compatibilidad',
+            'compatibilidad_rangos', 'stock_total', 'precio_minimo', 'precio_maximo', 'cantidad_sucursales'
+        ]
@@ -0,0 +1,109 @@
+# buscador/signals.py
+# Señales que mantienen actualizados los datos desnormalizados del catálogo.
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .busqueda import actualizar_vector_busqueda
+from .cache import invalidar_modelos
+from .inventario import actualizar_resumen_inventario
+from .models import Categoria, Eliminacion, RepuestoGlobal, RepuestoSucursal, Sucursal, Tienda, Vehiculo
+from .sugerencias import sugerencias
+
+
+# -------------------------------------------------------------
+# Vector de búsqueda de RepuestoGlobal
+# -------------------------------------------------------------
+# La compatibilidad no tiene señales: se escribe con
+# compatibilidad.establecer_compatibilidad, que actualiza lo que depende de ella.
+def repuestos_modificados(repuesto_ids):
+    # La categoría se publica en la fila del repuesto: se mueve
+    # fecha_actualizacion para que la sincronización incremental la envíe.
+    RepuestoGlobal.all_objects.filter(pk__in=repuesto_ids).update(fecha_actualizacion=timezone.now())
+
+
+@receiver(post_save, sender=RepuestoGlobal)
+def repuesto_guardado(sender, instance, created, **kwargs):
+    actualizar_vector_busqueda([instance.pk])
+    if created:
+        # Un repuesto nuevo todavía no tiene ofertas: su resumen queda con stock 0.
+        actualizar_resumen_inventario([instance.pk])
+
+
+@receiver(post_save, sender=Categoria)
+def categoria_guardada(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'nombre' not in update_fields):
+        return
+    actualizar_vector_busqueda(
+        RepuestoGlobal.all_objects.filter(categoria=instance).values_list('pk', flat=True)
+    )
+
+
+# Al borrar una categoría, los repuestos afectados se calculan antes del
+# borrado (después ya no queda la relación) y se actualizan al final.
+@receiver(pre_delete, sender=Categoria)
+def categoria_por_borrar(sender, instance, **kwargs):
+    instance._repuestos_afectados = list(
+        RepuestoGlobal.all_objects.filter(categoria=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Categoria)
+def categoria_borrada(sender, instance, **kwargs):
+    repuesto_ids = getattr(instance, '_repuestos_afectados', [])
+    actualizar_vector_busqueda(repuesto_ids)
+    # SET_NULL se aplica con un UPDATE, que no cambia fecha_actualizacion.
+    repuestos_modificados(repuesto_ids)
+
+
+# -------------------------------------------------------------
+# Resumen de inventario por repuesto
+# -------------------------------------------------------------
+@receiver(post_save, sender=RepuestoSucursal)
+@receiver(post_delete, sender=RepuestoSucursal)
+def inventario_modificado(sender, instance, **kwargs):
+    # Se recalcula al confirmar la transacción: si el repuesto se está borrando
+    # en cascada, para entonces ya no existe y no se vuelve a crear su resumen.
+    repuesto_id = instance.repuesto_global_id
+    transaction.on_commit(lambda: actualizar_resumen_inventario([repuesto_id]))
+
+
+# -------------------------------------------------------------
+# Invalidación de la caché de respuestas del catálogo
+# -------------------------------------------------------------
+# Se cambia la versión del modelo al confirmar la transacción, para que
+# ninguna petición guarde en caché datos todavía no confirmados con la
+# versión nueva.
+def modelo_modificado(sender, **kwargs):
+    transaction.on_commit(lambda: invalidar_modelos(sender))
+
+
+for modelo in (Tienda, Sucursal, Categoria, Vehiculo, RepuestoGlobal, RepuestoSucursal):
+    post_save.connect(modelo_modificado, sender=modelo, dispatch_uid=f'cache_guardar_{modelo.__name__}')
+    post_delete.connect(modelo_modificado, sender=modelo, dispatch_uid=f'cache_borrar_{modelo.__name__}')
+
+
+# -------------------------------------------------------------
+# Índice de sugerencias (autocompletado) del proceso
+# -------------------------------------------------------------
+def sugerencias_modificadas(sender, instance, signal, **kwargs):
+    # El pk se guarda ahora: después de borrar, la instancia queda sin pk.
+    pk, borrado = instance.pk, signal is post_delete
+    transaction.on_commit(lambda: sugerencias.registrar_cambio(sender, pk, borrado))
+
+
+for modelo in (RepuestoGlobal, Categoria):
+    post_save.connect(sugerencias_modificadas, sender=modelo, dispatch_uid=f'sugerencias_guardar_{modelo.__name__}')
+    post_delete.connect(sugerencias_modificadas, sender=modelo, dispatch_uid=f'sugerencias_borrar_{modelo.__name__}')
+
+
+# -------------------------------------------------------------
+# Registro de borrados para la sincronización incremental
+# -------------------------------------------------------------
+def fila_borrada(sender, instance, **kwargs):
+    Eliminacion.objects.create(modelo=sender._meta.label_lower, objeto_id=instance.pk)
+
+
+for modelo in (Tienda, Sucursal, Categoria, Vehiculo, RepuestoGlobal, RepuestoSucursal):
+    post_delete.connect(fila_borrada, sender=modelo, dispatch_uid=f'eliminacion_{modelo.__name__}')
@@ -0,0 +1,331 @@
+# buscador/sugerencias.py
+# Sugerencias para el buscador mientras se escribe (autocompletado).
+# Se responde desde un índice de prefijos en memoria del proceso: una lista
+# ordenada de claves normalizadas en la que se busca con bisect, y para cada
+# clave los elementos que la contienen. Las peticiones no consultan la base.
+# Se indexan el nombre y el código de los repuestos, el nombre de las
+# categorías y las marcas y modelos de la compatibilidad de los repuestos
+# activos (CompatibilidadRango).
+#
+# El índice se construye en segundo plano a partir de la primera petición
+# (hasta que está listo no hay sugerencias) y se mantiene así:
+# - Los cambios hechos en este proceso se aplican desde las señales.
+# - Los hechos en otros procesos se detectan por las versiones de la caché
+#   del catálogo (buscador/cache.py), revisadas en segundo plano como mucho
+#   cada SUGERENCIAS_INTERVALO segundos, y se leen por fecha_actualizacion
+#   (establecer la compatibilidad también la mueve).
+# - Cada SUGERENCIAS_EDAD_MAXIMA segundos se reconstruye en segundo plano,
+#   para descartar las filas borradas en otros procesos, y el índice nuevo
+#   reemplaza al anterior de una vez.
+# Las lecturas de la base se hacen fuera del lock: con el lock solo se
+# modifica o se recorre el índice en memoria.
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .cache import versiones
+from .models import Categoria, CompatibilidadRango, RepuestoGlobal
+
+TIPOS = ('repuesto', 'categoria', 'marca', 'modelo')
+LIMITE_POR_DEFECTO = 10
+LIMITE_MAXIMO = 50
+EDAD_MAXIMA = getattr(settings, 'SUGERENCIAS_EDAD_MAXIMA', 900)
+INTERVALO = getattr(settings, 'SUGERENCIAS_INTERVALO', 1)
+
+# Palabras que no inician una clave ('Pastilla de Freno' no se sugiere por 'de').
+PALABRAS_VACIAS = {'a', 'al', 'con', 'de', 'del', 'el', 'en', 'la', 'las', 'los', 'para', 'por', 'y'}
+
+# Margen al leer los cambios de otros procesos (transacciones que confirmaron
+# después de empezar, relojes algo distintos). Releer una fila no cambia nada.
+MARGEN = timedelta(seconds=5)
+
+MODELOS = (RepuestoGlobal, Categoria)
+TIPO_POR_MODELO = {RepuestoGlobal: 'repuesto', Categoria: 'categoria'}
+
+
+def normalizar(texto):
+    """Minúsculas, sin acentos y con los espacios simplificados."""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.split())
+
+
+def claves_de_texto(texto):
+    """Una clave por cada palabra del texto, desde esa palabra hasta el final."""
+    palabras = normalizar(texto).split(' ')
+    return {
+        ' '.join(palabras[i:])
+        for i, palabra in enumerate(palabras)
+        if palabra and (i == 0 or palabra not in PALABRAS_VACIAS)
+    }
+
+
+def clave_de_codigo(codigo):
+    """El código sin guiones ni espacios, como RepuestoGlobal.codigo_normalizado."""
+    return re.sub(r'[\s-]+', '', normalizar(codigo))
+
+
+class IndicePrefijos:
+    """
+    Índice de prefijos sobre arreglos ordenados. Cada elemento es una tupla
+    (tipo, identificador) con una etiqueta para mostrar y sus claves; las
+    claves repetidas (muchos repuestos se llaman igual) se guardan una vez.
+    Las marcas y modelos los comparten muchos repuestos: se cuentan los
+    repuestos compatibles y el elemento se quita cuando no queda ninguno.
+    """
+
+    def __init__(self):
+        self.claves = []            # claves distintas, ordenadas
+        self.por_clave = {}         # clave -> lista ordenada de elementos
+        self.elementos = {}         # elemento -> (etiqueta, claves)
+        self.modelos = {}           # pk del repuesto -> {(marca, modelo), ...}
+        self.referencias = Counter()  # marca o modelo -> cantidad de repuestos
+        # Durante la carga inicial se agrega al final y se ordena una sola vez.
+        self.cargando = False
+
+    def __len__(self):
+        return len(self.elementos)
+
+    def agregar(self, elemento, etiqueta, claves):
+        self.quitar(elemento)
+        claves = tuple(clave for clave in claves if clave)
+        self.elementos[elemento] = (etiqueta, claves)
+        for clave in claves:
+            lista = self.por_clave.get(clave)
+            if lista is None:
+                self.por_clave[clave] = [elemento]
+                if self.cargando:
+                    self.claves.append(clave)
+                else:
+                    insort(self.claves, clave)
+            elif self.cargando:
+                lista.append(elemento)
+            else:
+                insort(lista, elemento)
+
+    def terminar_carga(self):
+        self.claves.sort()
+        for lista in self.por_clave.values():
+            lista.sort()
+        self.cargando = False
+
+    def quitar(self, elemento):
+        anterior = self.elementos.pop(elemento, None)
+        if anterior is None:
+            return
+        for clave in anterior[1]:
+            lista = self.por_clave[clave]
+            lista.pop(bisect_left(lista, elemento))
+            if not lista:
+                del self.por_clave[clave]
+                self.claves.pop(bisect_left(self.claves, clave))
+
+    def establecer_modelos(self, repuesto, pares):
+        """Reemplaza las marcas y modelos compatibles con el repuesto."""
+        pares = frozenset(pares)
+        anteriores = self.modelos.pop(repuesto, frozenset())
+        if pares:
+            self.modelos[repuesto] = pares
+        for marca, modelo in pares - anteriores:
+            etiqueta = f"{marca} {modelo}"
+            for elemento, claves in (
+                (('marca', marca), claves_de_texto(marca)),
+                (('modelo', etiqueta), claves_de_texto(etiqueta) | claves_de_texto(modelo)),
+            ):
+                self.referencias[elemento] += 1
+                if self.referencias[elemento] == 1:
+                    self.agregar(elemento, elemento[1], claves)
+        for marca, modelo in anteriores - pares:
+            for elemento in (('marca', marca), ('modelo', f"{marca} {modelo}")):
+                self.referencias[elemento] -= 1
+                if not self.referencias[elemento]:
+                    del self.referencias[elemento]
+                    self.quitar(elemento)
+
+    def buscar(self, prefijo, limite=LIMITE_POR_DEFECTO, tipos=TIPOS):
+        """
+        Elementos con alguna clave que empieza con `prefijo` (ya normalizado),
+        en el orden de las claves. Se detiene al juntar `limite` elementos.
+        """
+        encontrados = {}
+        i = bisect_left(self.claves, prefijo)
+        while i < len(self.claves) and len(encontrados) < limite:
+            clave = self.claves[i]
+            if not clave.startswith(prefijo):
+                break
+            for elemento in self.por_clave[clave]:
+                if elemento[0] in tipos and elemento not in encontrados:
+                    encontrados[elemento] = self.elementos[elemento][0]
+                    if len(encontrados) >= limite:
+                        break
+            i += 1
+        return [
+            {'tipo': tipo, 'id': identificador if isinstance(identificador, int) else None, 'etiqueta': etiqueta}
+            for (tipo, identificador), etiqueta in encontrados.items()
+        ]
+
+
+# -------------------------------------------------------------
+# Carga desde la base de datos
+# -------------------------------------------------------------
+def leer_repuestos(repuestos):
+    return repuestos.values_list('pk', 'nombre', 'codigo', 'activo').iterator(chunk_size=5000)
+
+
+def leer_categorias(categorias):
+    return categorias.values_list('pk', 'nombre', 'activo')
+
+
+def leer_modelos(rangos):
+    """Marcas y modelos compatibles por repuesto: {pk: {(marca, modelo), ...}}."""
+    modelos = defaultdict(set)
+    for pk, marca, modelo in rangos.values_list('repuesto_global_id', 'marca', 'modelo').iterator(chunk_size=5000):
+        modelos[pk].add((marca, modelo))
+    return modelos
+
+
+def cargar_repuestos(indice, filas, modelos):
+    for pk, nombre, codigo, activo in filas:
+        if activo:
+            claves = claves_de_texto(nombre) | {clave_de_codigo(codigo)}
+            indice.agregar(('repuesto', pk), f"{nombre} ({codigo})", claves)
+            indice.establecer_modelos(pk, modelos.get(pk, ()))
+        else:
+            indice.quitar(('repuesto', pk))
+            indice.establecer_modelos(pk, ())
+
+
+def cargar_categorias(indice, filas):
+    for pk, nombre, activo in filas:
+        if activo:
+            indice.agregar(('categoria', pk), nombre, claves_de_texto(nombre))
+        else:
+            indice.quitar(('categoria', pk))
+
+
+class Sugerencias:
+    """Índice del proceso, con su sincronización con la base de datos."""
+
+    def __init__(self):
+        self.indice = None
+        self.versiones = None
+        self.marca_agua = None
+        self.construido = 0.0
+        self.revisado = 0.0
+        # Una sola tarea en segundo plano a la vez (construir o sincronizar).
+        self.ocupado = False
+        self.lock = threading.RLock()
+
+    def construir(self):
+        """Construye un índice nuevo y reemplaza al anterior."""
+        indice = IndicePrefijos()
+        indice.cargando = True
+        actuales = versiones(MODELOS)
+        desde = timezone.now() - MARGEN
+        cargar_repuestos(
+            indice, leer_repuestos(RepuestoGlobal.objects.all()),
+            leer_modelos(CompatibilidadRango.objects.filter(repuesto_global__activo=True)),
+        )
+        cargar_categorias(indice, leer_categorias(Categoria.objects.all()))
+        indice.terminar_carga()
+        with self.lock:
+            self.indice, self.versiones, self.marca_agua = indice, actuales, desde
+            self.construido = self.revisado = time.monotonic()
+
+    def obtener(self):
+        """El índice, o None mientras se construye por primera vez. No consulta la base."""
+        ahora = time.monotonic()
+        if self.indice is None or ahora - self.construido > EDAD_MAXIMA:
+            self.en_segundo_plano(self.construir)
+        elif ahora - self.revisado >= INTERVALO:
+            self.revisado = ahora
+            self.en_segundo_plano(self.sincronizar)
+        return self.indice
+
+    def en_segundo_plano(self, tarea):
+        with self.lock:
+            if self.ocupado:
+                return
+            self.ocupado = True
+        threading.Thread(target=self._ejecutar, args=(tarea,), daemon=True).start()
+
+    def _ejecutar(self, tarea):
+        try:
+            tarea()
+        finally:
+            self.ocupado = False
+            connection.close()
+
+    def sincronizar(self):
+        """Aplica los cambios hechos desde la última lectura (también los de otros procesos), si los hay."""
+        actuales = versiones(MODELOS)
+        if self.indice is None or actuales == self.versiones:
+            return
+        marca_agua, desde = self.marca_agua, timezone.now() - MARGEN
+        # all_objects: las filas desactivadas se leen para quitarlas del índice.
+        repuestos = RepuestoGlobal.all_objects.filter(fecha_actualizacion__gte=marca_agua)
+        filas_repuestos = list(leer_repuestos(repuestos))
+        modelos = leer_modelos(CompatibilidadRango.objects.filter(repuesto_global__in=repuestos))
+        filas_categorias = list(leer_categorias(Categoria.all_objects.filter(fecha_actualizacion__gte=marca_agua)))
+        with self.lock:
+            cargar_repuestos(self.indice, filas_repuestos, modelos)
+            cargar_categorias(self.indice, filas_categorias)
+            self.versiones, self.marca_agua = actuales, desde
+
+    def registrar_cambio(self, modelo, pk, borrado=False):
+        """Aplica un cambio hecho en este proceso (desde las señales, al confirmar)."""
+        if self.indice is None:
+            return
+        # Se lee antes de tomar el lock: las búsquedas no esperan a la base.
+        filas, modelos = [], {}
+        if not borrado and modelo is RepuestoGlobal:
+            filas = list(leer_repuestos(RepuestoGlobal.all_objects.filter(pk=pk)))
+            modelos = leer_modelos(CompatibilidadRango.objects.filter(repuesto_global_id=pk))
+        elif not borrado:
+            filas = list(leer_categorias(Categoria.all_objects.filter(pk=pk)))
+        with self.lock:
+            if self.indice is None:
+                return
+            if borrado:
+                self.indice.quitar((TIPO_POR_MODELO[modelo], pk))
+                if modelo is RepuestoGlobal:
+                    self.indice.establecer_modelos(pk, ())
+            elif modelo is RepuestoGlobal:
+                cargar_repuestos(self.indice, filas, modelos)
+            else:
+                cargar_categorias(self.indice, filas)
+
+    def reiniciar(self):
+        with self.lock:
+            self.indice = None
+
+
+sugerencias = Sugerencias()
+
+
+def sugerir(texto, limite=LIMITE_POR_DEFECTO, tipos=TIPOS):
+    """Sugerencias para el texto ingresado: lista de {'tipo', 'id', 'etiqueta'}."""
+    prefijo = normalizar(texto)
+    if not prefijo:
+        return []
+    codigo = clave_de_codigo(texto)
+    indice = sugerencias.obtener()
+    if indice is None:
+        return []
+    with sugerencias.lock:
+        resultado = indice.buscar(prefijo, limite, tipos)
+        # 'fa-12' o 'fa 12' también buscan el código normalizado 'fa12'.
+        if codigo and codigo != prefijo and len(resultado) < limite and 'repuesto' in tipos:
+            vistos = {(s['tipo'], s['id']) for s in resultado}
+            for sugerencia in indice.buscar(codigo, limite, ('repuesto',)):
+                if (sugerencia['tipo'], sugerencia['id']) not in vistos and len(resultado) < limite:
+                    resultado.append(sugerencia)
+    return resultado
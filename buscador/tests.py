@@ -1,3 +1,1442 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import io
+import json
+import random
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.contrib.gis.geos import Point
+from django.db import connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.views import View
+from django.test.utils import CaptureQueriesContext
+
+from .api.optimizacion import planificar_consultas
+from .api.serializers import RepuestoGlobalSerializer, RepuestoSucursalSerializer
+from .cache import get_cache
+from .compatibilidad import compactar_anios, establecer_compatibilidad
+from .generador import GeneradorCatalogo
+from .historial import borrar_particiones_anteriores, crear_particiones
+from .importacion import importar_inventario
+from .instrumentacion import InstrumentacionMiddleware, forma_sql
+from .replicas import (
+    COOKIE, LecturaReplicaMixin, ReplicasMiddleware, ReplicasRouter, alias_lectura, elegir_replica,
+    iterar_en_la_peticion, lectura_en_replica, pesos_replicas,
+)
+from .reservas import StockInsuficiente, liberar_vencidas, reservar
+from .sugerencias import IndicePrefijos, claves_de_texto, sugerencias
+from .models import (
+    Categoria, CompatibilidadRango, Eliminacion, HistorialPrecio, RepuestoGlobal, RepuestoSucursal, ReservaStock,
+    Sucursal, Tienda, Vehiculo
+)
+
+
+# Caché de respuestas desactivada, para contar las consultas reales.
+SIN_CACHE = override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'catalogo': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    'catalogo_versiones': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'versiones'},
+})
+
+
+def crear_catalogo(cantidad, prefijo='X'):
+    """Crea `cantidad` repuestos con categoría, vehículos y stock en una sucursal propia."""
+    tienda = Tienda.objects.create(nombre=f"Tienda {prefijo}")
+    sucursal = Sucursal.objects.create(
+        tienda=tienda,
+        nombre=f"Sucursal {prefijo}",
+        direccion="Calle 123",
+        ubicacion=Point(-57.63, -25.28)
+    )
+    categoria = Categoria.objects.create(nombre=f"Categoría {prefijo}")
+    vehiculos = [
+        Vehiculo.objects.create(marca="Toyota", modelo=f"Modelo {prefijo}", anio=2000 + i)
+        for i in range(3)
+    ]
+    for i in range(cantidad):
+        repuesto = RepuestoGlobal.objects.create(
+            nombre=f"Repuesto {prefijo}{i}",
+            codigo=f"{prefijo}-{i}",
+            categoria=categoria
+        )
+        establecer_compatibilidad(repuesto, vehiculos)
+        RepuestoSucursal.objects.create(
+            sucursal=sucursal, repuesto_global=repuesto, precio=10, stock=5
+        )
+
+
+@SIN_CACHE
+class BusquedaTests(TestCase):
+    """Búsqueda de texto completo (?search=) y difusa por trigramas (?q=...&fuzzy=1)."""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre="Frenos")
+        self.pastilla = RepuestoGlobal.objects.create(nombre="Pastilla de freno", codigo="PF-100", categoria=categoria)
+        self.disco = RepuestoGlobal.objects.create(
+            nombre="Disco ventilado", codigo="DV-200", descripcion="Usar con pastilla nueva", categoria=categoria
+        )
+        self.filtro = RepuestoGlobal.objects.create(nombre="Filtro de aceite", codigo="FA-123")
+
+    def ids(self, url):
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return [fila['id'] for fila in respuesta.json()['results']]
+
+    def test_ranking(self):
+        # En el nombre (peso A) pesa más que en la descripción (peso C).
+        self.assertEqual(self.ids('/api/repuestos-globales/?search=pastilla'), [self.pastilla.pk, self.disco.pk])
+        self.assertEqual(self.ids('/api/repuestos-globales/?q=aceite'), [self.filtro.pk])
+
+    def test_prefijo(self):
+        self.assertEqual(self.ids('/api/repuestos-globales/?search=pastil'), [self.pastilla.pk, self.disco.pk])
+        self.assertEqual(self.ids('/api/repuestos-globales/?search=pastil fren'), [self.pastilla.pk])
+        self.assertEqual(self.ids('/api/repuestos-globales/?search=embrague'), [])
+
+    def test_errores_de_tipeo(self):
+        self.assertEqual(self.ids('/api/repuestos-globales/?q=pastila&fuzzy=1')[0], self.pastilla.pk)
+        self.assertEqual(self.ids('/api/repuestos-globales/?q=fa 123&fuzzy=1'), [self.filtro.pk])
+        # Sin fuzzy, el error de tipeo no encuentra nada.
+        self.assertEqual(self.ids('/api/repuestos-globales/?q=pastila'), [])
+
+    def test_umbral(self):
+        self.assertIn(self.pastilla.pk, self.ids('/api/repuestos-globales/?q=pastila&fuzzy=1&similitud=0.5'))
+        self.assertEqual(self.ids('/api/repuestos-globales/?q=pastila&fuzzy=1&similitud=0.95'), [])
+        for valor in ('0', '1.5', 'x'):
+            with self.subTest(similitud=valor):
+                respuesta = self.client.get(f'/api/repuestos-globales/?q=pastila&fuzzy=1&similitud={valor}')
+                self.assertEqual(respuesta.status_code, 400)
+
+
+@SIN_CACHE
+class UmbralTrigramasTests(TransactionTestCase):
+    """El umbral de la búsqueda difusa no queda fijado en la conexión después de la petición."""
+
+    def test_umbral_local(self):
+        RepuestoGlobal.objects.create(nombre="Pastilla de freno", codigo="PF-100")
+        respuesta = self.client.get('/api/repuestos-globales/?q=pastila&fuzzy=1&similitud=0.9')
+        self.assertEqual(respuesta.status_code, 200)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT current_setting('pg_trgm.similarity_threshold')")
+            self.assertEqual(float(cursor.fetchone()[0]), 0.3)
+
+
+class PlanificadorConsultasTests(TestCase):
+    """Comprueba las relaciones que el planificador deduce de los serializadores."""
+
+    def test_repuesto_global(self):
+        select, prefetch = planificar_consultas(RepuestoGlobalSerializer())
+        self.assertEqual(set(select), {'categoria', 'resumen_inventario'})
+        self.assertEqual([p.prefetch_to for p in prefetch], ['rangos_compatibilidad'])
+
+    def test_repuesto_sucursal(self):
+        select, prefetch = planificar_consultas(RepuestoSucursalSerializer())
+        self.assertEqual(
+            set(select),
+            {'repuesto_global', 'repuesto_global__categoria', 'repuesto_global__resumen_inventario',
+             'sucursal', 'sucursal__tienda'}
+        )
+        self.assertEqual(
+            [p.prefetch_to for p in prefetch],
+            ['repuesto_global__rangos_compatibilidad']
+        )
+
+
+@SIN_CACHE
+class ConsultasConstantesTests(TestCase):
+    """
+    La cantidad de consultas de cada endpoint no debe crecer con la cantidad
+    de filas devueltas (sin consultas N+1 en los serializadores anidados).
+    """
+
+    def contar_consultas(self, url):
+        with CaptureQueriesContext(connection) as contexto:
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return len(contexto.captured_queries)
+
+    def assertConsultasConstantes(self, url):
+        crear_catalogo(2, prefijo='A')
+        pocas = self.contar_consultas(url)
+        crear_catalogo(10, prefijo='B')
+        muchas = self.contar_consultas(url)
+        self.assertEqual(pocas, muchas)
+
+    def test_repuestos(self):
+        self.assertConsultasConstantes('/api/repuestos/')
+
+    def test_repuestos_globales(self):
+        self.assertConsultasConstantes('/api/repuestos-globales/')
+
+    def test_repuestos_sucursales(self):
+        self.assertConsultasConstantes('/api/repuestos-sucursales/')
+
+    def test_sucursales(self):
+        self.assertConsultasConstantes('/api/sucursales/')
+
+    def test_detalle_repuesto_global(self):
+        crear_catalogo(1, prefijo='A')
+        repuesto = RepuestoGlobal.objects.get(codigo='A-0')
+        url = f'/api/repuestos-globales/{repuesto.pk}/'
+        pocas = self.contar_consultas(url)
+        # Más sucursales con el mismo repuesto no deben sumar consultas.
+        tienda = Tienda.objects.create(nombre="Tienda C")
+        for i in range(5):
+            sucursal = Sucursal.objects.create(
+                tienda=tienda, nombre=f"Sucursal C{i}", direccion="Calle 1",
+                ubicacion=Point(-57.6, -25.3)
+            )
+            RepuestoSucursal.objects.create(
+                sucursal=sucursal, repuesto_global=repuesto, precio=12, stock=1
+            )
+        self.assertEqual(pocas, self.contar_consultas(url))
+
+    def test_tamanio_de_pagina(self):
+        crear_catalogo(12, prefijo='A')
+        for url in ('/api/repuestos-globales/', '/api/repuestos-sucursales/'):
+            self.assertEqual(
+                self.contar_consultas(f'{url}?page_size=2'),
+                self.contar_consultas(f'{url}?page_size=10')
+            )
+
+
+@SIN_CACHE
+class PaginacionKeysetTests(TestCase):
+    """Recorrido de los listados con la paginación por cursor."""
+
+    def setUp(self):
+        crear_catalogo(7, prefijo='A')
+
+    def recorrer(self, url):
+        ids, paginas = [], 0
+        while url:
+            datos = self.client.get(url).json()
+            ids.extend(fila['id'] for fila in datos['results'])
+            url = datos['next']
+            paginas += 1
+        return ids, paginas
+
+    def test_recorre_todas_las_filas_sin_repetir(self):
+        casos = [
+            ('/api/repuestos-globales/?page_size=3', RepuestoGlobal),
+            ('/api/repuestos-sucursales/?page_size=3', RepuestoSucursal),
+            ('/api/repuestos/?page_size=2', RepuestoGlobal),
+        ]
+        for url, modelo in casos:
+            with self.subTest(url=url):
+                ids, paginas = self.recorrer(url)
+                self.assertEqual(len(ids), len(set(ids)))
+                self.assertCountEqual(ids, modelo.objects.values_list('id', flat=True))
+                self.assertEqual(paginas, 3 if 'page_size=3' in url else 4)
+
+    def test_orden_del_modelo(self):
+        ids, _ = self.recorrer('/api/repuestos-globales/?page_size=2')
+        esperado = list(RepuestoGlobal.objects.order_by('nombre', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, esperado)
+
+    def test_pagina_anterior(self):
+        primera = self.client.get('/api/repuestos-globales/?page_size=3').json()
+        self.assertIsNone(primera['previous'])
+        segunda = self.client.get(primera['next']).json()
+        anterior = self.client.get(segunda['previous']).json()
+        self.assertEqual(anterior['results'], primera['results'])
+
+    def test_empates_de_relevancia(self):
+        # Mismo texto: misma relevancia y similitud en todas las filas.
+        for i in range(5):
+            RepuestoGlobal.objects.create(nombre="Bujía de encendido", codigo=f"BJ{i}")
+        bujias = list(RepuestoGlobal.objects.filter(nombre="Bujía de encendido").values_list('id', flat=True))
+        for url in ('/api/repuestos-globales/?search=bujia&page_size=2',
+                    '/api/repuestos-globales/?q=bujia&fuzzy=1&page_size=2'):
+            with self.subTest(url=url):
+                ids, paginas = self.recorrer(url)
+                self.assertCountEqual(ids, bujias)
+                self.assertEqual(paginas, 3)
+
+    def test_cursor_invalido(self):
+        respuesta = self.client.get('/api/repuestos-globales/?cursor=no-es-un-cursor')
+        self.assertEqual(respuesta.status_code, 404)
+
+    def test_cursor_alterado(self):
+        # Cursores bien formados con valores del tipo equivocado: 404, no un error de la base.
+        for url in ('/api/repuestos-globales/?page_size=2', '/api/repuestos-globales/?search=repuesto&page_size=2'):
+            siguiente = self.client.get(url).json()['next']
+            cursor = json.loads(base64.urlsafe_b64decode(parse_qs(urlsplit(siguiente).query)['cursor'][0]))
+            for posicion, valor in ((0, [1]), (0, None), (-1, 'abc'), (-1, 10 ** 30)):
+                valores = list(cursor['v'])
+                valores[posicion] = valor
+                alterado = base64.urlsafe_b64encode(json.dumps({'v': valores, 'r': False}).encode()).decode()
+                with self.subTest(url=url, valores=valores):
+                    self.assertEqual(self.client.get(url, {'cursor': alterado}).status_code, 404)
+
+
+class RepuestosCercanosTests(TestCase):
+    """Búsqueda de las sucursales con stock más cercanas a un punto."""
+
+    def setUp(self):
+        tienda = Tienda.objects.create(nombre="Tienda Geo")
+        self.repuesto = RepuestoGlobal.objects.create(nombre="Bujia", codigo="BU-1")
+        ofertas = [
+            ("Lejos", Point(-57.50, -25.00), 3),
+            ("Cerca", Point(-57.63, -25.28), 1),
+            ("Sin stock", Point(-57.63, -25.28), 0),
+        ]
+        for nombre, punto, stock in ofertas:
+            sucursal = Sucursal.objects.create(
+                tienda=tienda, nombre=nombre, direccion="Calle 1", ubicacion=punto
+            )
+            RepuestoSucursal.objects.create(
+                sucursal=sucursal, repuesto_global=self.repuesto, precio=5, stock=stock
+            )
+        self.url = f'/api/repuestos-globales/{self.repuesto.pk}/cercanos/'
+
+    def test_ordena_por_distancia_y_excluye_sin_stock(self):
+        datos = self.client.get(self.url, {'lat': -25.281, 'lng': -57.631}).json()
+        self.assertEqual([d['sucursal']['nombre'] for d in datos], ["Cerca", "Lejos"])
+        self.assertLess(datos[0]['distancia'], datos[1]['distancia'])
+
+    def test_radio_en_metros(self):
+        datos = self.client.get(self.url, {'lat': -25.281, 'lng': -57.631, 'radio': 1000}).json()
+        self.assertEqual([d['sucursal']['nombre'] for d in datos], ["Cerca"])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get(self.url, {'lng': -57.6}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'lat': 95, 'lng': -57.6}).status_code, 400)
+
+
+class ResumenInventarioTests(TestCase):
+    """El resumen de inventario sigue los cambios de RepuestoSucursal."""
+
+    def test_se_actualiza_al_modificar_el_inventario(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_catalogo(1, prefijo='A')
+        repuesto = RepuestoGlobal.objects.get(codigo='A-0')
+        sucursal = Sucursal.objects.create(
+            tienda=Tienda.objects.get(), nombre="Otra", direccion="Calle 2",
+            ubicacion=Point(-57.6, -25.3)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            oferta = RepuestoSucursal.objects.create(
+                sucursal=sucursal, repuesto_global=repuesto, precio=8, stock=2
+            )
+
+        datos = self.client.get(f'/api/repuestos-globales/{repuesto.pk}/').json()
+        self.assertEqual(datos['stock_total'], 7)
+        self.assertEqual(datos['precio_minimo'], '8.00')
+        self.assertEqual(datos['precio_maximo'], '10.00')
+        self.assertEqual(datos['cantidad_sucursales'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            oferta.delete()
+        repuesto.resumen_inventario.refresh_from_db()
+        self.assertEqual(repuesto.resumen_inventario.stock_total, 5)
+        self.assertEqual(repuesto.resumen_inventario.cantidad_sucursales, 1)
+
+    def test_repuesto_sin_ofertas(self):
+        repuesto = RepuestoGlobal.objects.create(nombre="Sin ofertas", codigo="SO-1")
+        sin_resumen = RepuestoGlobal.objects.bulk_create([RepuestoGlobal(nombre="Sin resumen", codigo="SR-1")])[0]
+        esperado = {'stock_total': 0, 'precio_minimo': None, 'precio_maximo': None, 'cantidad_sucursales': 0}
+        for pk in (repuesto.pk, sin_resumen.pk):
+            for rapido in (True, False):
+                with self.subTest(pk=pk, rapido=rapido), override_settings(API_LISTADO_RAPIDO=rapido), SIN_CACHE:
+                    fila = next(
+                        fila for fila in self.client.get('/api/repuestos-globales/').json()['results']
+                        if fila['id'] == pk
+                    )
+                    self.assertEqual({campo: fila[campo] for campo in esperado}, esperado)
+
+
+class ImportacionInventarioTests(TestCase):
+    """Importación masiva de precios y stock con COPY + upsert."""
+
+    def test_importa_actualiza_y_rechaza(self):
+        crear_catalogo(2, prefijo='A')
+        sucursal = Sucursal.objects.get()
+        archivo = io.StringIO(
+            "codigo,precio,stock\n"
+            "A-0,11.5,7\n"
+            "A-1,abc,1\n"
+            "NO-EXISTE,3,3\n"
+        )
+        resultado = importar_inventario(sucursal, archivo, 'csv', tamanio_lote=2)
+
+        self.assertEqual(resultado.filas_leidas, 3)
+        self.assertEqual(resultado.filas_importadas, 1)
+        self.assertEqual([linea for linea, _ in resultado.rechazadas], [3, 4])
+        oferta = RepuestoSucursal.objects.get(repuesto_global__codigo='A-0')
+        self.assertEqual((oferta.precio, oferta.stock), (Decimal('11.50'), 7))
+        self.assertEqual(oferta.repuesto_global.resumen_inventario.stock_total, 7)
+
+    def test_inactivos_y_tope_de_rechazadas(self):
+        crear_catalogo(2, prefijo='A')
+        RepuestoGlobal.objects.filter(codigo='A-1').update(activo=False)
+        sucursal = Sucursal.objects.get()
+        archivo = io.StringIO("codigo,precio,stock\nA-1,3,3\nX-1,3,3\nX-2,3,3\nX-3,3,3\n")
+        resultado = importar_inventario(sucursal, archivo, 'csv', tamanio_lote=2, max_rechazadas=2)
+
+        self.assertEqual(resultado.rechazadas, [(2, "Repuesto inactivo: A-1."), (3, "Código desconocido: X-1.")])
+        self.assertEqual(resultado.as_dict()['filas_rechazadas'], 4)
+        self.assertEqual(RepuestoSucursal.all_objects.get(repuesto_global__codigo='A-1').stock, 5)
+
+    def test_varios_lotes_en_una_transaccion(self):
+        # TestCase ya está dentro de una transacción: cada lote es un savepoint.
+        crear_catalogo(3, prefijo='A')
+        sucursal = Sucursal.objects.get()
+        archivo = io.StringIO(
+            "codigo,precio,stock\n"
+            "A-0,11,7\n"
+            "A-1,12,8\n"
+            "A-2,13,9\n"
+            "A-0,14,1\n"
+        )
+        resultado = importar_inventario(sucursal, archivo, 'csv', tamanio_lote=2)
+
+        self.assertEqual((resultado.filas_importadas, resultado.filas_modificadas), (4, 4))
+        self.assertEqual(resultado.rechazadas, [])
+        oferta = RepuestoSucursal.objects.get(repuesto_global__codigo='A-0')
+        self.assertEqual((oferta.precio, oferta.stock), (Decimal('14.00'), 1))
+
+    def test_stock_entero(self):
+        crear_catalogo(1, prefijo='A')
+        sucursal = Sucursal.objects.get()
+        archivo = io.StringIO(
+            '{"codigo": "A-0", "precio": 1, "stock": 2.7}\n'
+            '{"codigo": "A-0", "precio": 1, "stock": 3000000000}\n'
+            '{"codigo": "A-0", "precio": 1, "stock": 5, "stock_minimo": -1}\n'
+            '{"codigo": "A-0", "precio": 1, "stock": 4.0}\n'
+        )
+        resultado = importar_inventario(sucursal, archivo, 'jsonl')
+
+        self.assertEqual(resultado.rechazadas, [
+            (1, "Stock inválido."), (2, "Stock fuera de rango."), (3, "El stock no puede ser negativo."),
+        ])
+        self.assertEqual(RepuestoSucursal.objects.get(repuesto_global__codigo='A-0').stock, 4)
+
+    def test_jsonl_crea_ofertas_nuevas(self):
+        crear_catalogo(1, prefijo='A')
+        RepuestoGlobal.objects.create(nombre="Nuevo", codigo="N-1")
+        sucursal = Sucursal.objects.get()
+        archivo = io.StringIO('{"codigo": "N-1", "precio": "4.00", "stock": 2}\nno es json\n')
+        resultado = importar_inventario(sucursal, archivo, 'jsonl')
+
+        self.assertEqual(resultado.filas_importadas, 1)
+        self.assertEqual(resultado.rechazadas, [(2, "Línea con formato inválido.")])
+        self.assertTrue(RepuestoSucursal.objects.filter(repuesto_global__codigo='N-1', stock=2).exists())
+
+
+class GeneradorCatalogoTests(TestCase):
+    """Generador de datos sintéticos (buscador/generador.py, populate_db.py --generar)."""
+
+    def generar(self, semilla):
+        # TRUNCATE falla con las claves foráneas diferidas pendientes de la transacción del test.
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        GeneradorCatalogo.borrar_datos()
+        GeneradorCatalogo(semilla=semilla, lote=4, salida=lambda mensaje: None).generar(
+            tiendas=2, sucursales=3, categorias=2, vehiculos=50, repuestos=9,
+            compat_por_repuesto=4, ofertas_por_repuesto=2,
+        )
+        return (
+            list(RepuestoGlobal.objects.order_by('id').values_list('codigo', 'nombre', 'categoria__nombre')),
+            list(RepuestoSucursal.objects.order_by('id').values_list(
+                'repuesto_global__codigo', 'sucursal__nombre', 'precio', 'stock'
+            )),
+            list(CompatibilidadRango.objects.order_by('id').values_list(
+                'repuesto_global__codigo', 'marca', 'modelo', 'anios'
+            )),
+        )
+
+    def test_cantidades_y_compatibilidad(self):
+        repuestos, ofertas, compatibilidad = self.generar(semilla=1)
+        self.assertEqual(
+            [modelo.objects.count() for modelo in (Tienda, Sucursal, Categoria, Vehiculo)], [2, 3, 2, 50]
+        )
+        # Un rango por repuesto: cuatro años consecutivos de un mismo modelo.
+        self.assertEqual((len(repuestos), len(ofertas), len(compatibilidad)), (9, 18, 9))
+        self.assertEqual(sorted(fila[0] for fila in compatibilidad), sorted(codigo for codigo, *_ in repuestos))
+        for codigo, marca, modelo, anios in compatibilidad:
+            with self.subTest(codigo=codigo):
+                self.assertTrue(Vehiculo.objects.filter(marca=marca, modelo=modelo, anio=anios.lower).exists())
+                self.assertEqual(anios.upper - anios.lower, 4)
+        self.assertEqual(RepuestoGlobal.objects.filter(resumen_inventario__cantidad_sucursales=2).count(), 9)
+
+    def test_misma_semilla_mismos_datos(self):
+        primera = self.generar(semilla=7)
+        self.assertEqual(self.generar(semilla=7), primera)
+        self.assertNotEqual(self.generar(semilla=8), primera)
+
+
+class CacheRespuestaTests(TestCase):
+    """Caché de los listados del catálogo con invalidación por señales y ETag."""
+
+    def setUp(self):
+        get_cache().clear()
+        self.categoria = Categoria.objects.create(nombre="Frenos")
+
+    def test_segunda_peticion_sin_consultas(self):
+        self.client.get('/api/categorias/')
+        # Solo la lectura de las versiones (en la base, sin Redis).
+        with self.assertNumQueries(1):
+            respuesta = self.client.get('/api/categorias/')
+        self.assertEqual(respuesta.json()['results'][0]['nombre'], "Frenos")
+
+    def test_invalidacion_al_guardar(self):
+        self.client.get('/api/categorias/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.categoria.nombre = "Frenos y ABS"
+            self.categoria.save()
+        respuesta = self.client.get('/api/categorias/')
+        self.assertEqual(respuesta.json()['results'][0]['nombre'], "Frenos y ABS")
+
+    def test_parametros_normalizados(self):
+        primera = self.client.get('/api/categorias/?page_size=5&a=1')
+        segunda = self.client.get('/api/categorias/?a=1&page_size=5')
+        self.assertEqual(primera['ETag'], segunda['ETag'])
+
+    def test_etag_304(self):
+        etag = self.client.get('/api/categorias/')['ETag']
+        with self.assertNumQueries(1):
+            respuesta = self.client.get('/api/categorias/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Categoria.objects.create(nombre="Motor")
+        respuesta = self.client.get('/api/categorias/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+
+
+@SIN_CACHE
+class CompatibilidadTests(TestCase):
+    """Repuestos compatibles con un vehículo (/api/fitment/ y filtros del listado)."""
+
+    def setUp(self):
+        crear_catalogo(3, prefijo='A')
+        crear_catalogo(2, prefijo='B')
+        self.vehiculo = Vehiculo.objects.get(modelo="Modelo A", anio=2001)
+
+    def codigos(self, url):
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return sorted(fila['codigo'] for fila in respuesta.json()['results'])
+
+    def test_marca_modelo_y_anio_sin_distinguir_mayusculas(self):
+        self.assertEqual(
+            self.codigos('/api/fitment/?marca=toyota&modelo=MODELO%20A&anio=2001'),
+            ['A-0', 'A-1', 'A-2']
+        )
+        self.assertEqual(self.codigos('/api/fitment/?marca=Toyota&modelo=Modelo%20A&anio=1999'), [])
+
+    def test_sin_duplicados_con_varios_vehiculos(self):
+        # Cada repuesto es compatible con los 6 vehículos Toyota, pero aparece una vez.
+        self.assertEqual(self.codigos('/api/fitment/?marca=Toyota'), ['A-0', 'A-1', 'A-2', 'B-0', 'B-1'])
+
+    def test_vehiculo_id(self):
+        self.assertEqual(self.codigos(f'/api/fitment/?vehiculo_id={self.vehiculo.pk}'), ['A-0', 'A-1', 'A-2'])
+        self.assertEqual(
+            self.codigos(f'/api/repuestos-globales/?vehiculo_id={self.vehiculo.pk}'), ['A-0', 'A-1', 'A-2']
+        )
+
+    def test_filtros_del_listado_sobre_el_mismo_vehiculo(self):
+        self.assertEqual(self.codigos('/api/repuestos-globales/?modelo=modelo%20b&anio=2002'), ['B-0', 'B-1'])
+        self.assertEqual(self.codigos('/api/repuestos/?modelo=B&anio=2002'), ['B-0', 'B-1'])
+
+    def test_rangos_compactan_anios_consecutivos(self):
+        repuesto = RepuestoGlobal.objects.get(codigo='A-0')
+
+        def rangos():
+            return [(r.marca, r.modelo, r.anio_desde, r.anio_hasta) for r in repuesto.rangos_compatibilidad.all()]
+
+        self.assertEqual(rangos(), [("Toyota", "Modelo A", 2000, 2002)])
+
+        # Un año suelto queda en su propio rango; sin el del medio, el rango se parte.
+        establecer_compatibilidad(repuesto, [("Toyota", "Modelo A", anio) for anio in (2010, 2002, 2000)])
+        self.assertEqual(rangos(), [
+            ("Toyota", "Modelo A", 2000, 2000), ("Toyota", "Modelo A", 2002, 2002), ("Toyota", "Modelo A", 2010, 2010)
+        ])
+        self.assertEqual(self.codigos('/api/fitment/?marca=Toyota&modelo=Modelo%20A&anio=2001'), ['A-1', 'A-2'])
+        self.assertEqual(self.codigos('/api/repuestos-globales/?q=toyota'), ['A-0', 'A-1', 'A-2', 'B-0', 'B-1'])
+
+        # Sin compatibilidad, el repuesto deja de encontrarse por la marca.
+        establecer_compatibilidad(repuesto, [])
+        self.assertEqual(rangos(), [])
+        self.assertEqual(self.codigos('/api/repuestos-globales/?q=toyota'), ['A-1', 'A-2', 'B-0', 'B-1'])
+
+    def test_compactar_anios(self):
+        vehiculos = [self.vehiculo, ("Toyota", "Modelo A", 2000), ("Ford", "Focus", 2001), ("Toyota", "Modelo A", 2001)]
+        self.assertEqual(
+            compactar_anios(vehiculos), [("Ford", "Focus", 2001, 2001), ("Toyota", "Modelo A", 2000, 2001)]
+        )
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/api/fitment/').status_code, 400)
+        self.assertEqual(self.client.get('/api/fitment/?marca=Toyota&anio=dos').status_code, 400)
+
+
+@SIN_CACHE
+class FacetasTests(TestCase):
+    """Conteos por faceta en una sola consulta, con los filtros del listado."""
+
+    def setUp(self):
+        crear_catalogo(3, prefijo='A')
+        crear_catalogo(2, prefijo='B')
+
+    def test_todas_las_facetas(self):
+        with self.assertNumQueries(1):
+            datos = self.client.get('/api/repuestos-globales/facetas/').json()
+        self.assertEqual(
+            [(c['nombre'], c['cantidad']) for c in datos['categoria']],
+            [("Categoría A", 3), ("Categoría B", 2)]
+        )
+        self.assertEqual(datos['marca'], [{'valor': "Toyota", 'cantidad': 5}])
+        self.assertEqual(
+            [(m['valor'], m['cantidad']) for m in datos['modelo']], [("Modelo A", 3), ("Modelo B", 2)]
+        )
+        self.assertEqual([(a['valor'], a['cantidad']) for a in datos['anio']], [(2000, 5), (2001, 5), (2002, 5)])
+
+    def test_respeta_los_filtros(self):
+        datos = self.client.get(
+            '/api/repuestos-globales/facetas/?modelo=Modelo%20B&facets=categoria,anio'
+        ).json()
+        self.assertEqual(set(datos), {'categoria', 'anio'})
+        self.assertEqual([(c['nombre'], c['cantidad']) for c in datos['categoria']], [("Categoría B", 2)])
+
+    def test_faceta_desconocida(self):
+        self.assertEqual(self.client.get('/api/repuestos-globales/facetas/?facets=color').status_code, 400)
+
+
+class SugerenciasTests(TestCase):
+    """Autocompletado desde el índice de prefijos en memoria."""
+
+    def setUp(self):
+        get_cache().clear()
+        sugerencias.reiniciar()
+        crear_catalogo(2, prefijo='A')
+        # En el mismo hilo: uno aparte no vería los datos de la transacción del
+        # test. Por lo mismo, las versiones se revisan con sincronizar().
+        sugerencias.construir()
+        sugerencias.revisado = float('inf')
+        self.url = '/api/sugerencias/'
+
+    def etiquetas(self, texto, **parametros):
+        respuesta = self.client.get(self.url, {'q': texto, **parametros})
+        self.assertEqual(respuesta.status_code, 200)
+        return [s['etiqueta'] for s in respuesta.json()]
+
+    def test_indice_de_prefijos(self):
+        indice = IndicePrefijos()
+        indice.agregar(('repuesto', 1), "Pastilla de Freno", claves_de_texto("Pastilla de Freno"))
+        indice.agregar(('repuesto', 2), "Disco de Freno", claves_de_texto("Disco de Freno"))
+        self.assertEqual([s['id'] for s in indice.buscar('fre')], [1, 2])
+        self.assertEqual(indice.buscar('de'), [])
+        indice.quitar(('repuesto', 2))
+        self.assertEqual([s['id'] for s in indice.buscar('fre')], [1])
+        self.assertEqual((indice.claves, len(indice)), (['freno', 'pastilla de freno'], 1))
+
+    def test_repuestos_categorias_marcas_y_modelos(self):
+        self.assertEqual(self.etiquetas('repuesto a'), ["Repuesto A0 (A-0)", "Repuesto A1 (A-1)"])
+        self.assertEqual(self.etiquetas('a-1'), ["Repuesto A1 (A-1)"])
+        self.assertEqual(self.etiquetas('categoria'), ["Categoría A"])
+        self.assertEqual(self.etiquetas('toy'), ["Toyota", "Toyota Modelo A"])
+        self.assertEqual(self.etiquetas('mod', tipos='modelo'), ["Toyota Modelo A"])
+        # Las versiones de la caché no se leen en la petición.
+        with self.assertNumQueries(0):
+            self.etiquetas('rep', limite=1)
+
+    def test_cambios_por_senales(self):
+        self.etiquetas('rep')
+        repuesto = RepuestoGlobal.objects.get(codigo='A-0')
+        with self.captureOnCommitCallbacks(execute=True):
+            repuesto.nombre = "Bujia"
+            repuesto.save()
+            RepuestoGlobal.objects.get(codigo='A-1').delete()
+        self.assertEqual(self.etiquetas('rep'), [])
+        self.assertEqual(self.etiquetas('buj'), ["Bujia (A-0)"])
+        # Sin repuestos compatibles no quedan marcas ni modelos.
+        self.assertEqual(self.etiquetas('toy'), ["Toyota", "Toyota Modelo A"])
+        with self.captureOnCommitCallbacks(execute=True):
+            repuesto.delete()
+        self.assertEqual(self.etiquetas('toy'), [])
+
+    def test_marcas_y_modelos_por_compatibilidad(self):
+        repuesto, otro = RepuestoGlobal.objects.order_by('codigo')
+        with self.captureOnCommitCallbacks(execute=True):
+            establecer_compatibilidad(repuesto, [("Ford", "Focus", 2001)])
+        sugerencias.sincronizar()
+        # El otro repuesto sigue siendo compatible con el modelo.
+        self.assertEqual(self.etiquetas('toy'), ["Toyota", "Toyota Modelo A"])
+        self.assertEqual(self.etiquetas('foc'), ["Ford Focus"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            establecer_compatibilidad(repuesto, [("Ford", "Fiesta", 2001)])
+            establecer_compatibilidad(otro, [])
+        sugerencias.sincronizar()
+        self.assertEqual(self.etiquetas('toy'), [])
+        self.assertEqual(self.etiquetas('f'), ["Ford Fiesta", "Ford"])
+
+    def test_sin_indice_no_espera(self):
+        sugerencias.reiniciar()
+        # Con la construcción en curso, las peticiones responden sin sugerencias.
+        sugerencias.ocupado = True
+        try:
+            self.assertEqual(self.etiquetas('rep'), [])
+        finally:
+            sugerencias.ocupado = False
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get(self.url, {'q': 'a', 'limite': 0}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': 'a', 'tipos': 'color'}).status_code, 400)
+
+
+@SIN_CACHE
+class CamposDinamicosTests(TestCase):
+    """Selección de campos (?fields=) y expansión de relaciones (?expand=)."""
+
+    def setUp(self):
+        crear_catalogo(3, prefijo='A')
+        self.url = '/api/repuestos-globales/'
+
+    def primera_fila(self, parametros=''):
+        with CaptureQueriesContext(connection) as contexto:
+            respuesta = self.client.get(self.url + parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()['results'][0], contexto.captured_queries
+
+    def test_sin_parametros_no_cambia(self):
+        fila, _ = self.primera_fila()
+        self.assertEqual(list(fila), list(RepuestoGlobalSerializer().fields))
+        self.assertEqual(fila['categoria']['nombre'], "Categoría A")
+
+    def test_fields_limita_campos_columnas_y_consultas(self):
+        fila, consultas = self.primera_fila('?fields=id,nombre,codigo,categoria,precio_minimo')
+        self.assertEqual(set(fila), {'id', 'nombre', 'codigo', 'categoria', 'precio_minimo'})
+        self.assertIsInstance(fila['categoria'], int)
+        # Sin prefetch de compatibilidad y sin leer la descripción.
+        self.assertEqual(len(consultas), 1)
+        self.assertNotIn('descripcion', consultas[0]['sql'])
+
+    def test_expand(self):
+        fila, _ = self.primera_fila('?fields=id,categoria,compatibilidad_rangos&expand=compatibilidad_rangos')
+        self.assertIsInstance(fila['categoria'], int)
+        self.assertEqual(fila['compatibilidad_rangos'], [
+            {'marca': "Toyota", 'modelo': "Modelo A", 'anio_desde': 2000, 'anio_hasta': 2002}
+        ])
+        # La compatibilidad por vehículo sin expandir: solo los ids, como antes de los rangos.
+        fila, consultas = self.primera_fila(
+            '?fields=id,categoria,compatibilidad,compatibilidad_rangos&expand=categoria'
+        )
+        self.assertEqual(fila['categoria']['nombre'], "Categoría A")
+        vehiculos = Vehiculo.objects.filter(modelo="Modelo A").order_by('id').values_list('id', flat=True)
+        self.assertEqual(sorted(fila['compatibilidad']), list(vehiculos))
+        self.assertEqual(len(fila['compatibilidad_rangos']), 1)
+        # Los dos campos comparten el Prefetch de los rangos.
+        self.assertEqual(len(consultas), 2)
+
+    def test_paginacion_con_fields(self):
+        primera = self.client.get(self.url + '?fields=id&page_size=2').json()
+        segunda = self.client.get(primera['next']).json()
+        self.assertEqual(len(primera['results'] + segunda['results']), 3)
+
+
+@SIN_CACHE
+class ListadoRapidoTests(TestCase):
+    """Los listados armados sin serializador (api/rapido.py) devuelven los mismos bytes."""
+
+    def setUp(self):
+        crear_catalogo(4, prefijo='A')
+        # Sin categoría, sin compatibilidad y sin ofertas.
+        RepuestoGlobal.objects.create(nombre="Repuesto suelto", codigo="S-1")
+
+    def comparar(self, url):
+        with override_settings(API_LISTADO_RAPIDO=False):
+            esperada = self.client.get(url)
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.content, esperada.content)
+        return respuesta.json()
+
+    def test_repuestos_globales(self):
+        self.comparar('/api/repuestos-globales/')
+        self.comparar('/api/repuestos-globales/?search=repuesto')
+        self.comparar('/api/repuestos-globales/?marca=toyota&anio=2001')
+
+    def test_repuestos_sucursales(self):
+        repuesto = RepuestoGlobal.objects.filter(codigo='A-1').get()
+        self.comparar('/api/repuestos-sucursales/')
+        self.comparar(f'/api/repuestos-sucursales/?repuesto_id={repuesto.pk}')
+
+    def test_paginacion(self):
+        primera = self.comparar('/api/repuestos-globales/?page_size=2')
+        segunda = self.comparar(primera['next'])
+        self.assertEqual(len(primera['results'] + segunda['results']), 4)
+
+
+@SIN_CACHE
+class ExportacionTests(TestCase):
+    """Exportación en streaming del catálogo y del inventario."""
+
+    def setUp(self):
+        crear_catalogo(3, prefijo='A')
+
+    def contenido(self, url, **encabezados):
+        respuesta = self.client.get(url, **encabezados)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        return respuesta, b''.join(respuesta.streaming_content)
+
+    def test_repuestos_ndjson_como_la_api(self):
+        _, contenido = self.contenido('/api/export/repuestos.ndjson')
+        filas = [json.loads(linea) for linea in contenido.decode().splitlines()]
+        api = self.client.get('/api/repuestos-globales/').json()['results']
+        self.assertEqual(filas, sorted(api, key=lambda fila: fila['id']))
+
+    def test_csv(self):
+        _, contenido = self.contenido('/api/export/repuestos.csv')
+        filas = list(csv.DictReader(io.StringIO(contenido.decode())))
+        self.assertEqual(len(filas), 3)
+        self.assertEqual(filas[0]['categoria'], "Categoría A")
+        self.assertEqual(filas[0]['compatibilidad'], "Toyota Modelo A 2000-2002")
+
+        _, contenido = self.contenido('/api/export/inventario.csv')
+        filas = list(csv.DictReader(io.StringIO(contenido.decode())))
+        self.assertEqual([fila['precio'] for fila in filas], ['10.00'] * 3)
+
+    def test_gzip(self):
+        _, plano = self.contenido('/api/export/inventario.ndjson')
+        respuesta, comprimido = self.contenido('/api/export/inventario.ndjson', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(comprimido), plano)
+
+    def test_formato_desconocido(self):
+        self.assertEqual(self.client.get('/api/export/repuestos.xml').status_code, 404)
+
+
+@SIN_CACHE
+class ComparacionPreciosTests(TestCase):
+    """Ofertas con stock más baratas por repuesto (/api/comparar-precios/)."""
+
+    def setUp(self):
+        crear_catalogo(2, prefijo='A')
+        self.repuesto = RepuestoGlobal.objects.get(codigo='A-0')
+        tienda = Tienda.objects.create(nombre="Tienda B")
+        for i, (precio, stock) in enumerate([(8, 1), (12, 3), (5, 0), (9, 2)]):
+            sucursal = Sucursal.objects.create(
+                tienda=tienda, nombre=f"Sucursal B{i}", direccion="Calle 1", ubicacion=Point(-57.6, -25.3)
+            )
+            RepuestoSucursal.objects.create(
+                sucursal=sucursal, repuesto_global=self.repuesto, precio=precio, stock=stock
+            )
+        # Un repuesto sin stock en ninguna sucursal no aparece.
+        RepuestoGlobal.objects.create(nombre="Sin stock", codigo="S-1")
+
+    def test_ofertas_mas_baratas(self):
+        with CaptureQueriesContext(connection) as contexto:
+            respuesta = self.client.get('/api/comparar-precios/?ofertas=2')
+        self.assertEqual(respuesta.status_code, 200)
+        # Página de repuestos y ofertas de toda la página, más los rangos de compatibilidad.
+        self.assertLessEqual(len(contexto.captured_queries), 4)
+        filas = {fila['codigo']: fila for fila in respuesta.json()['results']}
+        self.assertEqual(set(filas), {'A-0', 'A-1'})
+        ofertas = filas['A-0']['ofertas']
+        self.assertEqual([oferta['precio'] for oferta in ofertas], ['8.00', '9.00'])
+        self.assertEqual(ofertas[0]['sucursal']['tienda']['nombre'], "Tienda B")
+        self.assertEqual([oferta['precio'] for oferta in filas['A-1']['ofertas']], ['10.00'])
+
+    def test_filtros(self):
+        respuesta = self.client.get(f'/api/comparar-precios/?repuesto_id={self.repuesto.pk}&marca=toyota')
+        self.assertEqual([fila['id'] for fila in respuesta.json()['results']], [self.repuesto.pk])
+        self.assertEqual(len(respuesta.json()['results'][0]['ofertas']), 3)
+        respuesta = self.client.get('/api/comparar-precios/?marca=honda')
+        self.assertEqual(respuesta.json()['results'], [])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/api/comparar-precios/?ofertas=0').status_code, 400)
+        self.assertEqual(self.client.get('/api/comparar-precios/?repuesto_id=x').status_code, 400)
+
+
+@SIN_CACHE
+class FilasInactivasTests(TestCase):
+    """Las filas con activo=False no se sirven; all_objects las incluye."""
+
+    def setUp(self):
+        crear_catalogo(2, prefijo='A')
+        self.inactivo = RepuestoGlobal.objects.get(codigo='A-1')
+        self.inactivo.activo = False
+        self.inactivo.save()
+
+    def test_manager_por_defecto(self):
+        self.assertEqual(list(RepuestoGlobal.objects.values_list('codigo', flat=True)), ['A-0'])
+        self.assertEqual(RepuestoGlobal.all_objects.count(), 2)
+        # Las FK hacia un objeto inactivo se siguen resolviendo.
+        oferta = RepuestoSucursal.objects.get(repuesto_global_id=self.inactivo.pk)
+        self.assertEqual(oferta.repuesto_global, self.inactivo)
+
+    def test_api(self):
+        respuesta = self.client.get('/api/repuestos-globales/')
+        self.assertEqual([fila['codigo'] for fila in respuesta.json()['results']], ['A-0'])
+        self.assertEqual(self.client.get(f'/api/repuestos-globales/{self.inactivo.pk}/').status_code, 404)
+
+    def test_vehiculo_inactivo(self):
+        vehiculo = Vehiculo.objects.get(anio=2002)
+        vehiculo.activo = False
+        vehiculo.save()
+        # No se puede buscar por su id; la compatibilidad por rangos no cambia.
+        respuesta = self.client.get(f'/api/repuestos-globales/?vehiculo_id={vehiculo.pk}')
+        self.assertEqual(respuesta.json()['results'], [])
+        fila = self.client.get('/api/repuestos-globales/').json()['results'][0]
+        self.assertEqual(fila['compatibilidad_rangos'][0]['anio_hasta'], 2002)
+        # La compatibilidad por vehículo solo lista los vehículos activos.
+        self.assertEqual([vehiculo['anio'] for vehiculo in fila['compatibilidad']], [2000, 2001])
+
+    def test_oferta_inactiva_fuera_del_resumen(self):
+        repuesto = RepuestoGlobal.objects.get(codigo='A-0')
+        oferta = RepuestoSucursal.objects.get(repuesto_global=repuesto)
+        oferta.activo = False
+        with self.captureOnCommitCallbacks(execute=True):
+            oferta.save()
+        self.assertEqual(RepuestoGlobal.objects.get(pk=repuesto.pk).resumen_inventario.stock_total, 0)
+
+    def test_unicidad_incluye_inactivos(self):
+        serializer = RepuestoGlobalSerializer(data={'nombre': "Otro", 'codigo': 'A-1'})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('codigo', serializer.errors)
+
+
+@SIN_CACHE
+class VistasAsincronasTests(TestCase):
+    """Las vistas de /api/async/ responden lo mismo que las vistas síncronas."""
+
+    def setUp(self):
+        crear_catalogo(3, prefijo='A')
+        self.repuesto = RepuestoGlobal.objects.get(codigo='A-0')
+
+    def comparar(self, ruta):
+        esperada = self.client.get('/api' + ruta)
+        respuesta = self.client.get('/api/async' + ruta)
+        self.assertEqual(respuesta.status_code, esperada.status_code)
+        self.assertEqual(self.sin_ruta(respuesta.json()), self.sin_ruta(esperada.json()))
+        return respuesta
+
+    def sin_ruta(self, datos):
+        """Los enlaces de paginación llevan la ruta de cada vista: se compara solo su consulta (el cursor)."""
+        for enlace in ('next', 'previous'):
+            if isinstance(datos, dict) and datos.get(enlace):
+                datos[enlace] = urlsplit(datos[enlace]).query
+        return datos
+
+    def test_repuestos_globales(self):
+        self.comparar('/repuestos-globales/')
+        self.comparar('/repuestos-globales/?search=repuesto&marca=toyota')
+        self.comparar('/repuestos-globales/?fields=id,nombre')
+        primera = self.comparar('/repuestos-globales/?page_size=2').json()
+        self.comparar('/repuestos-globales/?' + primera['next'].split('?', 1)[1])
+
+    def test_cercanos(self):
+        self.comparar(f'/repuestos-globales/{self.repuesto.pk}/cercanos/?lat=-25.28&lng=-57.63')
+        self.comparar(f'/repuestos-globales/{self.repuesto.pk}/cercanos/?lat=95&lng=-57.6')
+        self.assertEqual(self.comparar('/repuestos-globales/0/cercanos/?lat=-25.28&lng=-57.63').status_code, 404)
+
+
+@SIN_CACHE
+class ReservasStockTests(TestCase):
+    """Reserva, confirmación y liberación de stock (/api/repuestos-sucursales/<pk>/reservar/ y /api/reservas/)."""
+
+    def setUp(self):
+        crear_catalogo(2, prefijo='A')
+        self.oferta, self.otra = RepuestoSucursal.objects.order_by('id')
+
+    def stock(self, oferta):
+        return RepuestoSucursal.all_objects.get(pk=oferta.pk).stock
+
+    def test_reservar_y_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(
+                f'/api/repuestos-sucursales/{self.oferta.pk}/reservar/', {'cantidad': 3}, content_type='application/json'
+            )
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(self.stock(self.oferta), 2)
+        # El UPDATE no envía post_save: el resumen se actualiza al confirmar la transacción.
+        self.assertEqual(RepuestoGlobal.objects.get(pk=self.oferta.repuesto_global_id).resumen_inventario.stock_total, 2)
+        pedido = respuesta.json()['pedido']
+        respuesta = self.client.post(f'/api/reservas/{pedido}/confirmar/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['reservas'][0]['estado'], 'confirmada')
+        # Ya no está pendiente: no se puede liberar.
+        self.assertEqual(self.client.post(f'/api/reservas/{pedido}/liberar/').status_code, 409)
+        self.assertEqual(self.stock(self.oferta), 2)
+
+    def test_sin_stock(self):
+        respuesta = self.client.post(
+            f'/api/repuestos-sucursales/{self.oferta.pk}/reservar/', {'cantidad': 6}, content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.json()['ofertas'], [self.oferta.pk])
+        self.assertEqual(self.stock(self.oferta), 5)
+        respuesta = self.client.post(
+            f'/api/repuestos-sucursales/{self.oferta.pk}/reservar/', {'cantidad': 0}, content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_pedido_todo_o_nada(self):
+        lineas = [{'oferta': self.oferta.pk, 'cantidad': 2}, {'oferta': self.otra.pk, 'cantidad': 9}]
+        respuesta = self.client.post('/api/reservas/', {'lineas': lineas}, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual((self.stock(self.oferta), self.stock(self.otra)), (5, 5))
+        self.assertFalse(ReservaStock.objects.exists())
+
+        lineas[1]['cantidad'] = 4
+        respuesta = self.client.post('/api/reservas/', {'lineas': lineas}, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual((self.stock(self.oferta), self.stock(self.otra)), (3, 1))
+        respuesta = self.client.post(f"/api/reservas/{respuesta.json()['pedido']}/liberar/")
+        self.assertEqual([r['estado'] for r in respuesta.json()['reservas']], ['liberada', 'liberada'])
+        self.assertEqual((self.stock(self.oferta), self.stock(self.otra)), (5, 5))
+
+    def test_vencidas(self):
+        reservas = reservar([(self.oferta.pk, 4)])
+        ReservaStock.objects.filter(pk=reservas[0].pk).update(vence=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.client.post(f'/api/reservas/{reservas[0].pedido}/confirmar/').status_code, 409)
+        # Al reservar otra vez la oferta, lo retenido por la vencida vuelve antes.
+        reservar([(self.oferta.pk, 5)])
+        self.assertEqual(ReservaStock.objects.get(pk=reservas[0].pk).estado, 'vencida')
+        self.assertEqual(self.stock(self.oferta), 0)
+        self.assertEqual(liberar_vencidas(), 0)
+
+
+class ReservasConcurrentesTests(TransactionTestCase):
+    """Muchas reservas a la vez sobre las mismas ofertas, cada una en su conexión."""
+
+    def setUp(self):
+        crear_catalogo(2, prefijo='A')
+        self.oferta, self.otra = RepuestoSucursal.objects.order_by('id')
+
+    def en_paralelo(self, tareas):
+        resultados, bloqueo = [], threading.Lock()
+        barrera = threading.Barrier(len(tareas))
+
+        def correr(tarea):
+            try:
+                barrera.wait()
+                try:
+                    resultado = tarea()
+                except StockInsuficiente:
+                    resultado = None
+                with bloqueo:
+                    resultados.append(resultado)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=correr, args=(tarea,)) for tarea in tareas]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return resultados
+
+    def test_no_se_reserva_mas_que_el_stock(self):
+        resultados = self.en_paralelo([lambda: reservar([(self.oferta.pk, 1)])] * 20)
+        self.assertEqual(len(resultados), 20)
+        self.assertEqual(sum(resultado is not None for resultado in resultados), 5)
+        self.assertEqual(RepuestoSucursal.objects.get(pk=self.oferta.pk).stock, 0)
+        self.assertEqual(ReservaStock.objects.filter(oferta=self.oferta).count(), 5)
+
+    def test_pedidos_cruzados_sin_deadlock(self):
+        # Mismas ofertas en orden opuesto: se bloquean siempre en orden de id.
+        directo = [(self.oferta.pk, 1), (self.otra.pk, 1)]
+        tareas = [lambda: reservar(directo), lambda: reservar(directo[::-1])] * 4
+        resultados = self.en_paralelo(tareas)
+        self.assertEqual(sum(resultado is not None for resultado in resultados), 5)
+        self.assertEqual(RepuestoSucursal.objects.get(pk=self.oferta.pk).stock, 0)
+        self.assertEqual(RepuestoSucursal.objects.get(pk=self.otra.pk).stock, 0)
+
+
+class HistorialPreciosTests(TestCase):
+    """Historial de precios y stock (triggers, particiones y series diarias)."""
+
+    def setUp(self):
+        crear_catalogo(1, prefijo='A')
+        self.oferta = RepuestoSucursal.objects.get()
+        self.oferta.precio = 12
+        self.oferta.save()
+        self.oferta.save()  # Sin cambios: no se registra.
+        reservar([(self.oferta.pk, 2)])  # UPDATE del stock, sin pasar por save().
+
+    def test_registro_por_triggers(self):
+        historial = HistorialPrecio.objects.filter(oferta=self.oferta).values_list('precio', 'stock')
+        self.assertEqual(list(historial), [(Decimal('10.00'), 5), (Decimal('12.00'), 5), (Decimal('12.00'), 3)])
+
+    def test_serie_diaria(self):
+        respuesta = self.client.get(f'/api/repuestos-sucursales/{self.oferta.pk}/historial-precios/')
+        self.assertEqual(respuesta.status_code, 200)
+        serie = respuesta.json()['serie']
+        self.assertEqual(len(serie), 1)
+        # El precio vigente al final del día; la reserva solo cambia el stock.
+        self.assertEqual(
+            {clave: valor for clave, valor in serie[0].items() if clave != 'dia'},
+            {
+                'precio_minimo': '12.00', 'precio_promedio': '12.00', 'precio_maximo': '12.00',
+                'cambios': 2, 'stock_minimo': 3, 'stock_maximo': 5,
+            }
+        )
+        ruta = f'/api/repuestos-globales/{self.oferta.repuesto_global_id}/historial-precios/'
+        self.assertEqual(self.client.get(ruta).json()['serie'][0]['cambios'], 2)
+        self.assertEqual(self.client.get(ruta + '?sucursal_id=0').json()['serie'], [])
+        self.assertEqual(self.client.get(ruta + '?desde=2020-01-01&hasta=2020-01-31').json()['serie'], [])
+
+    def test_serie_diaria_con_oferta_sin_cambios(self):
+        # Otra oferta del repuesto (ya borrada: el historial se conserva) con
+        # un único precio de hace tres días, que sigue vigente.
+        hoy = timezone.localdate()
+        HistorialPrecio.objects.create(
+            oferta_id=self.oferta.pk + 1000, repuesto_global_id=self.oferta.repuesto_global_id,
+            sucursal_id=self.oferta.sucursal_id, precio=20, stock=1, activo=True,
+            fecha=timezone.make_aware(datetime.combine(hoy - timedelta(days=3), time(12))),
+        )
+        ruta = f'/api/repuestos-globales/{self.oferta.repuesto_global_id}/historial-precios/'
+        serie = self.client.get(ruta, {'desde': (hoy - timedelta(days=3)).isoformat()}).json()['serie']
+        self.assertEqual(
+            [(fila['precio_minimo'], fila['precio_promedio'], fila['precio_maximo'], fila['cambios']) for fila in serie],
+            [
+                ('20.00', '20.00', '20.00', 1),
+                ('20.00', '20.00', '20.00', 0),
+                ('20.00', '20.00', '20.00', 0),
+                ('12.00', '16.00', '20.00', 2),
+            ]
+        )
+
+    def test_parametros_invalidos(self):
+        ruta = f'/api/repuestos-globales/{self.oferta.repuesto_global_id}/historial-precios/'
+        self.assertEqual(self.client.get(ruta + '?desde=ayer').status_code, 400)
+        self.assertEqual(self.client.get(ruta + '?desde=2020-02-01&hasta=2020-01-01').status_code, 400)
+        self.assertEqual(self.client.get(ruta + '?desde=2020-01-01&hasta=2021-06-01').status_code, 400)
+
+    def test_particiones(self):
+        fila = HistorialPrecio.objects.create(
+            oferta=self.oferta, repuesto_global_id=self.oferta.repuesto_global_id,
+            sucursal_id=self.oferta.sucursal_id, precio=1, stock=1, activo=True,
+            fecha=timezone.make_aware(datetime(2020, 1, 15, 12)),
+        )
+
+        def particion():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT tableoid::regclass::text FROM buscador_historialprecio WHERE id = %s', [fila.pk])
+                return cursor.fetchone()[0]
+
+        self.assertEqual(particion(), 'buscador_historialprecio_default')
+        # La fila que había caído en la partición por defecto pasa a la del mes.
+        self.assertEqual(crear_particiones(1, desde=date(2020, 1, 1)), [date(2020, 1, 1)])
+        self.assertEqual(particion(), 'buscador_historialprecio_2020_01')
+        self.assertEqual(crear_particiones(1, desde=date(2020, 1, 1)), [])
+        self.assertEqual(borrar_particiones_anteriores(12), ['buscador_historialprecio_2020_01'])
+        self.assertFalse(HistorialPrecio.objects.filter(pk=fila.pk).exists())
+
+
+@SIN_CACHE
+class SincronizacionTests(TestCase):
+    """Cambios desde una marca de agua (/api/sync/<recurso>/)."""
+
+    def setUp(self):
+        crear_catalogo(2, prefijo='A')
+        self.repuesto, self.otro = RepuestoGlobal.objects.order_by('codigo')
+        # Fuera del margen de la sincronización.
+        self.envejecer(RepuestoGlobal.all_objects.all(), RepuestoSucursal.all_objects.all(), minutos=60)
+
+    def envejecer(self, *querysets, minutos):
+        fecha = timezone.now() - timedelta(minutes=minutos)
+        for queryset in querysets:
+            campo = 'fecha' if queryset.model is Eliminacion else 'fecha_actualizacion'
+            queryset.update(**{campo: fecha})
+
+    def sincronizar(self, recurso, marca=None, **parametros):
+        if marca:
+            parametros['desde'] = marca
+        respuesta = self.client.get(f'/api/sync/{recurso}/', parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_cambios_y_eliminados(self):
+        primera = self.sincronizar('repuestos-globales')
+        self.assertEqual([fila['codigo'] for fila in primera['cambios']], ['A-0', 'A-1'])
+        self.assertEqual(len(primera['cambios'][0]['compatibilidad_rangos']), 1)
+        self.assertEqual(len(primera['cambios'][0]['compatibilidad']), 3)
+        self.assertFalse(primera['hay_mas'])
+        ofertas = self.sincronizar('repuestos-sucursales')
+
+        # Sin cambios, no se envía nada.
+        vacia = self.sincronizar('repuestos-globales', primera['marca_agua'])
+        self.assertEqual((vacia['cambios'], vacia['eliminados']), ([], []))
+
+        self.repuesto.nombre = "Renombrado"
+        self.repuesto.save()
+        self.otro.activo = False
+        self.otro.save()
+        oferta = RepuestoSucursal.objects.get(repuesto_global=self.repuesto)
+        oferta.delete()
+        # Los cambios recientes (dentro del margen) se envían en la próxima sincronización.
+        self.assertEqual(self.sincronizar('repuestos-globales', primera['marca_agua'])['cambios'], [])
+        self.envejecer(RepuestoGlobal.all_objects.all(), Eliminacion.objects.all(), minutos=30)
+
+        cambios = self.sincronizar('repuestos-globales', primera['marca_agua'])
+        self.assertEqual([fila['nombre'] for fila in cambios['cambios']], ["Renombrado"])
+        self.assertEqual(cambios['eliminados'], [self.otro.pk])
+        cambios = self.sincronizar('repuestos-sucursales', ofertas['marca_agua'])
+        self.assertEqual((cambios['cambios'], cambios['eliminados']), ([], [oferta.pk]))
+
+    def test_paginas(self):
+        marca, codigos = None, []
+        for _ in range(3):
+            pagina = self.sincronizar('repuestos-globales', marca, limite=1)
+            codigos += [fila['codigo'] for fila in pagina['cambios']]
+            marca = pagina['marca_agua']
+            if not pagina['hay_mas']:
+                break
+        self.assertEqual(codigos, ['A-0', 'A-1'])
+        self.assertFalse(pagina['hay_mas'])
+
+    def test_compatibilidad_modificada(self):
+        marca = self.sincronizar('repuestos-globales')['marca_agua']
+        establecer_compatibilidad(self.repuesto, [])
+        # La fila del repuesto se marcó como modificada.
+        modificado = RepuestoGlobal.objects.get(pk=self.repuesto.pk).fecha_actualizacion
+        self.assertGreater(modificado, timezone.now() - timedelta(minutes=1))
+        self.envejecer(RepuestoGlobal.all_objects.filter(pk=self.repuesto.pk), minutos=30)
+        cambios = self.sincronizar('repuestos-globales', marca)['cambios']
+        self.assertEqual([(fila['codigo'], fila['compatibilidad_rangos']) for fila in cambios], [('A-0', [])])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get('/api/sync/repuestos-globales/?desde=xyz').status_code, 400)
+        self.assertEqual(self.client.get('/api/sync/repuestos-globales/?limite=0').status_code, 400)
+        self.assertEqual(self.client.get('/api/sync/pedidos/').status_code, 404)
+
+
+@SIN_CACHE
+@override_settings(SINCRONIZACION_MARGEN=0)
+class SincronizacionConcurrenteTests(TransactionTestCase):
+    """Filas y borrados de una transacción larga que se confirma después de filas más nuevas."""
+
+    def setUp(self):
+        crear_catalogo(2, prefijo='A')
+        self.repuesto, self.otro = RepuestoGlobal.objects.order_by('codigo')
+        self.oferta, self.otra_oferta = RepuestoSucursal.objects.order_by('id')
+        fecha = timezone.now() - timedelta(minutes=60)
+        RepuestoGlobal.all_objects.update(fecha_actualizacion=fecha)
+        RepuestoSucursal.all_objects.update(fecha_actualizacion=fecha)
+
+    def sincronizar(self, recurso, marca):
+        respuesta = self.client.get(f'/api/sync/{recurso}/', {'desde': marca})
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_transaccion_larga(self):
+        marcas = {
+            recurso: self.client.get(f'/api/sync/{recurso}/').json()['marca_agua']
+            for recurso in ('repuestos-globales', 'repuestos-sucursales')
+        }
+        escribio, confirmar = threading.Event(), threading.Event()
+
+        def transaccion_larga():
+            try:
+                with transaction.atomic():
+                    RepuestoGlobal.objects.filter(pk=self.repuesto.pk).update(
+                        nombre="Importado", fecha_actualizacion=timezone.now()
+                    )
+                    RepuestoSucursal.objects.get(pk=self.oferta.pk).delete()
+                    escribio.set()
+                    confirmar.wait(10)
+            finally:
+                connection.close()
+
+        hilo = threading.Thread(target=transaccion_larga)
+        hilo.start()
+        self.assertTrue(escribio.wait(10))
+        # Cambios confirmados después, con fechas e ids más nuevos.
+        self.otro.nombre = "Renombrado"
+        self.otro.save()
+        self.otra_oferta.delete()
+        try:
+            # Mientras la transacción larga sigue abierta no se envían.
+            for recurso, marca in marcas.items():
+                cambios = self.sincronizar(recurso, marca)
+                self.assertEqual((cambios['cambios'], cambios['eliminados']), ([], []))
+        finally:
+            confirmar.set()
+            hilo.join()
+
+        cambios = self.sincronizar('repuestos-globales', marcas['repuestos-globales'])
+        self.assertEqual([fila['nombre'] for fila in cambios['cambios']], ["Importado", "Renombrado"])
+        cambios = self.sincronizar('repuestos-sucursales', marcas['repuestos-sucursales'])
+        self.assertEqual(sorted(cambios['eliminados']), [self.oferta.pk, self.otra_oferta.pk])
+
+
+@SIN_CACHE
+class InstrumentacionTests(TestCase):
+    """Server-Timing, log por petición, N+1 y perfiles (buscador/instrumentacion.py)."""
+
+    def setUp(self):
+        crear_catalogo(3, prefijo='A')
+
+    def test_server_timing(self):
+        with override_settings(API_LISTADO_RAPIDO=False), CaptureQueriesContext(connection) as contexto:
+            with self.assertLogs('buscador.instrumentacion', 'INFO') as logs:
+                respuesta = self.client.get('/api/repuestos-globales/')
+        metricas = dict(metrica.split(';', 1) for metrica in respuesta['Server-Timing'].split(', '))
+        self.assertEqual(set(metricas), {'db', 'serializacion', 'render', 'total'})
+        self.assertIn(f'desc="{len(contexto.captured_queries)} consultas"', metricas['db'])
+        linea = json.loads(logs.records[0].getMessage())
+        self.assertEqual(linea['vista'], 'repuesto-global-list')
+        self.assertEqual(linea['consultas'], len(contexto.captured_queries))
+        self.assertGreater(linea['serializacion_ms'], 0)
+
+    def test_forma_sql(self):
+        self.assertEqual(
+            forma_sql("SELECT * FROM t WHERE id = 12 AND nombre = 'a''b' AND x IN (%s, %s, %s)"),
+            "SELECT * FROM t WHERE id = ? AND nombre = ? AND x IN (%s, ...)",
+        )
+
+    def test_n_mas_1(self):
+        def vista(request):
+            for repuesto in RepuestoGlobal.objects.all():
+                repuesto.categoria.nombre  # Una consulta por repuesto.
+            return HttpResponse()
+
+        with override_settings(INSTRUMENTACION_N_MAS_1=3):
+            middleware = InstrumentacionMiddleware(vista)
+        with self.assertLogs('buscador.instrumentacion', 'WARNING') as logs:
+            middleware(RequestFactory().get('/prueba/'))
+        aviso = json.loads(logs.records[0].getMessage())
+        self.assertEqual((aviso['evento'], aviso['repeticiones']), ('n_mas_1', 3))
+        self.assertIn('buscador_categoria', aviso['sql'])
+
+    def test_vista_asincrona(self):
+        async def vista(request):
+            return HttpResponse(str(await RepuestoGlobal.objects.acount()))
+
+        middleware = InstrumentacionMiddleware(vista)
+        self.assertTrue(iscoroutinefunction(middleware))
+        with self.assertLogs('buscador.instrumentacion', 'INFO'):
+            respuesta = async_to_sync(middleware)(RequestFactory().get('/prueba/'))
+        self.assertEqual(respuesta.content, b'3')
+        self.assertIn('desc="1 consultas"', respuesta['Server-Timing'])
+
+    def test_perfil(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            with override_settings(INSTRUMENTACION_PERFIL_MUESTRA=1, INSTRUMENTACION_PERFIL_DIR=directorio):
+                middleware = InstrumentacionMiddleware(lambda request: HttpResponse())
+            with self.assertLogs('buscador.instrumentacion', 'INFO'):
+                middleware(RequestFactory().get('/api/tiendas/'))
+            self.assertEqual(len(list(Path(directorio).glob('*-api-tiendas.prof'))), 1)
+
+
+class VistaLectura(LecturaReplicaMixin, View):
+
+    def get(self, request):
+        return HttpResponse(alias_lectura())
+
+    def post(self, request):
+        return HttpResponse(alias_lectura())
+
+
+def vista_sin_marcar(request):
+    return HttpResponse(alias_lectura())
+
+
+@lectura_en_replica
+def vista_en_streaming(request):
+    # El contenido se genera al recorrer la respuesta, después del middleware.
+    return StreamingHttpResponse(iterar_en_la_peticion(alias_lectura() for _ in range(2)))
+
+
+@lectura_en_replica
+def vista_que_escribe(request):
+    ReplicasRouter().db_for_write(RepuestoGlobal)
+    return HttpResponse(alias_lectura())
+
+
+@override_settings(REPLICAS={'replica_1': 1})
+class ReplicasTests(SimpleTestCase):
+    """Elección de la réplica por petición y lecturas en la primaria después de escribir (buscador/replicas.py)."""
+
+    def pedir(self, vista, metodo='get', cookie=None):
+        fabrica = RequestFactory()
+        if cookie is not None:
+            fabrica.cookies[COOKIE] = cookie
+        request = getattr(fabrica, metodo)('/prueba/')
+        # process_view antes de la vista, como lo hace el manejador de Django.
+        middleware = ReplicasMiddleware(lambda request: middleware.process_view(request, vista, (), {}) or vista(request))
+        return middleware(request)
+
+    def test_lectura_en_replica(self):
+        respuesta = self.pedir(VistaLectura.as_view())
+        self.assertEqual(respuesta.content, b'replica_1')
+        self.assertNotIn(COOKIE, respuesta.cookies)
+        # Fuera de la petición se lee de la primaria.
+        self.assertEqual(alias_lectura(), 'default')
+
+    def test_vista_sin_marcar(self):
+        self.assertEqual(self.pedir(vista_sin_marcar).content, b'default')
+
+    def test_primaria_despues_de_escribir(self):
+        respuesta = self.pedir(VistaLectura.as_view(), metodo='post')
+        self.assertEqual(respuesta.content, b'default')
+        cookie = respuesta.cookies[COOKIE].value
+        self.assertEqual(self.pedir(VistaLectura.as_view(), cookie=cookie).content, b'default')
+        # Una cookie sin firma válida no cuenta.
+        self.assertEqual(self.pedir(VistaLectura.as_view(), cookie='9999999999').content, b'replica_1')
+        with override_settings(REPLICAS_PRIMARIA_SEGUNDOS=0):
+            respuesta = self.pedir(VistaLectura.as_view(), metodo='post')
+        cookie = respuesta.cookies[COOKIE].value
+        self.assertEqual(self.pedir(VistaLectura.as_view(), cookie=cookie).content, b'replica_1')
+
+    def test_streaming(self):
+        respuesta = self.pedir(vista_en_streaming)
+        self.assertEqual(b''.join(respuesta.streaming_content), b'replica_1replica_1')
+        self.assertEqual(alias_lectura(), 'default')
+
+    def test_escritura_en_get(self):
+        respuesta = self.pedir(vista_que_escribe)
+        self.assertEqual(respuesta.content, b'default')
+        self.assertIn(COOKIE, respuesta.cookies)
+
+    def test_asincrono(self):
+        def pedir(vista):
+            async def siguiente(request):
+                # Desde ASGI, process_view y la vista síncrona corren en un hilo.
+                await sync_to_async(middleware.process_view)(request, vista, (), {})
+                return await sync_to_async(vista)(request)
+
+            middleware = ReplicasMiddleware(siguiente)
+            self.assertTrue(iscoroutinefunction(middleware))
+            return async_to_sync(middleware)(RequestFactory().get('/prueba/'))
+
+        respuesta = pedir(VistaLectura.as_view())
+        self.assertEqual(respuesta.content, b'replica_1')
+        self.assertNotIn(COOKIE, respuesta.cookies)
+        respuesta = pedir(vista_que_escribe)
+        self.assertEqual(respuesta.content, b'default')
+        self.assertIn(COOKIE, respuesta.cookies)
+
+    def test_pesos(self):
+        aleatorio = random.Random(1)
+        elegidas = [elegir_replica({'replica_1': 3, 'replica_2': 1}, aleatorio) for _ in range(4000)]
+        self.assertAlmostEqual(elegidas.count('replica_1') / len(elegidas), 0.75, delta=0.03)
+        self.assertIsNone(elegir_replica({}))
+        with override_settings(REPLICAS={'replica_1': 2, 'replica_2': 0}):
+            self.assertEqual(pesos_replicas(), {'replica_1': 2})
+
+    def test_router(self):
+        router = ReplicasRouter()
+        repuesto = RepuestoGlobal(pk=1)
+        repuesto._state.db = 'replica_1'
+        # Una fila leída de una réplica se guarda en la primaria.
+        self.assertEqual(router.db_for_write(RepuestoGlobal, instance=repuesto), 'default')
+        categoria = Categoria(pk=1)
+        categoria._state.db = 'default'
+        self.assertIs(router.allow_relation(repuesto, categoria), True)
+        self.assertIs(router.allow_migrate('replica_1', 'buscador'), False)
+        self.assertIsNone(router.allow_migrate('default', 'buscador'))
@@ -1,8 +1,13 @@
 # buscador/views.py
 from django.shortcuts import render
-from django.db import models # ¡Importante! Necesitamos importar 'models' para usar Q
 from rest_framework import generics
-from .models import RepuestoGlobal, Categoria, Vehiculo
+from rest_framework.exceptions import ValidationError
+from .api.optimizacion import ConsultaOptimizadaMixin
+from .busqueda import buscar_repuestos
+from .cache import CacheRespuestaMixin
+from .compatibilidad import filtrar_compatibles, rangos_compatibles
+from .models import RepuestoGlobal, Categoria, Vehiculo, ResumenInventario
+from .replicas import LecturaReplicaMixin
 from .serializers import RepuestoGlobalSerializer
 
 # -------------------------------------------------------------
@@ -19,16 +24,20 @@ def index(request):
 # -------------------------------------------------------------
 # Vistas de la API
 # -------------------------------------------------------------
-class RepuestoGlobalList(generics.ListAPIView):
+class RepuestoGlobalList(LecturaReplicaMixin, CacheRespuestaMixin, ConsultaOptimizadaMixin, generics.ListAPIView):
     """
     Vista de la API para listar repuestos.
     Permite filtrar por términos de búsqueda y otros campos.
     """
+    # Modelos cuyos cambios invalidan la respuesta en caché.
+    modelos_cache = [RepuestoGlobal, Categoria, Vehiculo, ResumenInventario]
+    queryset = RepuestoGlobal.objects.all()
     serializer_class = RepuestoGlobalSerializer
     
     def get_queryset(self):
-        # Obtener todos los repuestos como punto de partida.
-        queryset = RepuestoGlobal.objects.all()
+        # Obtener todos los repuestos como punto de partida, con las relaciones
+        # que necesita el serializador ya cargadas (ver ConsultaOptimizadaMixin).
+        queryset = super().get_queryset()
         
         # Obtener los parámetros de la URL para filtrar.
         search_term = self.request.query_params.get('search', None)
@@ -37,25 +46,21 @@ class RepuestoGlobalList(generics.ListAPIView):
         anio_filter = self.request.query_params.get('anio', None)
         categoria_filter = self.request.query_params.get('categoria_id', None)
 
+        # Búsqueda de texto completo sobre el vector indexado (ordenada por relevancia).
         if search_term:
-            queryset = queryset.filter(
-                models.Q(nombre__icontains=search_term) |
-                models.Q(descripcion__icontains=search_term)
-            )
+            queryset = buscar_repuestos(queryset, search_term)
 
-        # Filtros de compatibilidad:
-        # Corregimos el nombre del campo a 'compatibilidad' para que coincida con el modelo.
-        if marca_filter:
-            queryset = queryset.filter(compatibilidad__marca__icontains=marca_filter)
-        if modelo_filter:
-            queryset = queryset.filter(compatibilidad__modelo__icontains=modelo_filter)
-        if anio_filter:
-            queryset = queryset.filter(compatibilidad__anio=anio_filter)
+        # Filtros de compatibilidad: los tres se aplican sobre el mismo rango de
+        # compatibilidad con un EXISTS, así que no hacen falta JOIN ni distinct().
+        if anio_filter and not anio_filter.isdigit():
+            raise ValidationError({'anio': 'Debe ser un número entero.'})
+        if marca_filter or modelo_filter or anio_filter:
+            rangos = rangos_compatibles(marca_filter, modelo_filter, anio_filter or None, exacto=False)
+            queryset = filtrar_compatibles(queryset, rangos)
         
         # Filtro de categoría:
         # El nombre del campo aquí es correcto.
         if categoria_filter:
             queryset = queryset.filter(categoria=categoria_filter)
         
-        # Usamos distinct() al final para evitar duplicados si se aplican múltiples filtros.
-        return queryset.distinct()
+        return queryset
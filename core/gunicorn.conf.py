@@ -0,0 +1,40 @@
+# core/gunicorn.conf.py
+# Configuración de gunicorn para producción, con dos perfiles:
+#
+#   ASGI (por defecto): workers de uvicorn sobre core/asgi.py. Las vistas
+#   asíncronas (/api/async/...) no ocupan el worker mientras esperan a la
+#   base; las vistas síncronas de DRF corren en el pool de hilos de Django.
+#       gunicorn -c core/gunicorn.conf.py
+#
+#   WSGI: workers síncronos con hilos sobre core/wsgi.py.
+#       GUNICORN_PERFIL=wsgi gunicorn -c core/gunicorn.conf.py
+#
+# Requiere gunicorn y, para ASGI, uvicorn-worker (pip install gunicorn uvicorn-worker).
+# Con ASGI conviene CONN_MAX_AGE = 0 (valor por defecto): las conexiones
+# persistentes de Django son por hilo y el pool de hilos de las vistas
+# asíncronas las dejaría abiertas. Para reutilizarlas, usar pgbouncer.
+import multiprocessing
+import os
+
+perfil = os.environ.get('GUNICORN_PERFIL', 'asgi')
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+# Reinicia cada worker tras una cantidad de peticiones (con algo de azar para
+# que no se reinicien todos a la vez), por si algo acumula memoria.
+max_requests = 5000
+max_requests_jitter = 500
+accesslog = '-'
+
+if perfil == 'asgi':
+    wsgi_app = 'core.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+elif perfil == 'wsgi':
+    wsgi_app = 'core.wsgi:application'
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+else:
+    raise ValueError(f"GUNICORN_PERFIL desconocido: {perfil!r} (opciones: asgi, wsgi).")
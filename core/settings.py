@@ -75,6 +75,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.gis',   # Requerido para usar PostGIS
+    'django.contrib.postgres',  # Búsqueda de texto completo e índices GIN
     'django_filters',
     'corsheaders',          # Para permitir peticiones desde el frontend de React
     'rest_framework',       # Para la API
@@ -86,10 +87,41 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
-    ]
+    ],
+    # Paginación por cursor (keyset) en todos los listados.
+    # El cliente puede pedir otro tamaño con ?page_size= (máximo 200).
+    'DEFAULT_PAGINATION_CLASS': 'buscador.api.pagination.PaginacionKeyset',
+    'PAGE_SIZE': 50,
+    # Los mismos bytes que el JSONRenderer de DRF (ver buscador/api/renderers.py).
+    'DEFAULT_RENDERER_CLASSES': [
+        'buscador.api.renderers.JSONRapidoRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
+# Los listados de repuestos se arman sin ModelSerializer (buscador/api/rapido.py).
+API_LISTADO_RAPIDO = True
+
+# Segundos que dura una reserva de stock pendiente (buscador/reservas.py).
+RESERVA_STOCK_TTL = 15 * 60
+
+# Segundos de margen de la sincronización incremental (buscador/api/sincronizacion.py),
+# además del inicio de las transacciones abiertas: la diferencia tolerada entre
+# el reloj de la aplicación y el de la base. Las filas modificadas más
+# recientemente se envían en la próxima petición.
+SINCRONIZACION_MARGEN = 5
+
+# Instrumentación por petición (buscador/instrumentacion.py): Server-Timing,
+# log JSON, detección de N+1 y perfiles con cProfile de una fracción de las
+# peticiones (0 = ninguna; por ejemplo INSTRUMENTACION_PERFIL_MUESTRA=0.01).
+INSTRUMENTACION_ACTIVA = True
+INSTRUMENTACION_N_MAS_1 = 10
+INSTRUMENTACION_PERFIL_MUESTRA = float(os.environ.get('INSTRUMENTACION_PERFIL_MUESTRA', 0))
+INSTRUMENTACION_PERFIL_DIR = BASE_DIR / 'perfiles'
+
 MIDDLEWARE = [
+    'buscador.instrumentacion.InstrumentacionMiddleware',  # Primero: mide la petición completa
+    'buscador.replicas.ReplicasMiddleware',  # Lecturas en réplicas (DB_REPLICAS)
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',    # Middleware de CORS
@@ -100,6 +132,22 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Una línea JSON por petición y las advertencias de N+1.
+        'buscador.instrumentacion': {
+            'handlers': ['consola'],
+            'level': os.environ.get('INSTRUMENTACION_LOG_NIVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -137,6 +185,58 @@ DATABASES = {
     }
 }
 
+# Réplicas de lectura (buscador/replicas.py). DB_REPLICAS es una lista de
+# host:puerto[:peso] separados por comas; cada réplica es una copia por
+# replicación de PostgreSQL de 'default', con la misma base, usuario y
+# contraseña. Para probarlo en local: una réplica de streaming en el puerto
+# 5433 (pg_basebackup -R) y DB_REPLICAS=localhost:5433. En los tests las
+# réplicas apuntan a la base de test de 'default' (MIRROR).
+REPLICAS = {}
+for numero, replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), 1):
+    host, puerto, *peso = replica.strip().split(':')
+    DATABASES[f'replica_{numero}'] = {
+        **DATABASES['default'], 'HOST': host, 'PORT': puerto, 'TEST': {'MIRROR': 'default'},
+    }
+    REPLICAS[f'replica_{numero}'] = int(peso[0]) if peso else 1
+
+DATABASE_ROUTERS = ['buscador.replicas.ReplicasRouter']
+
+# Segundos que un cliente lee de la primaria después de escribir (lo que
+# puede tardar una réplica en recibir el cambio).
+REPLICAS_PRIMARIA_SEGUNDOS = 5
+
+
+# Caché
+# 'catalogo' guarda las respuestas de los listados del catálogo (buscador/cache.py).
+# Por defecto es memoria local del proceso; para compartirla entre procesos o
+# servidores se define CATALOGO_CACHE_URL (por ejemplo redis://localhost:6379/1).
+# 'catalogo_versiones' guarda las versiones de los modelos, que invalidan las
+# respuestas: siempre es compartida (Redis o, sin CATALOGO_CACHE_URL, la tabla
+# buscador_cache_versiones de la base, creada en la migración 0015).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalogo': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['CATALOGO_CACHE_URL'],
+    } if os.environ.get('CATALOGO_CACHE_URL') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'catalogo',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'catalogo_versiones': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['CATALOGO_CACHE_URL'],
+    } if os.environ.get('CATALOGO_CACHE_URL') else {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'buscador_cache_versiones',
+    },
+}
+CATALOGO_CACHE_ALIAS = 'catalogo'
+CATALOGO_VERSIONES_CACHE_ALIAS = 'catalogo_versiones'
+CATALOGO_CACHE_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -1,3 +1,4 @@
+import argparse
 import os
 import sys
 import django
@@ -16,6 +17,8 @@ django.setup()
 # ============================================================================
 
 
+from buscador.compatibilidad import establecer_compatibilidad
+from buscador.generador import GeneradorCatalogo
 from buscador.models import (
     Tienda,
     Categoria,
@@ -114,11 +117,11 @@ def crear_datos_de_ejemplo():
     RepuestoGlobal.objects.bulk_create(repuestos_globales)
     print(f"Creados {len(repuestos_globales)} repuestos globales.")
 
-    # Asignar compatibilidad - Se corrigió el campo a 'compatibilidad'
-    repuestos_globales[0].compatibilidad.set([vehiculos[0], vehiculos[1]])
-    repuestos_globales[1].compatibilidad.set([vehiculos[1], vehiculos[2]])
-    repuestos_globales[2].compatibilidad.set([vehiculos[0]])
-    repuestos_globales[3].compatibilidad.set([vehiculos[2]])
+    # Asignar compatibilidad (se guarda por rangos de años, ver buscador/compatibilidad.py)
+    establecer_compatibilidad(repuestos_globales[0], [vehiculos[0], vehiculos[1]])
+    establecer_compatibilidad(repuestos_globales[1], [vehiculos[1], vehiculos[2]])
+    establecer_compatibilidad(repuestos_globales[2], [vehiculos[0]])
+    establecer_compatibilidad(repuestos_globales[3], [vehiculos[2]])
 
     # Crear registros de stock por sucursal - Se agregó el campo 'precio'
     repuestos_sucursales = [
@@ -143,7 +146,51 @@ def crear_datos_de_ejemplo():
 
     print("\n¡Todos los datos de ejemplo han sido creados exitosamente!")
 
+def parsear_argumentos():
+    """Parámetros del generador de datos sintéticos."""
+    parser = argparse.ArgumentParser(
+        description="Genera datos sintéticos para el catálogo de repuestos (pruebas de carga)."
+    )
+    parser.add_argument('--generar', action='store_true',
+                        help="Genera un catálogo sintético del tamaño indicado en lugar de los datos de ejemplo.")
+    parser.add_argument('--tiendas', type=int, default=10)
+    parser.add_argument('--sucursales', type=int, default=50)
+    parser.add_argument('--categorias', type=int, default=12)
+    parser.add_argument('--vehiculos', type=int, default=500)
+    parser.add_argument('--repuestos', type=int, default=1000)
+    parser.add_argument('--compat-per-part', type=int, default=5,
+                        help="Vehículos compatibles por repuesto.")
+    parser.add_argument('--ofertas-por-repuesto', type=int, default=3,
+                        help="Sucursales que ofrecen cada repuesto.")
+    parser.add_argument('--semilla', type=int, default=42,
+                        help="Semilla aleatoria: la misma semilla genera los mismos datos.")
+    parser.add_argument('--lote', type=int, default=5000,
+                        help="Filas por bulk_create.")
+    return parser.parse_args()
+
+
 # Ejecutar el script
+# Sin argumentos crea el pequeño conjunto de datos de ejemplo.
+# Catálogo sintético a escala de producción:
+#   python populate_db.py --generar --tiendas 500 --sucursales 5000 --repuestos 1000000 \
+#       --vehiculos 20000 --compat-per-part 30
 if __name__ == '__main__':
-    borrar_datos_existentes()
-    crear_datos_de_ejemplo()
+    argumentos = parsear_argumentos()
+    if not argumentos.generar:
+        borrar_datos_existentes()
+        crear_datos_de_ejemplo()
+        # bulk_create no dispara señales: se recalculan los datos derivados.
+        GeneradorCatalogo().actualizar_derivados()
+    else:
+        print("Eliminando datos existentes...")
+        GeneradorCatalogo.borrar_datos()
+        generador = GeneradorCatalogo(semilla=argumentos.semilla, lote=argumentos.lote)
+        generador.generar(
+            tiendas=argumentos.tiendas,
+            sucursales=argumentos.sucursales,
+            categorias=argumentos.categorias,
+            vehiculos=argumentos.vehiculos,
+            repuestos=argumentos.repuestos,
+            compat_por_repuesto=argumentos.compat_per_part,
+            ofertas_por_repuesto=argumentos.ofertas_por_repuesto,
+        )
@@ -4,26 +4,30 @@ function App() {
   const [repuestos, setRepuestos] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  // URL de la página siguiente que devuelve la API (paginación por cursor).
+  const [siguiente, setSiguiente] = useState(null);
 
-  useEffect(() => {
-    const fetchRepuestos = async () => {
-      try {
-        // La URL es relativa gracias a la configuración del proxy en package.json
-        const response = await fetch('/api/repuestos/');
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        const data = await response.json();
-        setRepuestos(data);
-      } catch (e) {
-        console.error("No se pudo obtener la lista de repuestos:", e);
-        setError(e.message);
-      } finally {
-        setLoading(false);
+  const fetchRepuestos = async (url, agregar) => {
+    setLoading(true);
+    try {
+      const response = await fetch(url);
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
       }
-    };
+      const data = await response.json();
+      setRepuestos(anteriores => agregar ? [...anteriores, ...data.results] : data.results);
+      setSiguiente(data.next);
+    } catch (e) {
+      console.error("No se pudo obtener la lista de repuestos:", e);
+      setError(e.message);
+    } finally {
+      setLoading(false);
+    }
+  };
 
-    fetchRepuestos();
+  useEffect(() => {
+    // La URL es relativa gracias a la configuración del proxy en package.json
+    fetchRepuestos('/api/repuestos/', false);
   }, []);
 
   return (
@@ -41,7 +45,7 @@ function App() {
       )}
 
       {/* Mostrar la lista de repuestos */}
-      {!loading && !error && (
+      {!error && (
         <div>
           {repuestos.length > 0 ? (
             <ul className="space-y-4">
@@ -53,9 +57,17 @@ function App() {
                 </li>
               ))}
             </ul>
-          ) : (
+          ) : !loading && (
             <p className="text-gray-600 text-center">No hay repuestos para mostrar.</p>
           )}
+          {siguiente && !loading && (
+            <button
+              onClick={() => fetchRepuestos(siguiente, true)}
+              className="mt-6 w-full p-3 bg-gray-800 text-white rounded-md hover:bg-gray-700"
+            >
+              Cargar más
+            </button>
+          )}
         </div>
       )}
     </div>